@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from datetime import datetime
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     # MongoDB
@@ -23,6 +24,58 @@ class Settings(BaseSettings):
     
     # Budgeting
     MONTHLY_LABOR_BUDGET: float = 75000.0
+
+    # Pay sync
+    PAY_HOURS_AGGREGATION: bool = True
+    PAY_SYNC_BULK_CHUNK_SIZE: int = 500
+    PAY_SYNC_CONCURRENCY: int = 4
+    PAY_APPROVE_CHUNK_SIZE: int = 500
+    PAY_APPROVE_WITHOUT_TRANSACTIONS: bool = False  # let approve-all run on a standalone mongod
+    PAY_VECTOR_MIN_EMPLOYEES: int = 200
+    PAY_SIMULATION_CACHE_SECONDS: int = 300
+    PAY_STREAM_BATCH_SIZE: int = 200
+    PAY_JOB_CHUNK_WEEKS: int = 8
+    PAY_JOB_POLL_SECONDS: float = 5.0
+    PAY_JOB_MAX_ATTEMPTS: int = 3
+
+    # Job leases (cluster-wide locks for long-running jobs)
+    JOB_LOCK_TTL_SECONDS: int = 60
+    JOB_LOCK_HEARTBEAT_SECONDS: int = 15
+    JOB_LOCK_WAIT_SECONDS: int = 300
+
+    # Scheduled payroll: runs every PAYROLL_SCHEDULE_DAYS counted from the anchor
+    SCHEDULER_JOBS_COLLECTION: str = "scheduler_jobs"
+    PAYROLL_SCHEDULE_ANCHOR: datetime = datetime(2025, 1, 4)
+    PAYROLL_SCHEDULE_DAYS: int = 14
+    PAYROLL_SCHEDULE_TIMEZONE: Optional[str] = None  # overrides the system timezone set in settings
+
+    # Batched attendance events from offline kiosks and mobile retries
+    ATTENDANCE_EVENT_SECRET: Optional[str] = None  # HMAC key; batch endpoint is off when unset
+    ATTENDANCE_BATCH_MAX_EVENTS: int = 500
+    ATTENDANCE_EVENT_MAX_SKEW_SECONDS: int = 300
+    ATTENDANCE_EVENT_RETENTION_DAYS: int = 30
+
+    # Live attendance feed (/attendance/stream)
+    ATTENDANCE_FEED_SOURCE: Literal["local", "change_stream"] = "local"
+    ATTENDANCE_FEED_QUEUE_SIZE: int = 100
+    ATTENDANCE_FEED_KEEPALIVE_SECONDS: float = 15.0
+
+    # Attendance history layout: one document per session, or closed sessions
+    # bucketed per user and month (run app/migrations/bucket_attendance.py on switching)
+    ATTENDANCE_STORAGE: Literal["sessions", "monthly"] = "sessions"
+
+    # Hot/cold attendance: closed sessions older than this many days move to
+    # attendance_archive in a daily scheduled job (0, the default, turns archiving off)
+    ATTENDANCE_ARCHIVE_AFTER_DAYS: int = 0
+    ATTENDANCE_ARCHIVE_HOUR: int = 3  # in the payroll schedule timezone
+    ATTENDANCE_ARCHIVE_BATCH_SIZE: int = 1000
+    ATTENDANCE_ARCHIVE_PAUSE_SECONDS: float = 0.5
+    ATTENDANCE_ARCHIVE_COMPRESSOR: str = "zstd"  # block compressor set when the archive collection is created
+
+    # Attendance history export (/attendance/export)
+    ATTENDANCE_EXPORT_BATCH_SIZE: int = 2000
+    ATTENDANCE_EXPORT_MAX_DAYS: int = 1100
+    ATTENDANCE_EXPORT_SPOOL_BYTES: int = 16 * 1024 * 1024  # XLSX exports spill to disk past this
     
     class Config:
         env_file = ".env"
@@ -9,13 +9,25 @@ from beanie import init_beanie
 from app.config import settings
 from app.models.user import User
 from app.models.attendance import Attendance
+from app.models.attendance_event_receipt import AttendanceEventReceipt
+from app.models.attendance_daily import AttendanceDaily
+from app.models.attendance_month import AttendanceMonth
+from app.models.attendance_archive import AttendanceArchive
 from app.models.payroll import Payroll
 from app.models.pay import Pay
 from app.models.pay_approve import PayApprove
+from app.models.pay_dirty_week import PayDirtyWeek
+from app.models.pay_ledger_week import PayLedgerWeek
+from app.models.job_lock import JobLock
+from app.models.pay_job import PayJob
+from app.models.scheduled_job_run import ScheduledJobRun
 from app.models.shift import Shift
 from app.models.deleted_employee import DeletedEmployee
 from app.models.system_settings import SystemSettings
 from app.models.adjustment import AdjustmentType, EmployeeAdjustment
+from app.services.payroll_periods import dedup_payroll_periods, has_period_index
+from app.services.attendance_sessions import close_overlapping_sessions, has_open_session_index
+from app.services.attendance_archive import ensure_archive_collection
 
 logger = logging.getLogger(__name__)
 
@@ -28,23 +40,54 @@ async def init_db():
         client = AsyncIOMotorClient(settings.MONGODB_URI)
         database = client[settings.DB_NAME]
 
+        # The unique payroll period index cannot be built over duplicates.
+        payroll_collection = database[Payroll.Settings.name]
+        deduped_periods = []
+        if not await has_period_index(payroll_collection):
+            deduped_periods = await dedup_payroll_periods(payroll_collection)
+
+        # Likewise for the one-open-session-per-user attendance index.
+        attendance_collection = database[Attendance.Settings.name]
+        if not await has_open_session_index(attendance_collection):
+            closed = await close_overlapping_sessions(attendance_collection)
+            if closed:
+                logger.warning("Closed %d overlapping open attendance sessions", closed)
+
+        # Block compression can only be chosen when the collection is created.
+        await ensure_archive_collection(database)
+
         await init_beanie(
             database=database,
             document_models=[
                 User,
                 Attendance,
+                AttendanceEventReceipt,
+                AttendanceDaily,
+                AttendanceMonth,
+                AttendanceArchive,
                 Payroll,
                 Shift,
                 DeletedEmployee,
                 SystemSettings,
                 Pay,
                 PayApprove,
+                PayDirtyWeek,
+                PayLedgerWeek,
+                JobLock,
+                PayJob,
+                ScheduledJobRun,
                 AdjustmentType,
                 EmployeeAdjustment,
             ],
             allow_index_dropping=True,
         )
 
+        if deduped_periods:
+            from app.services.pay_ledger import refresh_pay_ledger
+
+            await refresh_pay_ledger(deduped_periods)
+            logger.info("Removed duplicate payroll rows for %d periods", len(deduped_periods))
+
         logger.info("Connected to MongoDB database: %s", settings.DB_NAME)
     except Exception as exc:
         logger.error("Failed to connect to MongoDB: %s", exc)
@@ -9,6 +9,9 @@ from app.routers import pay
 from app.routers import settings as settings_router
 from app.routers import adjustments
 from app.utils.scheduler import start_scheduler, shutdown_scheduler
+from app.services.pay_jobs import start_pay_job_worker, stop_pay_job_worker
+from app.services.attendance_feed import broadcaster as attendance_feed
+from app.services.attendance_daily import start_attendance_daily_build, stop_attendance_daily_build
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,11 +22,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting ShiftSync API...")
     await init_db()
     start_scheduler()
+    start_pay_job_worker()
+    attendance_feed.start()
+    start_attendance_daily_build()
     logger.info("ShiftSync API started successfully")
     yield
     # Shutdown
     logger.info("Shutting down ShiftSync API...")
-    shutdown_scheduler()
+    await stop_attendance_daily_build()
+    await attendance_feed.stop()
+    await stop_pay_job_worker()
+    await shutdown_scheduler()
     logger.info("ShiftSync API shut down")
 
 app = FastAPI(
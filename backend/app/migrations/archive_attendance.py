@@ -0,0 +1,56 @@
+"""Move attendance history between the hot and archive tiers now.
+
+Once ATTENDANCE_ARCHIVE_AFTER_DAYS is set (it is 0, off, by default), the
+scheduler archives closed sessions older than that once a day. Run this to
+do the first, large move at a chosen time (or with a different ``--days``)
+instead of waiting for the job; it takes the same lease, so the two never
+run at once, and it can be stopped and rerun at any point.
+
+Turning archiving off: set ATTENDANCE_ARCHIVE_AFTER_DAYS=0, restart the API,
+then run with ``--restore`` to move every archived session back.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.database import init_db
+from app.services.attendance_archive import archive_attendance, restore_archived
+from app.services.job_lock import ATTENDANCE_ARCHIVE_LOCK, JobLease, LeaseHeld, LeaseLost
+from app.services.system_settings import get_current_date
+
+async def main(restore: bool, days: int, batch_size: int, pause: float):
+    await init_db()
+    if restore and settings.ATTENDANCE_ARCHIVE_AFTER_DAYS > 0:
+        # The next scheduled run would archive it all again.
+        raise SystemExit("Set ATTENDANCE_ARCHIVE_AFTER_DAYS=0 (and restart the API) before restoring")
+    if not restore and days <= 0:
+        raise SystemExit("--days must be positive (archiving is off while ATTENDANCE_ARCHIVE_AFTER_DAYS is 0)")
+
+    try:
+        async with JobLease(ATTENDANCE_ARCHIVE_LOCK, job="attendance.archive", holder="migration") as lease:
+            if restore:
+                restored = await restore_archived(batch_size=batch_size, pause=pause, lease=lease)
+                print(f"Restored {restored} archived attendance sessions")
+                return
+            before = await get_current_date() - timedelta(days=days)
+            moved = await archive_attendance(before, batch_size, pause, lease)
+            print(f"Archived {moved} closed attendance sessions dated before {before}")
+    except LeaseHeld as held:
+        raise SystemExit(f"Attendance archive already running: {held.describe()}")
+    except LeaseLost as lost:
+        raise SystemExit(f"{lost.describe()}; rerun to continue")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--restore", action="store_true", help="move archived sessions back to attendance")
+    parser.add_argument("--days", type=int, default=settings.ATTENDANCE_ARCHIVE_AFTER_DAYS, help="archive sessions dated more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=settings.ATTENDANCE_ARCHIVE_BATCH_SIZE, help="sessions per batch")
+    parser.add_argument("--pause", type=float, default=settings.ATTENDANCE_ARCHIVE_PAUSE_SECONDS, help="seconds to sleep between batches")
+    args = parser.parse_args()
+    asyncio.run(main(args.restore, args.days, args.batch_size, args.pause))
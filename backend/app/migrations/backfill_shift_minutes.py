@@ -0,0 +1,67 @@
+"""Backfill start_minute, end_minute and duration_minutes on existing shifts.
+
+Safe to run while the API is serving traffic: shifts are updated in small
+batches with a pause in between, and only documents still missing
+duration_minutes are touched, so the script can be stopped and re-run.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from pymongo import UpdateOne
+
+from app.database import init_db
+from app.models.shift import Shift
+from app.services.shift_hours import duration_between, minute_of_day
+
+async def backfill_shift_minutes(batch_size: int, pause: float) -> int:
+    """Fill the derived minute fields on shifts that predate them."""
+    await init_db()
+    collection = Shift.get_motor_collection()
+    updated = 0
+    last_id = None
+
+    while True:
+        query = {"duration_minutes": None}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(
+            query, {"start_time": 1, "end_time": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            start_minute = minute_of_day(doc["start_time"])
+            end_minute = minute_of_day(doc["end_time"])
+            operations.append(
+                UpdateOne(
+                    # Skip shifts the API rewrote since this batch was read.
+                    {"_id": doc["_id"], "duration_minutes": None},
+                    {"$set": {
+                        "start_minute": start_minute,
+                        "end_minute": end_minute,
+                        "duration_minutes": duration_between(start_minute, end_minute),
+                    }},
+                )
+            )
+        result = await collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+        last_id = batch[-1]["_id"]
+        print(f"Backfilled {updated} shifts")
+        await asyncio.sleep(pause)
+
+    return updated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.2, help="seconds to sleep between batches")
+    args = parser.parse_args()
+    total = asyncio.run(backfill_shift_minutes(args.batch_size, args.pause))
+    print(f"Done. {total} shifts updated.")
@@ -0,0 +1,43 @@
+"""Move attendance history between the per-session and monthly layouts.
+
+Switching to ATTENDANCE_STORAGE="monthly": set it and restart the API
+first (reads then cover both places), then run this script to move closed
+sessions into ``attendance_months`` in throttled batches while the API keeps
+serving. It can be stopped and rerun at any point.
+
+Switching back: run with ``--revert`` to unpack every bucket into one
+``attendance`` document per session, set ATTENDANCE_STORAGE="sessions",
+restart, then run ``--revert`` once more for sessions closed in between.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.config import settings
+from app.database import init_db
+from app.services.attendance_store import move_closed_sessions, unbucket_sessions
+
+async def main(revert: bool, batch_size: int, pause: float):
+    await init_db()
+    if revert:
+        restored = await unbucket_sessions(batch_size=batch_size, pause=pause)
+        print(f"Restored {restored} attendance sessions from monthly buckets")
+        return
+
+    if settings.ATTENDANCE_STORAGE != "monthly":
+        # The API would stop seeing whatever moved.
+        raise SystemExit("Set ATTENDANCE_STORAGE=monthly (and restart the API) before bucketing")
+    moved = await move_closed_sessions(batch_size=batch_size, pause=pause)
+    print(f"Moved {moved} closed attendance sessions into monthly buckets")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--revert", action="store_true", help="unpack monthly buckets back into attendance")
+    parser.add_argument("--batch-size", type=int, default=500, help="sessions (buckets with --revert) per batch")
+    parser.add_argument("--pause", type=float, default=0.2, help="seconds to sleep between batches")
+    args = parser.parse_args()
+    asyncio.run(main(args.revert, args.batch_size, args.pause))
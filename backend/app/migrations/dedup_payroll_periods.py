@@ -0,0 +1,41 @@
+"""Collapse duplicate payroll rows and build the unique period index.
+
+Duplicates per (user_id, period_start, period_end) are deleted in small
+batches, keeping the approved row over pending ones, so the script can run
+while the API is serving traffic. init_db does the same on startup when the
+index is missing; run this first on large databases to keep startup fast.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import settings
+from app.database import init_db
+from app.models.payroll import Payroll
+from app.services.pay_ledger import refresh_pay_ledger
+from app.services.payroll_periods import dedup_payroll_periods
+
+async def main(batch_size: int, pause: float):
+    # Dedup on a raw connection first; init_db then builds the index.
+    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    collection = client[settings.DB_NAME][Payroll.Settings.name]
+    periods = await dedup_payroll_periods(collection, batch_size=batch_size, pause=pause)
+    client.close()
+
+    await init_db()
+    if periods:
+        await refresh_pay_ledger(periods)
+    print(f"Removed duplicate payroll rows for {len(periods)} periods")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.2, help="seconds to sleep between batches")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.pause))
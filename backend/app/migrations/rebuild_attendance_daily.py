@@ -0,0 +1,31 @@
+"""Recompute the attendance_daily rollup from raw attendance records."""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from bson import ObjectId
+
+from app.database import init_db
+from app.services.attendance_daily import rebuild_attendance_daily
+from app.services.job_lock import ATTENDANCE_DAILY_LOCK, JobLease, LeaseHeld, LeaseLost
+
+async def main(user_id):
+    await init_db()
+    try:
+        async with JobLease(ATTENDANCE_DAILY_LOCK, job="attendance.daily.rebuild", holder="migration") as lease:
+            rows = await rebuild_attendance_daily(ObjectId(user_id) if user_id else None, lease)
+    except LeaseHeld as held:
+        raise SystemExit(f"attendance_daily is already being rebuilt: {held.describe()}")
+    except LeaseLost as lost:
+        raise SystemExit(f"{lost.describe()}; rerun to continue")
+    print(f"Corrected {rows} attendance_daily rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="only rebuild this user's rows (ObjectId)")
+    args = parser.parse_args()
+    asyncio.run(main(args.user))
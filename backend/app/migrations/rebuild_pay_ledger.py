@@ -0,0 +1,18 @@
+"""Recompute the pay_ledger_weekly rollup from pay, payapprove and payroll."""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.database import init_db
+from app.services.pay_ledger import rebuild_pay_ledger
+
+async def main():
+    await init_db()
+    weeks = await rebuild_pay_ledger()
+    print(f"Rebuilt pay ledger for {weeks} weeks")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,6 +3,10 @@ from pydantic import Field, field_validator
 from datetime import datetime, date, timezone
 from typing import Optional, Union
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# At most one open (not clocked out) session per user; see app.services.attendance_sessions.
+OPEN_SESSION_INDEX = "open_session_unique"
 
 class Attendance(Document):
     user_id: ObjectId
@@ -27,7 +31,17 @@ class Attendance(Document):
         name = "attendance"
         indexes = [
             "user_id",
-            "date",
+            IndexModel(
+                [("user_id", ASCENDING), ("clock_out", ASCENDING)],
+                name=OPEN_SESSION_INDEX,
+                unique=True,
+                # Beanie writes clock_out as an explicit null on open sessions.
+                partialFilterExpression={"clock_out": {"$type": "null"}},
+            ),
+            # Latest completed session per user, for the attendance summary.
+            IndexModel([("user_id", ASCENDING), ("clock_out", DESCENDING)]),
+            # Range exports read in (date, clock_in) order; also serves plain date lookups.
+            IndexModel([("date", ASCENDING), ("clock_in", ASCENDING)]),
             "clock_in",
         ]
     
@@ -0,0 +1,30 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime, date, timezone
+from typing import Optional
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+
+class AttendanceArchive(Document):
+    """A closed attendance session past the hot horizon, with its original id.
+
+    Moved here from ``attendance`` by ``app.services.attendance_archive``;
+    ``app.services.attendance_store`` reads both tiers.
+    """
+    user_id: ObjectId
+    clock_in: datetime
+    clock_out: datetime
+    hours_worked: Optional[float] = None
+    date: date
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "attendance_archive"
+        indexes = [
+            IndexModel([("date", ASCENDING), ("clock_in", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("date", ASCENDING)]),
+        ]
+
+    class Config:
+        arbitrary_types_allowed = True
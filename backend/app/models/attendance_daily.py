@@ -0,0 +1,28 @@
+from beanie import Document
+from bson import ObjectId
+from datetime import date, datetime, timezone
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class AttendanceDaily(Document):
+    """Completed attendance per user and day.
+
+    Maintained by ``app.services.attendance_daily`` with ``$inc`` on every
+    clock-out or edit; rows are derived data and can be rebuilt from
+    ``attendance`` at any time.
+    """
+    user_id: ObjectId
+    date: date
+    hours: float = 0
+    sessions: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = 'attendance_daily'
+        indexes = [
+            IndexModel([('user_id', ASCENDING), ('date', ASCENDING)], unique=True),
+        ]
+
+    class Config:
+        arbitrary_types_allowed = True
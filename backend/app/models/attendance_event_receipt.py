@@ -0,0 +1,38 @@
+from beanie import Document
+from bson import ObjectId
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.config import settings
+
+
+class AttendanceEventReceipt(Document):
+    """Outcome of one batched clock event, keyed by its client idempotency key.
+
+    Receipts expire after ATTENDANCE_EVENT_RETENTION_DAYS; events older than
+    that are rejected, so a replay can never outlive its receipt.
+    """
+    event_id: str
+    user_id: Optional[ObjectId] = None
+    type: Literal['clock_in', 'clock_out']
+    timestamp: datetime
+    status: Literal['processing', 'accepted', 'rejected'] = 'processing'
+    attendance_id: Optional[ObjectId] = None
+    detail: Optional[str] = None
+    submitted_by: ObjectId
+    received_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = 'attendance_event_receipts'
+        indexes = [
+            IndexModel([('event_id', ASCENDING)], unique=True),
+            IndexModel(
+                [('received_at', ASCENDING)],
+                expireAfterSeconds=settings.ATTENDANCE_EVENT_RETENTION_DAYS * 86400,
+            ),
+        ]
+
+    class Config:
+        arbitrary_types_allowed = True
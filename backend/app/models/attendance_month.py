@@ -0,0 +1,45 @@
+from beanie import Document
+from bson import ObjectId
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
+
+MONTH_BUCKET_INDEX = "user_month_unique"
+
+
+class MonthSession(BaseModel):
+    """A completed session inside a monthly bucket; ``id`` is its original attendance id."""
+    id: ObjectId
+    date: date
+    clock_in: datetime
+    clock_out: datetime
+    hours_worked: Optional[float] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class AttendanceMonth(Document):
+    """Completed attendance of one user for one month (by attendance ``date``).
+
+    Only used with ATTENDANCE_STORAGE="monthly"; written and read by
+    ``app.services.attendance_store``. ``hours`` and ``session_count`` are kept
+    in step with ``sessions`` by every write.
+    """
+    user_id: ObjectId
+    month: date
+    sessions: List[MonthSession] = Field(default_factory=list)
+    hours: float = 0
+    session_count: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "attendance_months"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("month", ASCENDING)], name=MONTH_BUCKET_INDEX, unique=True),
+            "month",
+        ]
+
+    class Config:
+        arbitrary_types_allowed = True
@@ -0,0 +1,28 @@
+from beanie import Document
+from datetime import datetime
+from typing import Optional
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class JobLock(Document):
+    """Lease held by one API worker while it runs a long job.
+
+    Documents are kept after release so waiters can read the outcome.
+    """
+    name: str
+    owner: str
+    holder: Optional[str] = None
+    job: Optional[str] = None
+    status: Optional[str] = None
+    acquired_at: datetime
+    heartbeat_at: datetime
+    expires_at: datetime
+    released_at: Optional[datetime] = None
+    result: Optional[dict] = Field(default=None)
+
+    class Settings:
+        name = 'job_locks'
+        indexes = [
+            IndexModel([('name', ASCENDING)], unique=True),
+        ]
@@ -1,8 +1,9 @@
-from beanie import Document
+from beanie import Document, PydanticObjectId
 from bson import ObjectId
 from datetime import datetime, date, timezone
 from typing import Literal, Optional
-from pydantic import Field
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 
 class Pay(Document):
@@ -23,6 +24,10 @@ class Pay(Document):
             'user_id',
             'status',
             ('week_start', 'week_end'),
+            # Keyset pagination order for the admin list endpoints.
+            IndexModel([('status', ASCENDING), ('week_end', DESCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]),
+            # Employee pay history (/pay/my).
+            IndexModel([('user_id', ASCENDING), ('status', ASCENDING), ('week_end', DESCENDING)]),
         ]
 
     class Config:
@@ -37,3 +42,16 @@ class Pay(Document):
                 'status': 'pending',
             }
         }
+
+
+class PaySummary(BaseModel):
+    """Projection of ``Pay`` for list views; leaves out the adjustments payload."""
+    id: PydanticObjectId = Field(alias='_id')
+    user_id: PydanticObjectId
+    week_start: date
+    week_end: date
+    hours_worked: float
+    gross_amount: float = 0
+    amount: float
+    status: str
+    created_at: datetime
@@ -3,6 +3,7 @@ from bson import ObjectId
 from datetime import datetime, date, timezone
 from typing import Literal, Optional
 from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 
 class PayApprove(Document):
@@ -15,6 +16,8 @@ class PayApprove(Document):
     adjustments: list[dict] = Field(default_factory=list)
     status: Literal['pending', 'held'] = 'pending'
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Set by every write; approve-all only removes records it copied unchanged.
+    updated_at: Optional[datetime] = None
 
     class Settings:
         name = 'payapprove'
@@ -22,6 +25,8 @@ class PayApprove(Document):
             'user_id',
             'status',
             ('week_start', 'week_end'),
+            # Keyset pagination order for the admin list endpoints.
+            IndexModel([('status', ASCENDING), ('week_end', DESCENDING), ('created_at', ASCENDING), ('_id', ASCENDING)]),
         ]
 
     class Config:
@@ -0,0 +1,19 @@
+from beanie import Document
+from datetime import date, datetime, timezone
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class PayDirtyWeek(Document):
+    week_start: date
+    week_end: date
+    marked_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = 'pay_dirty_weeks'
+        indexes = [
+            IndexModel(
+                [('week_start', ASCENDING), ('week_end', ASCENDING)],
+                unique=True,
+            ),
+        ]
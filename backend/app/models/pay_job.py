@@ -0,0 +1,33 @@
+from beanie import Document
+from bson import ObjectId
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class PayJob(Document):
+    """Queued pay sync run, executed by the in-process job worker."""
+    kind: Literal['sync'] = 'sync'
+    state: Literal['queued', 'running', 'succeeded', 'failed'] = 'queued'
+    requested_by: Optional[ObjectId] = None
+    worker: Optional[str] = None
+    attempts: int = 0
+    weeks_total: int = 0
+    weeks_done: int = 0
+    weeks_failed: int = 0
+    generated: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = 'pay_jobs'
+        indexes = [
+            IndexModel([('state', ASCENDING), ('created_at', ASCENDING)]),
+        ]
+
+    class Config:
+        arbitrary_types_allowed = True
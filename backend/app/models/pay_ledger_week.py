@@ -0,0 +1,38 @@
+from beanie import Document
+from datetime import date, datetime, timezone
+from typing import Literal, Optional
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class PayLedgerWeek(Document):
+    """Pay totals per week, source collection, status and department.
+
+    Maintained by ``app.services.pay_ledger``; rows are derived data and can be
+    rebuilt from ``pay``, ``payapprove`` and ``payroll`` at any time.
+    """
+    week_end: date
+    source: Literal['pay', 'pay_approve', 'payroll']
+    status: str
+    department: str
+    # First day of the month the record was approved in; set for approved rows only.
+    approved_month: Optional[date] = None
+    amount: float = 0
+    records: int = 0
+    refreshed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = 'pay_ledger_weekly'
+        indexes = [
+            IndexModel(
+                [
+                    ('week_end', ASCENDING),
+                    ('source', ASCENDING),
+                    ('status', ASCENDING),
+                    ('department', ASCENDING),
+                    ('approved_month', ASCENDING),
+                ],
+                unique=True,
+            ),
+            'source',
+        ]
@@ -3,6 +3,10 @@ from pydantic import Field
 from datetime import datetime, date, timezone
 from typing import Literal, Optional
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+# One payroll row per employee and period; see app.services.payroll_periods.
+PAYROLL_PERIOD_INDEX = "user_period_unique"
 
 class Payroll(Document):
     user_id: ObjectId
@@ -18,6 +22,11 @@ class Payroll(Document):
         name = "payroll"
         indexes = [
             "user_id",
+            IndexModel(
+                [("user_id", ASCENDING), ("period_start", ASCENDING), ("period_end", ASCENDING)],
+                name=PAYROLL_PERIOD_INDEX,
+                unique=True,
+            ),
             "status",
             "period_start",
             "period_end",
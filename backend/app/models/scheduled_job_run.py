@@ -0,0 +1,20 @@
+from beanie import Document
+from datetime import datetime
+from typing import Literal, Optional
+from pymongo import ASCENDING, IndexModel
+
+
+class ScheduledJobRun(Document):
+    """Outcome of the latest run of a scheduled job, one document per job id."""
+    job_id: str
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_status: Optional[Literal["succeeded", "failed", "skipped"]] = None
+    last_detail: Optional[str] = None
+    last_runner: Optional[str] = None
+
+    class Settings:
+        name = 'scheduler_runs'
+        indexes = [
+            IndexModel([('job_id', ASCENDING)], unique=True),
+        ]
@@ -1,15 +1,27 @@
-from beanie import Document
+from beanie import Document, Insert, Replace, Save, SaveChanges, before_event
 from pydantic import Field
 from datetime import date
-from typing import Literal
+from typing import Literal, Optional
 from bson import ObjectId
 
+from app.services.shift_hours import duration_between, minute_of_day
+
 class Shift(Document):
     employee_id: ObjectId
     shift_date: date
     start_time: str = Field(..., pattern=r'^([01]\d|2[0-3]):([0-5]\d)$')
     end_time: str = Field(..., pattern=r'^([01]\d|2[0-3]):([0-5]\d)$')
     status: Literal["assigned", "completed"] = "assigned"
+    # Derived from start_time/end_time on every write; see sync_minutes.
+    start_minute: Optional[int] = None
+    end_minute: Optional[int] = None
+    duration_minutes: Optional[int] = None
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def sync_minutes(self):
+        self.start_minute = minute_of_day(self.start_time)
+        self.end_minute = minute_of_day(self.end_time)
+        self.duration_minutes = duration_between(self.start_minute, self.end_minute)
     
     class Settings:
         name = "shifts"
@@ -16,6 +16,9 @@ class SystemSettings(Document):
     quarterly_budget: Optional[float] = None
     quarterly_budget_updated_by: Optional[ObjectId] = None
     quarterly_budget_updated_at: Optional[datetime] = None
+    pay_weeks_seeded_at: Optional[datetime] = None
+    pay_ledger_built_at: Optional[datetime] = None
+    attendance_daily_built_at: Optional[datetime] = None
 
     class Settings:
         name = "system_settings"
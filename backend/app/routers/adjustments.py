@@ -14,6 +14,7 @@ from app.schemas.adjustment import (
     EmployeeAdjustmentResponse,
     EmployeeAdjustmentUpdate,
 )
+from app.services.pay_weeks import mark_pay_approval_weeks_dirty
 from app.utils.deps import require_admin
 
 router = APIRouter()
@@ -59,6 +60,7 @@ def _serialize_assignment(adj: EmployeeAdjustment) -> EmployeeAdjustmentResponse
 async def create_adjustment_type(payload: AdjustmentTypeCreate, admin: User = Depends(require_admin)):
     adjustment = AdjustmentType(**payload.dict())
     await adjustment.insert()
+    await mark_pay_approval_weeks_dirty()
     return _serialize_type(adjustment)
 
 
@@ -80,6 +82,7 @@ async def update_adjustment_type(
         setattr(adjustment, field, value)
     adjustment.updated_at = datetime.utcnow()
     await adjustment.save()
+    await mark_pay_approval_weeks_dirty()
     return _serialize_type(adjustment)
 
 
@@ -99,6 +102,7 @@ async def assign_adjustment_to_employee(
         effective_end=payload.effective_end,
     )
     await assignment.insert()
+    await mark_pay_approval_weeks_dirty(assignment.employee_id)
     return _serialize_assignment(assignment)
 
 
@@ -124,4 +128,5 @@ async def update_employee_adjustment(
         setattr(assignment, field, value)
     assignment.updated_at = datetime.utcnow()
     await assignment.save()
+    await mark_pay_approval_weeks_dirty(assignment.employee_id)
     return _serialize_assignment(assignment)
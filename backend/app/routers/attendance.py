@@ -1,23 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from datetime import datetime, date, timedelta, timezone
-from typing import List, Dict, Optional
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Dict, Literal, Optional
 from bson import ObjectId
 
 from app.models.user import User
 from app.models.attendance import Attendance
-from app.models.shift import Shift
 from app.schemas.attendance import (
     AttendanceStart,
     AttendanceEnd,
     AttendanceResponse,
     AttendanceSummary,
     AttendanceLogEntry,
+    AttendanceBatchRequest,
+    AttendanceBatchResponse,
 )
 from app.utils.deps import get_current_user, require_admin
-from app.services.system_settings import get_current_date, get_current_time
+from app.services.system_settings import get_current_date
+from app.services.attendance_sessions import close_session, open_session
+from app.services.attendance_batch import ingest_events
+from app.services.attendance_daily import get_attendance_days
+from app.services.attendance_feed import broadcaster
+from app.services.attendance_export import EXPORT_MEDIA_TYPES, EXPORT_WRITERS
+from app.services.attendance_store import latest_completed, recent_sessions
+from app.config import settings
 
 router = APIRouter()
 DEFAULT_SHIFT_HOURS = 8
+FEED_RETRY_MILLISECONDS = 3000
 
 
 def _build_attendance_response(record: Attendance) -> AttendanceResponse:
@@ -32,31 +44,6 @@ def _build_attendance_response(record: Attendance) -> AttendanceResponse:
     )
 
 
-def _ensure_timezone_aware(value: Optional[datetime], *, field_name: str) -> datetime:
-    """Ensure datetime objects include timezone info for safe arithmetic."""
-    if value is None:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Attendance record missing {field_name}"
-        )
-    if value.tzinfo is None:
-        return value.replace(tzinfo=timezone.utc)
-    return value
-
-async def _mark_shift_attended(user_id: ObjectId, event_date: date) -> None:
-    """Mark the user's shift for the day as completed if it exists."""
-    shift = await Shift.find_one(
-        Shift.employee_id == user_id,
-        Shift.shift_date == event_date,
-        Shift.status == "assigned",
-        sort=[("start_time", 1)],
-    )
-
-    if shift:
-        shift.status = "completed"
-        await shift.save()
-
-
 async def _get_employee_or_error(employee_id: str) -> User:
     """Fetch a valid employee document or raise HTTP error."""
     if not ObjectId.is_valid(employee_id):
@@ -90,29 +77,14 @@ async def clock_in(current_user: User = Depends(get_current_user)):
             detail="Only employees can clock in"
         )
     
-    # Check if already clocked in (no clock_out)
-    existing = await Attendance.find_one(
-        Attendance.user_id == current_user.id,
-        Attendance.clock_out == None
-    )
-    
-    if existing:
+    # The open-session index rejects a second clock-in, even from simultaneous taps.
+    attendance = await open_session(current_user.id)
+    if attendance is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Already clocked in. Please clock out first."
         )
     
-    # Create new attendance record
-    now = await get_current_time()
-    attendance = Attendance(
-        user_id=current_user.id,
-        clock_in=now,
-        date=now.date()
-    )
-    
-    await attendance.insert()
-    await _mark_shift_attended(current_user.id, now.date())
-    
     return _build_attendance_response(attendance)
 
 @router.post("/end", response_model=AttendanceResponse)
@@ -124,33 +96,46 @@ async def clock_out(current_user: User = Depends(get_current_user)):
             detail="Only employees can clock out"
         )
     
-    # Find active clock-in
-    attendance = await Attendance.find_one(
-        Attendance.user_id == current_user.id,
-        Attendance.clock_out == None
-    )
-    
-    if not attendance:
+    # Closes the open session and computes hours_worked in one server-side update
+    attendance = await close_session(current_user.id)
+    if attendance is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Not clocked in. Please clock in first."
         )
     
-    # Update with clock out time
-    now = await get_current_time()
-    attendance.clock_out = now
-    
-    # Calculate hours worked
-    clock_in_time = _ensure_timezone_aware(attendance.clock_in, field_name="clock_in")
-    time_diff = now - clock_in_time
-    hours = time_diff.total_seconds() / 3600
-    attendance.hours_worked = round(hours, 2)
-    
-    await attendance.save()
-    await _mark_shift_attended(current_user.id, now.date())
-    
     return _build_attendance_response(attendance)
 
+@router.post("/batch", response_model=AttendanceBatchResponse)
+async def ingest_attendance_batch(
+    payload: AttendanceBatchRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Replay signed clock events recorded offline.
+
+    Employees may only submit their own events; admins (kiosks) may submit
+    for any employee. Each event gets its own result, and replaying an
+    event_id returns the original outcome as a duplicate.
+    """
+    if not settings.ATTENDANCE_EVENT_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Batch attendance is not configured"
+        )
+    if len(payload.events) > settings.ATTENDANCE_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {settings.ATTENDANCE_BATCH_MAX_EVENTS} events"
+        )
+    
+    results = await ingest_events(payload.events, current_user)
+    return AttendanceBatchResponse(
+        accepted=sum(1 for result in results if result.status == "accepted"),
+        duplicates=sum(1 for result in results if result.status == "duplicate"),
+        rejected=sum(1 for result in results if result.status == "rejected"),
+        results=results,
+    )
+
 @router.get("/summary", response_model=AttendanceSummary)
 async def get_attendance_summary(current_user: User = Depends(get_current_user)):
     """Get attendance summary for current user."""
@@ -163,47 +148,25 @@ async def get_attendance_summary(current_user: User = Depends(get_current_user))
     today = await get_current_date()
     week_start = today - timedelta(days=today.weekday())
     
-    # Get all attendance records for the week
-    records = await Attendance.find(
-        Attendance.user_id == current_user.id,
-        Attendance.date >= week_start
-    ).sort("-clock_in").to_list()
-
-    # Always include any active (no clock_out) record even if it predates the current week
-    active_record = await Attendance.find_one(
-        Attendance.user_id == current_user.id,
-        Attendance.clock_out == None  # noqa: E711
-    )
-    if active_record and all(str(rec.id) != str(active_record.id) for rec in records):
-        records = [active_record] + records
-    
-    # Calculate totals
-    total_hours_today = sum(
-        record.hours_worked or 0
-        for record in records
-        if record.date == today
+    # Totals come from the daily rollup; records are just the open session and
+    # the latest completed one, which is all the clients display.
+    days, active_record, last_record = await asyncio.gather(
+        get_attendance_days(current_user.id, week_start),
+        Attendance.find_one(
+            Attendance.user_id == current_user.id,
+            Attendance.clock_out == None  # noqa: E711
+        ),
+        latest_completed(current_user.id),
     )
     
-    total_hours_week = sum(
-        record.hours_worked or 0
-        for record in records
-        if record.date >= week_start
-    )
+    total_hours_today = sum(day.hours for day in days if day.date == today)
+    total_hours_week = sum(day.hours for day in days)
+    records = [record for record in (active_record, last_record) if record]
     
     return AttendanceSummary(
         total_hours_today=round(total_hours_today, 2),
         total_hours_week=round(total_hours_week, 2),
-        records=[
-            AttendanceResponse(
-                id=str(record.id),
-                user_id=str(record.user_id),
-                clock_in=record.clock_in,
-                clock_out=record.clock_out,
-                hours_worked=record.hours_worked,
-                date=record.date
-            )
-            for record in records
-        ]
+        records=[_build_attendance_response(record) for record in records]
     )
 
 @router.get("/logs", response_model=List[AttendanceLogEntry])
@@ -213,7 +176,7 @@ async def list_attendance_logs(
 ):
     """List recent attendance logs for admins."""
     max_entries = min(limit, 10)  # Enforce a max of 10 entries for recent activity views
-    records = await Attendance.find().sort("-clock_in").limit(max_entries).to_list()
+    records = await recent_sessions(max_entries)
     
     user_ids = list({record.user_id for record in records})
     users = await User.find({"_id": {"$in": user_ids}}).to_list()
@@ -243,6 +206,79 @@ async def list_attendance_logs(
     return entries
 
 
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def stream_attendance(_admin: User = Depends(require_admin)):
+    """Server-sent clock_in/clock_out events as they happen (Admin only).
+
+    A client that falls too far behind gets a ``dropped`` event with the number
+    of missed events and should reload ``/attendance/logs``.
+    """
+    subscription = broadcaster.subscribe()
+
+    async def events():
+        try:
+            yield f"retry: {FEED_RETRY_MILLISECONDS}\n\n"
+            while True:
+                batch, dropped = await subscription.get(settings.ATTENDANCE_FEED_KEEPALIVE_SECONDS)
+                if dropped:
+                    yield _sse("dropped", {"count": dropped})
+                for event in batch:
+                    yield _sse(event["type"], event, event["id"])
+                if not batch and not dropped:
+                    yield ": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export")
+async def export_attendance(
+    start_date: date = Query(..., description="First attendance date to include"),
+    end_date: date = Query(..., description="Last attendance date to include"),
+    employee_id: Optional[str] = Query(None, description="Limit the export to one employee, current or deleted"),
+    format: Literal["csv", "jsonl", "xlsx"] = Query("csv"),
+    _admin: User = Depends(require_admin),
+):
+    """Stream attendance history with employee names as CSV, JSONL or XLSX (Admin only)."""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
+        )
+    if (end_date - start_date).days >= settings.ATTENDANCE_EXPORT_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Export at most {settings.ATTENDANCE_EXPORT_MAX_DAYS} days at a time"
+        )
+    user_id = None
+    if employee_id is not None:
+        if not ObjectId.is_valid(employee_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid employee ID format"
+            )
+        user_id = ObjectId(employee_id)
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    filename = f"attendance_{start_date:%Y%m%d}_{end_date:%Y%m%d}_{timestamp}.{format}"
+    return StreamingResponse(
+        EXPORT_WRITERS[format](start_date, end_date, user_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.post("/admin/{employee_id}/start", response_model=AttendanceResponse)
 async def admin_clock_in_employee(
     employee_id: str,
@@ -251,25 +287,12 @@ async def admin_clock_in_employee(
     """Allow admins to clock in an employee manually."""
     employee = await _get_employee_or_error(employee_id)
 
-    existing = await Attendance.find_one(
-        Attendance.user_id == employee.id,
-        Attendance.clock_out == None
-    )
-
-    if existing:
+    attendance = await open_session(employee.id)
+    if attendance is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Employee is already clocked in"
         )
-
-    now = await get_current_time()
-    attendance = Attendance(
-        user_id=employee.id,
-        clock_in=now,
-        date=now.date()
-    )
-    await attendance.insert()
-    await _mark_shift_attended(employee.id, now.date())
     return _build_attendance_response(attendance)
 
 
@@ -281,25 +304,10 @@ async def admin_clock_out_employee(
     """Allow admins to clock out an employee manually."""
     employee = await _get_employee_or_error(employee_id)
 
-    attendance = await Attendance.find_one(
-        Attendance.user_id == employee.id,
-        Attendance.clock_out == None
-    )
-
-    if not attendance:
+    attendance = await close_session(employee.id)
+    if attendance is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Employee is not currently clocked in"
         )
-
-    now = await get_current_time()
-    attendance.clock_out = now
-
-    clock_in_time = _ensure_timezone_aware(attendance.clock_in, field_name="clock_in")
-    time_diff = now - clock_in_time
-    hours = time_diff.total_seconds() / 3600
-    attendance.hours_worked = round(hours, 2)
-
-    await attendance.save()
-    await _mark_shift_attended(employee.id, now.date())
     return _build_attendance_response(attendance)
@@ -1,7 +1,7 @@
 from collections import defaultdict
 from calendar import monthrange
 from fastapi import APIRouter, Depends
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from typing import Dict, Any, List
 
 from app.config import settings
@@ -9,24 +9,14 @@ from app.models.user import User
 from app.models.shift import Shift
 from app.models.attendance import Attendance
 from app.models.payroll import Payroll
-from app.models.pay import Pay
-from app.models.pay_approve import PayApprove
 from app.utils.deps import require_admin
 from app.services.system_settings import get_current_date
+from app.services.shift_hours import shift_hours
+from app.services.pay_ledger import get_pay_ledger_rows
+from app.services.attendance_store import iter_sessions, recent_sessions
 
 router = APIRouter()
 
-def _shift_hours(start_time: str, end_time: str) -> float:
-    try:
-        start_dt = datetime.strptime(start_time, "%H:%M")
-        end_dt = datetime.strptime(end_time, "%H:%M")
-    except ValueError:
-        return 0.0
-    hours = (end_dt - start_dt).total_seconds() / 3600
-    if hours <= 0:
-        hours += 24
-    return round(hours, 2)
-
 def _attendance_hours(record: Attendance) -> float:
     if record.hours_worked is not None:
         return float(record.hours_worked)
@@ -76,18 +66,14 @@ async def get_dashboard_analytics(admin: User = Depends(require_admin)):
         if employees else 0.0
     )
     
-    attendance_records = await Attendance.find(
-        Attendance.date >= start_60
-    ).to_list()
+    attendance_records = [
+        Attendance.model_validate(doc) async for doc in iter_sessions(start_60)
+    ]
     shifts = await Shift.find(
         Shift.shift_date >= start_60,
         Shift.shift_date <= future_end
     ).to_list()
-    payroll_records = await Payroll.find(
-        Payroll.period_end >= start_60
-    ).to_list()
-    pay_records = await Pay.find(Pay.week_end >= start_60).to_list()
-    pay_pending_records = await PayApprove.find().to_list()
+    ledger_rows = await get_pay_ledger_rows(start_60)
     
     daily_worked_hours: Dict[date, float] = defaultdict(float)
     attendance_counts: Dict[date, int] = defaultdict(int)
@@ -111,7 +97,7 @@ async def get_dashboard_analytics(admin: User = Depends(require_admin)):
     open_shifts_by_day: Dict[date, int] = defaultdict(int)
     shift_followups = 0
     for shift in shifts:
-        hours = _shift_hours(shift.start_time, shift.end_time)
+        hours = shift_hours(shift)
         daily_scheduled_hours[shift.shift_date] += hours
         employee = employee_map.get(shift.employee_id)
         pay_rate = employee.pay_rate if employee else 0.0
@@ -129,35 +115,20 @@ async def get_dashboard_analytics(admin: User = Depends(require_admin)):
     overtime_pending = 0
     payroll_processed = 0.0
 
-    # Legacy payroll records
-    for payroll in payroll_records:
-        payments_status_amounts[payroll.status] += float(payroll.gross_pay)
-        weekly_payroll_costs[_week_start(payroll.period_end)] += float(payroll.gross_pay)
-        employee = employee_map.get(payroll.user_id)
-        dept = employee.department if employee and employee.department else "Unassigned"
-        if payroll.period_end >= month_start:
-            dept_payroll_totals[dept] += float(payroll.gross_pay)
-        if payroll.status == "pending":
-            overtime_pending += 1
-        if payroll.status == "approved" and payroll.created_at.date() >= month_start:
-            payroll_processed += float(payroll.gross_pay)
-
-    # New pay records (approved)
-    for pay in pay_records:
-        payments_status_amounts[pay.status] += float(pay.amount)
-        weekly_payroll_costs[_week_start(pay.week_end)] += float(pay.amount)
-        employee = employee_map.get(pay.user_id)
-        dept = employee.department if employee and employee.department else "Unassigned"
-        if pay.week_end >= month_start:
-            dept_payroll_totals[dept] += float(pay.amount)
-        if pay.status == "approved" and pay.created_at.date() >= month_start:
-            payroll_processed += float(pay.amount)
-
-    # Pending/held pay approvals
-    for pending in pay_pending_records:
-        payments_status_amounts["pending"] += float(pending.amount)
-        if pending.status in ["pending", "held"]:
-            overtime_pending += 1
+    # Weekly pay ledger: legacy payroll, approved pay and pending/held approvals
+    for row in ledger_rows:
+        if row.source == "pay_approve":
+            payments_status_amounts["pending"] += row.amount
+            overtime_pending += row.records
+            continue
+        payments_status_amounts[row.status] += row.amount
+        weekly_payroll_costs[_week_start(row.week_end)] += row.amount
+        if row.week_end >= month_start:
+            dept_payroll_totals[row.department] += row.amount
+        if row.source == "payroll" and row.status == "pending":
+            overtime_pending += row.records
+        if row.status == "approved" and row.approved_month and row.approved_month >= month_start:
+            payroll_processed += row.amount
     
     current_labor_cost = sum(
         cost for shift_date, cost in daily_shift_costs.items()
@@ -340,7 +311,7 @@ async def get_dashboard_analytics(admin: User = Depends(require_admin)):
 @router.get("/recent-activity")
 async def get_recent_activity(admin: User = Depends(require_admin)):
     activities: List[Dict[str, Any]] = []
-    recent_attendance = await Attendance.find().sort("-clock_in").limit(10).to_list()
+    recent_attendance = await recent_sessions(10)
     user_cache: Dict[Any, User] = {}
     
     for record in recent_attendance:
@@ -1,53 +1,96 @@
+import asyncio
 from collections import defaultdict
-from datetime import date, datetime, timedelta
-from typing import Dict, List, Set, Tuple
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Dict, List, Literal, Optional, Set, Tuple
+import json
+import logging
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
-
-from app.models.pay import Pay
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pymongo import ASCENDING, DESCENDING, DeleteOne, UpdateOne
+from pymongo.errors import OperationFailure
+
+from app import database
+from app.config import settings
+from app.models.adjustment import AdjustmentType
+from app.models.pay import Pay, PaySummary
 from app.models.pay_approve import PayApprove
-from app.models.adjustment import AdjustmentType, EmployeeAdjustment
+from app.models.pay_job import PayJob
 from app.models.shift import Shift
 from app.models.user import User
 from app.schemas.pay import (
+    PayAdjustmentTotal,
     PayApproveResponse,
+    PayBulkApproveResponse,
     PayGenerateResponse,
+    PayJobResponse,
     PayRecordResponse,
+    PayRecordSummaryResponse,
+    PaySimulationEmployee,
+    PaySimulationRequest,
+    PaySimulationResponse,
+    PaySimulationWeek,
     PaySyncApproveResponse,
 )
+from app.services import pay_engine
+from app.services.job_lock import PAY_SYNC_LOCK, JobLease, LeaseHeld, LeaseLost, wait_for_release
+from app.services.pay_jobs import enqueue_sync_job
+from app.services.pay_ledger import refresh_pay_ledger
+from app.services.pay_adjustments import AdjustmentResolver, adjustment_entry, adjustment_terms
+from app.services.pay_simulation import HypotheticalAdjustment, get_hours_matrix, simulate
+from app.services.pay_weeks import bson_date, clear_dirty_weeks, get_dirty_weeks
+from app.services.shift_hours import SHIFT_MINUTES_EXPR, shift_minutes
 from app.services.system_settings import get_current_date
 from app.utils.deps import require_admin, get_current_user
+from app.utils.pagination import SortKey, cursor_values, decode_cursor, encode_cursor, keyset_filter
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
+# Server error code for "Transaction numbers are only allowed on a replica set member or mongos".
+ILLEGAL_OPERATION = 20
 
-def _week_range(reference: date) -> Tuple[date, date]:
-    days_since_friday = (reference.weekday() - 4) % 7
-    week_end = reference - timedelta(days=days_since_friday)
-    week_start = week_end - timedelta(days=6)
-    return week_start, week_end
+# How often a leased sync looks for a lost lease while weeks are running.
+LEASE_CHECK_SECONDS = 1.0
 
 
-def _parse_shift_hours(shift: Shift) -> float:
-    start_dt = datetime.strptime(f'{shift.shift_date} {shift.start_time}', '%Y-%m-%d %H:%M')
-    end_dt = datetime.strptime(f'{shift.shift_date} {shift.end_time}', '%Y-%m-%d %H:%M')
-    if end_dt < start_dt:
-        return 0.0
-    hours = (end_dt - start_dt).total_seconds() / 3600
-    return max(hours, 0.0)
+# Sums whole minutes per employee so the server-side and Python paths agree exactly.
+SHIFT_MINUTES_PIPELINE = [
+    {'$group': {'_id': '$employee_id', 'minutes': {'$sum': SHIFT_MINUTES_EXPR}}},
+]
 
 
-async def _calculate_hours_by_employee(week_start: date, week_end: date) -> Dict[ObjectId, float]:
-    hours: Dict[ObjectId, float] = defaultdict(float)
-    shifts = await Shift.find(
+def _completed_shifts_query(week_start: date, week_end: date):
+    return Shift.find(
         Shift.shift_date >= week_start,
         Shift.shift_date <= week_end,
         Shift.status == 'completed',
-    ).to_list()
+    )
+
+
+async def _calculate_hours_by_employee_python(week_start: date, week_end: date) -> Dict[ObjectId, float]:
+    minutes: Dict[ObjectId, int] = defaultdict(int)
+    shifts = await _completed_shifts_query(week_start, week_end).to_list()
     for shift in shifts:
-        hours[shift.employee_id] += _parse_shift_hours(shift)
-    return hours
+        minutes[shift.employee_id] += shift_minutes(shift)
+    return {employee_id: total / 60 for employee_id, total in minutes.items()}
+
+
+async def _calculate_hours_by_employee_aggregated(week_start: date, week_end: date) -> Dict[ObjectId, float]:
+    rows = await _completed_shifts_query(week_start, week_end).aggregate(SHIFT_MINUTES_PIPELINE).to_list()
+    return {row['_id']: int(row['minutes']) / 60 for row in rows}
+
+
+async def _calculate_hours_by_employee(week_start: date, week_end: date) -> Dict[ObjectId, float]:
+    if settings.PAY_HOURS_AGGREGATION:
+        try:
+            return await _calculate_hours_by_employee_aggregated(week_start, week_end)
+        except OperationFailure as exc:
+            # Malformed legacy time strings or servers without $toInt.
+            logger.warning('Shift hours aggregation failed, using Python fallback: %s', exc)
+    return await _calculate_hours_by_employee_python(week_start, week_end)
 
 
 def _calculate_amount(hours: float, pay_rate: float) -> float:
@@ -59,45 +102,20 @@ def _calculate_amount(hours: float, pay_rate: float) -> float:
     return round(amount, 2), round(base_pay, 2), round(overtime_pay, 2)
 
 
-def _effective_today(start: date | None, end: date | None, today: date) -> bool:
-    if start and today < start:
-        return False
-    if end and today > end:
-        return False
-    return True
-
-
-async def _compute_adjustments(user_id: ObjectId, gross: float, overtime_pay: float, today: date) -> tuple[list[dict], float]:
+def _compute_adjustments(
+    resolver: AdjustmentResolver,
+    user_id: ObjectId,
+    gross: float,
+    overtime_pay: float,
+    today: date,
+) -> tuple[list[dict], float]:
     adjustments: list[dict] = []
     net_delta = 0.0
 
-    types = await AdjustmentType.find().to_list()
-    active_global = {t.id: t for t in types if t.applies_globally and _effective_today(t.effective_start, t.effective_end, today)}
-
-    assignments = await EmployeeAdjustment.find(
-        EmployeeAdjustment.employee_id == user_id,
-        EmployeeAdjustment.status == "active",
-    ).to_list()
-
-    # Remove globals if replaced
-    replaced_ids = {a.adjustment_type_id for a in assignments if a.replace_global}
-    for rid in replaced_ids:
-        active_global.pop(rid, None)
-
-    applicable: list[tuple[AdjustmentType, EmployeeAdjustment | None]] = []
-    for t in active_global.values():
-        applicable.append((t, None))
-    for a in assignments:
-        t = next((x for x in types if x.id == a.adjustment_type_id), None)
-        if not t:
-            continue
-        if not _effective_today(a.effective_start, a.effective_end, today):
-            continue
-        applicable.append((t, a))
+    applicable = resolver.applicable(user_id, today)
 
     for t, a in applicable:
-        rate = a.override_rate_or_amount if a and a.override_rate_or_amount is not None else t.rate_or_amount
-        cap = a.override_cap if a and a.override_cap is not None else t.cap_per_period
+        rate, cap = adjustment_terms(t, a)
         base_amount = overtime_pay if t.apply_on == "overtime_only" else gross
         value = rate if t.mode == "flat" else (base_amount * (rate / 100.0))
         value = round(value, 2)
@@ -107,28 +125,59 @@ async def _compute_adjustments(user_id: ObjectId, gross: float, overtime_pay: fl
             cap_hit = True
         sign = 1 if t.direction == "add" else -1
         net_delta += sign * value
-        adjustments.append(
-            {
-                "name": t.name,
-                "direction": t.direction,
-                "mode": t.mode,
-                "rate_or_amount": rate,
-                "apply_on": t.apply_on,
-                "overtime_rule": t.overtime_rule,
-                "cap_per_period": cap,
-                "amount_applied": value,
-                "cap_hit": cap_hit,
-            }
-        )
+        adjustments.append(adjustment_entry(t, rate, cap, value, cap_hit))
 
     return adjustments, round(net_delta, 2)
 
 
-def _week_key(reference: date) -> Tuple[date, date]:
-    return _week_range(reference)
-
-
-async def _sync_pay_records(week_start: date, week_end: date) -> int:
+def _compute_week_pay(
+    payable: list[tuple[ObjectId, float, float]],
+    resolver: AdjustmentResolver,
+    week_end: date,
+) -> list[tuple[float, float, list[dict]]]:
+    """Return (gross, net amount, adjustments) for each (employee_id, hours, pay_rate)."""
+    if len(payable) >= settings.PAY_VECTOR_MIN_EMPLOYEES:
+        week = pay_engine.compute_week_pay(
+            [hours for _, hours, _ in payable],
+            [pay_rate for _, _, pay_rate in payable],
+            [resolver.applicable(employee_id, week_end) for employee_id, _, _ in payable],
+        )
+        return list(zip(week.gross, week.net, week.adjustments))
+
+    results = []
+    for employee_id, hours, pay_rate in payable:
+        gross_amount, base_pay, overtime_pay = _calculate_amount(hours, pay_rate)
+        adjustments, delta = _compute_adjustments(resolver, employee_id, gross_amount, overtime_pay, week_end)
+        results.append((gross_amount, round(gross_amount + delta, 2), adjustments))
+    return results
+
+
+@dataclass
+class PayWriteCounts:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+
+async def _bulk_write_pay_approvals(operations: list) -> PayWriteCounts:
+    counts = PayWriteCounts()
+    if not operations:
+        return counts
+    collection = PayApprove.get_motor_collection()
+    chunk_size = max(settings.PAY_SYNC_BULK_CHUNK_SIZE, 1)
+    for offset in range(0, len(operations), chunk_size):
+        result = await collection.bulk_write(operations[offset:offset + chunk_size], ordered=True)
+        counts.inserted += result.upserted_count
+        counts.updated += result.modified_count
+        counts.deleted += result.deleted_count
+    return counts
+
+
+async def _sync_pay_records(
+    week_start: date,
+    week_end: date,
+    resolver: AdjustmentResolver | None = None,
+) -> int:
     hours_by_employee = await _calculate_hours_by_employee(week_start, week_end)
     existing_approved = await Pay.find(
         Pay.week_start == week_start,
@@ -143,18 +192,18 @@ async def _sync_pay_records(week_start: date, week_end: date) -> int:
     ).to_list()
     existing_by_user = {record.user_id: record for record in existing_records}
     employee_ids = list(hours_by_employee.keys())
-    generated = 0
-
-    if not employee_ids:
-        # Clean up orphaned pending records if nobody worked.
-        for record in existing_records:
-            if record.status == 'pending':
-                await record.delete()
-        return generated
-
-    employees = await User.find({'_id': {'$in': employee_ids}}).to_list()
-    employee_map = {employee.id: employee for employee in employees}
-
+    operations: list = []
+
+    if employee_ids:
+        employees = await User.find({'_id': {'$in': employee_ids}}).to_list()
+        employee_map = {employee.id: employee for employee in employees}
+        if resolver is None:
+            resolver = await AdjustmentResolver.load()
+    else:
+        employee_map = {}
+
+    now = datetime.now(timezone.utc)
+    payable: list[tuple[ObjectId, float, float]] = []
     for employee_id, hours in hours_by_employee.items():
         if hours <= 0:
             continue
@@ -164,60 +213,155 @@ async def _sync_pay_records(week_start: date, week_end: date) -> int:
         employee = employee_map.get(employee_id)
         if not employee:
             continue
-        gross_amount, base_pay, overtime_pay = _calculate_amount(hours, employee.pay_rate)
-        adjustments, delta = await _compute_adjustments(employee_id, gross_amount, overtime_pay, week_end)
-        amount = round(gross_amount + delta, 2)
+        payable.append((employee_id, hours, employee.pay_rate))
+
+    for (employee_id, hours, _), (gross_amount, amount, adjustments) in zip(
+        payable, _compute_week_pay(payable, resolver, week_end)
+    ):
+        rounded_hours = round(hours, 2)
         record = existing_by_user.get(employee_id)
         if record:
             if record.status in ['pending', 'held']:
-                updated = False
-                rounded_hours = round(hours, 2)
+                changes = {}
                 if abs(record.hours_worked - rounded_hours) > 0.001:
-                    record.hours_worked = rounded_hours
-                    updated = True
+                    changes['hours_worked'] = rounded_hours
                 if abs(record.amount - amount) > 0.01:
-                    record.amount = amount
-                    updated = True
+                    changes['amount'] = amount
                 if getattr(record, "gross_amount", None) is None or abs(record.gross_amount - gross_amount) > 0.01:
-                    record.gross_amount = gross_amount
-                    updated = True
-                record.adjustments = adjustments
-                if updated:
-                    await record.save()
+                    changes['gross_amount'] = gross_amount
+                if changes:
+                    changes['adjustments'] = adjustments
+                    changes['updated_at'] = now
+                    operations.append(UpdateOne({'_id': record.id}, {'$set': changes}))
         else:
-            record = PayApprove(
-                user_id=employee_id,
-                week_start=week_start,
-                week_end=week_end,
-                hours_worked=round(hours, 2),
-                gross_amount=gross_amount,
-                amount=amount,
-                adjustments=adjustments,
+            operations.append(
+                UpdateOne(
+                    {
+                        'user_id': employee_id,
+                        'week_start': bson_date(week_start),
+                        'week_end': bson_date(week_end),
+                    },
+                    {
+                        '$set': {
+                            'hours_worked': rounded_hours,
+                            'gross_amount': gross_amount,
+                            'amount': amount,
+                            'adjustments': adjustments,
+                            'updated_at': now,
+                        },
+                        '$setOnInsert': {
+                            'status': 'pending',
+                            'created_at': now,
+                        },
+                    },
+                    upsert=True,
+                )
             )
-            await record.insert()
-            generated += 1
 
+    # Clean up orphaned pending records for employees without hours this week.
     for record in existing_records:
         if record.user_id not in hours_by_employee and record.status == 'pending':
-            await record.delete()
+            operations.append(DeleteOne({'_id': record.id}))
+
+    counts = await _bulk_write_pay_approvals(operations)
+    if operations:
+        await refresh_pay_ledger([week_end])
+        logger.info(
+            'Pay sync %s..%s: %d ops, inserted=%d updated=%d deleted=%d',
+            week_start,
+            week_end,
+            len(operations),
+            counts.inserted,
+            counts.updated,
+            counts.deleted,
+        )
+    return counts.inserted
 
-    return generated
 
+@dataclass
+class PaySyncSummary:
+    week_ranges: Set[Tuple[date, date]] = field(default_factory=set)
+    generated: int = 0
+    failed_weeks: List[Tuple[date, date]] = field(default_factory=list)
 
-async def _sync_missing_from_completed_shifts() -> Tuple[Set[Tuple[date, date]], int]:
-    shifts = await Shift.find(Shift.status == 'completed').to_list()
-    if not shifts:
-        return set(), 0
 
-    week_ranges: Set[Tuple[date, date]] = set()
-    for shift in shifts:
-        week_ranges.add(_week_key(shift.shift_date))
+async def _sync_weeks(
+    week_ranges: List[Tuple[date, date]],
+    resolver: AdjustmentResolver,
+    concurrency: int,
+    lease: Optional[JobLease] = None,
+) -> PaySyncSummary:
+    """Sync independent weeks through a bounded pool, isolating per-week failures.
 
-    generated = 0
-    for week_start, week_end in week_ranges:
-        generated += await _sync_pay_records(week_start, week_end)
+    With a ``lease``, the run stops with LeaseLost once it is gone: weeks
+    still running are cancelled and awaited first, so nothing writes after
+    another worker may have taken over. Weeks not synced by then stay dirty.
+    """
+    summary = PaySyncSummary()
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(week: Tuple[date, date]) -> None:
+        async with semaphore:
+            if lease:
+                lease.check()
+            try:
+                generated = await _sync_pay_records(week[0], week[1], resolver)
+            except Exception:
+                logger.exception('Pay sync failed for week %s..%s', week[0], week[1])
+                summary.failed_weeks.append(week)
+                return
+        summary.week_ranges.add(week)
+        summary.generated += generated
+
+    async def watch(weeks: List[asyncio.Task]) -> None:
+        pending = set(weeks)
+        while pending:
+            lease.check()
+            _, pending = await asyncio.wait(pending, timeout=LEASE_CHECK_SECONDS)
+
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            weeks = [tasks.create_task(run(week)) for week in week_ranges]
+            if lease:
+                tasks.create_task(watch(weeks))
+    except* LeaseLost as lost:
+        raise lost.exceptions[0] from None
+    return summary
+
+
+async def _sync_missing_from_completed_shifts(
+    concurrency: int | None = None,
+    lease: Optional[JobLease] = None,
+) -> PaySyncSummary:
+    """Recompute pay approvals for every week flagged in the dirty-week ledger."""
+    dirty_weeks = await get_dirty_weeks()
+    if not dirty_weeks:
+        return PaySyncSummary()
+
+    week_ranges = sorted({(entry.week_start, entry.week_end) for entry in dirty_weeks})
+    if lease:
+        await lease.set_status(f'Syncing {len(week_ranges)} pay weeks')
+
+    # Adjustment types and assignments are shared across every week of the run.
+    resolver = await AdjustmentResolver.load()
+    summary = await _sync_weeks(
+        week_ranges,
+        resolver,
+        concurrency if concurrency is not None else settings.PAY_SYNC_CONCURRENCY,
+        lease,
+    )
 
-    return week_ranges, generated
+    # Failed weeks stay dirty so the next sync retries them.
+    await clear_dirty_weeks(
+        entry for entry in dirty_weeks if (entry.week_start, entry.week_end) in summary.week_ranges
+    )
+    logger.info(
+        'Pay sync processed %d weeks (%d failed), generated %d records',
+        len(summary.week_ranges),
+        len(summary.failed_weeks),
+        summary.generated,
+    )
+    return summary
 
 
 async def _latest_completed_shift_date() -> date | None:
@@ -230,8 +374,45 @@ async def _latest_pay_week_end() -> date | None:
     return latest[0].week_end if latest else None
 
 
+def _lease_conflict(held: LeaseHeld | LeaseLost) -> HTTPException:
+    return HTTPException(status_code=409, detail=held.describe(), headers={'Retry-After': '5'})
+
+
+async def _run_pay_sync_job(job: str, admin: User, wait: bool, run):
+    """Run ``run(lease)`` under the cluster-wide pay sync lease.
+
+    When another worker holds the lease, respond 409 with its status, or with
+    ``wait`` block until it finishes and reuse its result if it ran the same job.
+    Losing the lease part way also responds 409; the unsynced weeks stay dirty.
+    """
+    for attempt in range(2):
+        try:
+            async with JobLease(PAY_SYNC_LOCK, job=job, holder=admin.username) as lease:
+                response = await run(lease)
+                lease.result = response.model_dump(mode='json')
+                return response
+        except LeaseLost as lost:
+            raise _lease_conflict(lost)
+        except LeaseHeld as held:
+            if not wait or attempt:
+                raise _lease_conflict(held)
+            finished = await wait_for_release(held)
+            if finished is None:
+                raise _lease_conflict(held)
+            if finished.owner == held.lock.owner and finished.job == job and finished.result is not None:
+                return finished.result
+            # A different job ran (or its worker died); run ours, most weeks are already clean.
+
+
 @router.post('/generate', response_model=PayGenerateResponse)
-async def generate_pay_records(admin: User = Depends(require_admin)):
+async def generate_pay_records(
+    wait: bool = Query(False, description='Wait for a sync already running elsewhere instead of failing with 409'),
+    admin: User = Depends(require_admin),
+):
+    return await _run_pay_sync_job('pay.generate', admin, wait, _generate_pay_records)
+
+
+async def _generate_pay_records(lease: JobLease) -> PayGenerateResponse:
     latest_shift_date = await _latest_completed_shift_date()
     if not latest_shift_date:
         return PayGenerateResponse(generated=0, weeks_processed=0)
@@ -243,28 +424,109 @@ async def generate_pay_records(admin: User = Depends(require_admin)):
             # Shifts already covered within the last payroll week; skip generation
             return PayGenerateResponse(generated=0, weeks_processed=0)
 
-    week_ranges, generated = await _sync_missing_from_completed_shifts()
-    return PayGenerateResponse(generated=generated, weeks_processed=len(week_ranges))
+    summary = await _sync_missing_from_completed_shifts(lease=lease)
+    return PayGenerateResponse(
+        generated=summary.generated,
+        weeks_processed=len(summary.week_ranges),
+        failed_weeks=len(summary.failed_weeks),
+    )
+
+
+def _parse_object_ids(values: list[str], label: str) -> list[ObjectId]:
+    try:
+        return [ObjectId(value) for value in values]
+    except Exception:
+        raise HTTPException(status_code=400, detail=f'Invalid {label} ID format')
+
+
+@router.post('/simulate', response_model=PaySimulationResponse)
+async def simulate_pay_changes(payload: PaySimulationRequest, admin: User = Depends(require_admin)):
+    """
+    Estimate what hypothetical pay rate and adjustment changes would cost over
+    the last N pay weeks. Nothing is written; amounts are net pay per week.
+    """
+    rate_changes = dict(
+        zip(
+            _parse_object_ids([change.employee_id for change in payload.rate_changes], 'employee'),
+            [change.pay_rate for change in payload.rate_changes],
+        )
+    )
+    hypothetical = []
+    for adjustment in payload.adjustments:
+        employee_ids = None
+        if adjustment.employee_ids is not None:
+            employee_ids = set(_parse_object_ids(adjustment.employee_ids, 'employee'))
+        hypothetical.append(
+            HypotheticalAdjustment(
+                adjustment_type=AdjustmentType(**adjustment.model_dump(exclude={'employee_ids'})),
+                employee_ids=employee_ids,
+            )
+        )
+
+    matrix = await get_hours_matrix(payload.weeks, await get_current_date())
+    employees = await User.find({'_id': {'$in': matrix.employee_ids}}).to_list()
+    employee_map = {employee.id: employee for employee in employees}
+    result = simulate(
+        matrix,
+        {employee.id: employee.pay_rate for employee in employees},
+        rate_changes,
+        await AdjustmentResolver.load(),
+        hypothetical,
+    )
+
+    week_baseline = result.baseline.sum(axis=0)
+    week_scenario = result.scenario.sum(axis=0)
+    employee_baseline = result.baseline.sum(axis=1)
+    employee_scenario = result.scenario.sum(axis=1)
+    baseline_total = float(week_baseline.sum())
+    scenario_total = float(week_scenario.sum())
+
+    return PaySimulationResponse(
+        baseline_total=round(baseline_total, 2),
+        scenario_total=round(scenario_total, 2),
+        delta_total=round(scenario_total - baseline_total, 2),
+        weeks=[
+            PaySimulationWeek(
+                week_start=week_start,
+                week_end=week_end,
+                baseline=round(float(week_baseline[index]), 2),
+                scenario=round(float(week_scenario[index]), 2),
+                delta=round(float(week_scenario[index] - week_baseline[index]), 2),
+            )
+            for index, (week_start, week_end) in enumerate(result.weeks)
+        ],
+        employees=[
+            PaySimulationEmployee(
+                employee_id=str(employee_id),
+                employee_name=employee_map[employee_id].name,
+                baseline=round(float(employee_baseline[index]), 2),
+                scenario=round(float(employee_scenario[index]), 2),
+                delta=round(float(employee_scenario[index] - employee_baseline[index]), 2),
+            )
+            for index, employee_id in enumerate(result.employee_ids)
+            if employee_id in employee_map
+        ],
+    )
 
 
-@router.get('/my', response_model=List[PayRecordResponse])
+@router.get('/my', response_model=List[PayRecordSummaryResponse])
 async def get_my_pay_records(current_user: User = Depends(get_current_user)):
+    """Approved pay history without adjustment details; see ``/pay/my/{pay_id}``."""
     records = await Pay.find(
         Pay.user_id == current_user.id,
         Pay.status == 'approved'
-    ).sort("-week_end").to_list()
-    
+    ).sort("-week_end").project(PaySummary).to_list()
+
     return [
-        PayRecordResponse(
+        PayRecordSummaryResponse(
             id=str(record.id),
             user_id=str(record.user_id),
             employee_name=current_user.name,
             week_start=record.week_start,
             week_end=record.week_end,
             hours_worked=record.hours_worked,
-            gross_amount=getattr(record, "gross_amount", record.amount),
+            gross_amount=record.gross_amount,
             amount=record.amount,
-            adjustments=getattr(record, "adjustments", []),
             status=record.status,
             created_at=record.created_at,
         )
@@ -272,20 +534,72 @@ async def get_my_pay_records(current_user: User = Depends(get_current_user)):
     ]
 
 
+@router.get('/my/adjustment-totals', response_model=List[PayAdjustmentTotal])
+async def get_my_adjustment_totals(
+    year: int = Query(..., ge=1900, le=9999),
+    current_user: User = Depends(get_current_user),
+):
+    """Net amount per adjustment name over approved pay weeks ending in ``year``."""
+    signed_amount = {
+        '$cond': [
+            {'$eq': ['$adjustments.direction', 'add']},
+            '$adjustments.amount_applied',
+            {'$multiply': [-1, '$adjustments.amount_applied']},
+        ]
+    }
+    rows = await Pay.find(
+        Pay.user_id == current_user.id,
+        Pay.status == 'approved',
+        {'week_end': {'$gte': bson_date(date(year, 1, 1)), '$lte': bson_date(date(year, 12, 31))}},
+    ).aggregate(
+        [
+            {'$unwind': '$adjustments'},
+            {'$group': {'_id': '$adjustments.name', 'amount': {'$sum': signed_amount}}},
+            {'$sort': {'_id': 1}},
+        ]
+    ).to_list()
+
+    return [
+        PayAdjustmentTotal(
+            name=row['_id'],
+            direction='add' if row['amount'] >= 0 else 'deduct',
+            amount=round(abs(row['amount']), 2),
+        )
+        for row in rows
+    ]
+
+
 @router.get('/my/{pay_id}', response_model=PayRecordResponse)
 async def get_my_pay_record(pay_id: str, current_user: User = Depends(get_current_user)):
     try:
-        record = await Pay.get(ObjectId(pay_id))
+        record = await Pay.find_one({'_id': ObjectId(pay_id), 'user_id': current_user.id})
     except Exception:
         record = None
 
-    if not record or record.user_id != current_user.id:
+    if not record:
         raise HTTPException(status_code=404, detail='Pay record not found')
 
+    return _pay_record_response(record, current_user.name)
+
+
+PENDING_SORT: List[SortKey] = [
+    ('status', ASCENDING),
+    ('week_end', DESCENDING),
+    ('created_at', ASCENDING),
+    ('_id', ASCENDING),
+]
+APPROVED_SORT: List[SortKey] = [
+    ('week_end', DESCENDING),
+    ('created_at', DESCENDING),
+    ('_id', DESCENDING),
+]
+
+
+def _pay_record_response(record, employee_name: str) -> PayRecordResponse:
     return PayRecordResponse(
         id=str(record.id),
         user_id=str(record.user_id),
-        employee_name=current_user.name,
+        employee_name=employee_name,
         week_start=record.week_start,
         week_end=record.week_end,
         hours_worked=record.hours_worked,
@@ -297,75 +611,137 @@ async def get_my_pay_record(pay_id: str, current_user: User = Depends(get_curren
     )
 
 
-@router.get('/pending', response_model=List[PayRecordResponse])
-async def list_pending_pay_records(admin: User = Depends(require_admin)):
-    pending_records = await PayApprove.find(
-        {"status": {"$in": ["pending", "held"]}},
-    ).sort("+status", "-week_end", "+created_at").to_list()
+async def _employee_names(records) -> Dict[ObjectId, str]:
+    user_ids = list({record.user_id for record in records})
+    users = await User.find({'_id': {'$in': user_ids}}).to_list()
+    return {user.id: user.name for user in users}
 
-    if not pending_records:
-        return []
 
-    user_ids = [record.user_id for record in pending_records]
-    users = await User.find({'_id': {'$in': user_ids}}).to_list()
-    user_map = {user.id: user for user in users}
+async def _stream_pay_records(query, sort: List[SortKey], limit: Optional[int]):
+    """Yield NDJSON lines, resolving employee names once per batch of records."""
+    batch = []
+    sent = 0
+    last = None
 
-    return [
-        PayRecordResponse(
-            id=str(record.id),
-            user_id=str(record.user_id),
-            employee_name=user_map.get(record.user_id).name if user_map.get(record.user_id) else 'Unknown',
-            week_start=record.week_start,
-            week_end=record.week_end,
-            hours_worked=record.hours_worked,
-            gross_amount=getattr(record, "gross_amount", record.amount),
-            amount=record.amount,
-            adjustments=getattr(record, "adjustments", []),
-            status=record.status,
-            created_at=record.created_at,
+    async def flush():
+        names = await _employee_names(batch)
+        lines = ''.join(
+            _pay_record_response(record, names.get(record.user_id, 'Unknown')).model_dump_json() + '\n'
+            for record in batch
         )
-        for record in pending_records
-    ]
+        batch.clear()
+        return lines
+
+    async for record in query:
+        if limit is not None and sent == limit:
+            # A record beyond the page exists; tell the client where to resume.
+            if batch:
+                yield await flush()
+            yield json.dumps({'next_cursor': encode_cursor(cursor_values(last, sort))}) + '\n'
+            return
+        batch.append(record)
+        sent += 1
+        last = record
+        if len(batch) >= settings.PAY_STREAM_BATCH_SIZE:
+            yield await flush()
+    if batch:
+        yield await flush()
+
+
+async def _list_pay_records(
+    model,
+    base_query: dict,
+    sort: List[SortKey],
+    response: Response,
+    limit: Optional[int],
+    cursor: Optional[str],
+    format: str,
+):
+    query = base_query
+    if cursor:
+        query = {'$and': [base_query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+    find = model.find(query).sort(sort)
+    if limit is not None:
+        # One extra record tells us whether another page exists.
+        find = find.limit(limit + 1)
+
+    if format == 'ndjson':
+        return StreamingResponse(_stream_pay_records(find, sort, limit), media_type='application/x-ndjson')
+
+    records = await find.to_list()
+    if limit is not None and len(records) > limit:
+        records = records[:limit]
+        response.headers['X-Next-Cursor'] = encode_cursor(cursor_values(records[-1], sort))
+    if not records:
+        return []
 
+    names = await _employee_names(records)
+    return [_pay_record_response(record, names.get(record.user_id, 'Unknown')) for record in records]
 
-@router.get('/approved', response_model=List[PayRecordResponse])
-async def list_approved_pay_records(admin: User = Depends(require_admin)):
-    approved_records = await Pay.find(Pay.status == 'approved').sort("-week_end", "-created_at").to_list()
 
-    if not approved_records:
-        return []
+@router.get('/pending', response_model=List[PayRecordResponse])
+async def list_pending_pay_records(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: Literal['json', 'ndjson'] = 'json',
+    admin: User = Depends(require_admin),
+):
+    """
+    Pending and held pay records, held first, then newest week first.
 
-    user_ids = [record.user_id for record in approved_records]
-    users = await User.find({'_id': {'$in': user_ids}}).to_list()
-    user_map = {user.id: user for user in users}
+    Without ``limit`` every record is returned. With ``limit`` the next page's
+    cursor is sent in the ``X-Next-Cursor`` header (or as a trailing
+    ``next_cursor`` line in NDJSON mode) and passed back as ``cursor``.
+    """
+    return await _list_pay_records(
+        PayApprove,
+        {"status": {"$in": ["pending", "held"]}},
+        PENDING_SORT,
+        response,
+        limit,
+        cursor,
+        format,
+    )
 
-    return [
-        PayRecordResponse(
-            id=str(record.id),
-            user_id=str(record.user_id),
-            employee_name=user_map.get(record.user_id).name if user_map.get(record.user_id) else 'Unknown',
-            week_start=record.week_start,
-            week_end=record.week_end,
-            hours_worked=record.hours_worked,
-            gross_amount=getattr(record, "gross_amount", record.amount),
-            amount=record.amount,
-            adjustments=getattr(record, "adjustments", []),
-            status=record.status,
-            created_at=record.created_at,
-        )
-        for record in approved_records
-    ]
+
+@router.get('/approved', response_model=List[PayRecordResponse])
+async def list_approved_pay_records(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: Literal['json', 'ndjson'] = 'json',
+    admin: User = Depends(require_admin),
+):
+    """Approved pay history, newest week first. Paginates like ``/pay/pending``."""
+    return await _list_pay_records(
+        Pay,
+        {"status": "approved"},
+        APPROVED_SORT,
+        response,
+        limit,
+        cursor,
+        format,
+    )
 
 
 @router.post('/approve-missing', response_model=PaySyncApproveResponse)
-async def approve_missing_pay_records(admin: User = Depends(require_admin)):
+async def approve_missing_pay_records(
+    wait: bool = Query(False, description='Wait for a sync already running elsewhere instead of failing with 409'),
+    admin: User = Depends(require_admin),
+):
     """
     Sync pay records for all completed shifts (across all weeks).
     Newly created records remain pending; held records are untouched.
     """
-    week_ranges, _ = await _sync_missing_from_completed_shifts()
+    return await _run_pay_sync_job('pay.approve-missing', admin, wait, _approve_missing_pay_records)
+
+
+async def _approve_missing_pay_records(lease: JobLease) -> PaySyncApproveResponse:
+    summary = await _sync_missing_from_completed_shifts(lease=lease)
+    week_ranges = summary.week_ranges
     if not week_ranges:
-        return PaySyncApproveResponse(synced_weeks=0, approved=0)
+        return PaySyncApproveResponse(synced_weeks=0, approved=0, failed_weeks=len(summary.failed_weeks))
 
     week_starts = [ws for ws, _ in week_ranges]
     week_ends = [we for _, we in week_ranges]
@@ -374,40 +750,179 @@ async def approve_missing_pay_records(admin: User = Depends(require_admin)):
         {"status": "pending", "week_start": {"$in": week_starts}, "week_end": {"$in": week_ends}}
     ).count()
 
-    return PaySyncApproveResponse(synced_weeks=len(week_ranges), approved=0)
+    return PaySyncApproveResponse(
+        synced_weeks=len(week_ranges),
+        approved=0,
+        failed_weeks=len(summary.failed_weeks),
+    )
 
 
-@router.post('/approve-all', response_model=PayApproveResponse)
-async def approve_all_pay_records(admin: User = Depends(require_admin)):
-    # Approve every pending record (all weeks). Held records are skipped.
-    pending = await PayApprove.find({"status": "pending"}).to_list()
+def _pay_job_response(job: PayJob) -> PayJobResponse:
+    return PayJobResponse(
+        id=str(job.id),
+        kind=job.kind,
+        state=job.state,
+        weeks_total=job.weeks_total,
+        weeks_done=job.weeks_done,
+        weeks_failed=job.weeks_failed,
+        generated=job.generated,
+        attempts=job.attempts,
+        error=job.error,
+        requested_by=str(job.requested_by) if job.requested_by else None,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
 
-    if not pending:
-        raise HTTPException(status_code=400, detail='No pending pay records to approve')
 
-    for record in pending:
-        approved = Pay(
-            user_id=record.user_id,
-            week_start=record.week_start,
-            week_end=record.week_end,
-            hours_worked=record.hours_worked,
-            gross_amount=getattr(record, "gross_amount", record.amount),
-            amount=record.amount,
-            adjustments=getattr(record, "adjustments", []),
-            status='approved',
-            approved_by=admin.id,
+@router.post('/jobs', response_model=PayJobResponse, status_code=202)
+async def create_pay_job(admin: User = Depends(require_admin)):
+    """
+    Queue a background sync of every dirty pay week, like ``/pay/approve-missing``.
+    If a sync job is already queued or running, that job is returned instead.
+    Poll ``/pay/jobs/{job_id}`` for progress.
+    """
+    job = await enqueue_sync_job(admin.id)
+    return _pay_job_response(job)
+
+
+@router.get('/jobs/{job_id}', response_model=PayJobResponse)
+async def get_pay_job(job_id: str, admin: User = Depends(require_admin)):
+    try:
+        job = await PayJob.get(ObjectId(job_id))
+    except Exception:
+        job = None
+
+    if not job:
+        raise HTTPException(status_code=404, detail='Pay job not found')
+
+    return _pay_job_response(job)
+
+
+def _approved_from(record: PayApprove, admin_id: ObjectId) -> Pay:
+    return Pay(
+        user_id=record.user_id,
+        week_start=record.week_start,
+        week_end=record.week_end,
+        hours_worked=record.hours_worked,
+        gross_amount=getattr(record, "gross_amount", record.amount),
+        amount=record.amount,
+        adjustments=getattr(record, "adjustments", []),
+        status='approved',
+        approved_by=admin_id,
+    )
+
+
+@dataclass
+class ApproveChunk:
+    approved: int = 0
+    skipped: int = 0
+    last_id: ObjectId | None = None
+
+
+async def _approve_pending_chunk(admin_id: ObjectId, after: ObjectId | None, session=None) -> ApproveChunk:
+    """Move the next chunk of pending approvals into ``pay``.
+
+    Only records still exactly as read are removed from ``payapprove``; the
+    copies of any held or recomputed in between are withdrawn again, so they
+    stay in the queue (without a transaction nothing else guards that gap).
+    """
+    query = {"status": "pending"}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    chunk = await PayApprove.find(query, session=session).sort("+_id").limit(
+        settings.PAY_APPROVE_CHUNK_SIZE
+    ).to_list()
+    if not chunk:
+        return ApproveChunk()
+
+    copies = [_approved_from(record, admin_id) for record in chunk]
+    for copy in copies:
+        copy.id = ObjectId()
+    await Pay.insert_many(copies, session=session)
+    collection = PayApprove.get_motor_collection()
+    result = await collection.delete_many(
+        {'$or': [{'_id': record.id, 'status': 'pending', 'updated_at': record.updated_at} for record in chunk]},
+        session=session,
+    )
+
+    skipped: list[ObjectId] = []
+    if result.deleted_count < len(chunk):
+        remaining = {
+            doc['_id']
+            async for doc in collection.find({'_id': {'$in': [record.id for record in chunk]}}, {'_id': 1}, session=session)
+        }
+        skipped = [record.id for record in chunk if record.id in remaining]
+        await Pay.get_motor_collection().delete_many(
+            {'_id': {'$in': [copy.id for record, copy in zip(chunk, copies) if record.id in remaining]}},
+            session=session,
         )
-        await approved.insert()
-        await record.delete()
+        logger.warning('Approve-all skipped %d pay records changed during approval: %s', len(skipped), skipped)
+    return ApproveChunk(approved=len(chunk) - len(skipped), skipped=len(skipped), last_id=chunk[-1].id)
 
-    # Return a simple response referencing current pay period
-    week_start, week_end = _week_range(await get_current_date())
-    return PayApproveResponse(
-        id='bulk',
+
+async def _approve_all_pending(admin_id: ObjectId) -> ApproveChunk:
+    total = ApproveChunk()
+    async with await database.client.start_session() as session:
+        while True:
+            result: dict = {}
+
+            async def run_chunk(txn_session) -> None:
+                result["chunk"] = await _approve_pending_chunk(admin_id, total.last_id, txn_session)
+
+            await session.with_transaction(run_chunk)
+            chunk = result["chunk"]
+            if chunk.last_id is None:
+                return total
+            total.approved += chunk.approved
+            total.skipped += chunk.skipped
+            total.last_id = chunk.last_id
+
+
+async def _approve_all_pending_without_transactions(admin_id: ObjectId) -> ApproveChunk:
+    total = ApproveChunk()
+    while True:
+        chunk = await _approve_pending_chunk(admin_id, total.last_id)
+        if chunk.last_id is None:
+            return total
+        total.approved += chunk.approved
+        total.skipped += chunk.skipped
+        total.last_id = chunk.last_id
+
+
+@router.post('/approve-all', response_model=PayBulkApproveResponse)
+async def approve_all_pay_records(admin: User = Depends(require_admin)):
+    """
+    Approve every pending record (all weeks) in chunks. Held records are skipped.
+    Each chunk is inserted into pay and removed from payapprove in one transaction.
+    Without transactions (standalone mongod) this needs PAY_APPROVE_WITHOUT_TRANSACTIONS.
+    """
+    pending_weeks = await PayApprove.get_motor_collection().distinct('week_end', {"status": "pending"})
+    if not pending_weeks:
+        raise HTTPException(status_code=400, detail='No pending pay records to approve')
+
+    try:
+        result = await _approve_all_pending(admin.id)
+    except OperationFailure as exc:
+        if exc.code != ILLEGAL_OPERATION:
+            raise
+        # Standalone mongod: transactions need a replica set.
+        if not settings.PAY_APPROVE_WITHOUT_TRANSACTIONS:
+            logger.error('Transactions unavailable, approve-all refused: %s', exc)
+            raise HTTPException(
+                status_code=503,
+                detail='Approving all pay needs MongoDB transactions (a replica set); '
+                'set PAY_APPROVE_WITHOUT_TRANSACTIONS to approve without them',
+            )
+        logger.warning('Transactions unavailable, approving pay without them: %s', exc)
+        result = await _approve_all_pending_without_transactions(admin.id)
+    await refresh_pay_ledger(pending_weeks)
+
+    return PayBulkApproveResponse(
+        approved=result.approved,
+        skipped=result.skipped,
         status='approved',
         approved_by=str(admin.id),
-        week_start=week_start,
-        week_end=week_end,
     )
 
 
@@ -425,7 +940,9 @@ async def hold_pay_record(pay_id: str, admin: User = Depends(require_admin)):
         raise HTTPException(status_code=400, detail='Approved records cannot be held')
 
     pay_record.status = 'pending' if pay_record.status == 'held' else 'held'
+    pay_record.updated_at = datetime.now(timezone.utc)
     await pay_record.save()
+    await refresh_pay_ledger([pay_record.week_end])
 
     return PayApproveResponse(
         id=str(pay_record.id),
@@ -448,19 +965,10 @@ async def approve_pay_record(pay_id: str, admin: User = Depends(require_admin)):
     if pay_record.status == 'approved':
         raise HTTPException(status_code=400, detail='Pay record already approved')
 
-    approved = Pay(
-        user_id=pay_record.user_id,
-        week_start=pay_record.week_start,
-        week_end=pay_record.week_end,
-        hours_worked=pay_record.hours_worked,
-        gross_amount=getattr(pay_record, "gross_amount", pay_record.amount),
-        amount=pay_record.amount,
-        adjustments=getattr(pay_record, "adjustments", []),
-        status='approved',
-        approved_by=admin.id,
-    )
+    approved = _approved_from(pay_record, admin.id)
     await approved.insert()
     await pay_record.delete()
+    await refresh_pay_ledger([pay_record.week_end])
 
     return PayApproveResponse(
         id=str(pay_record.id),
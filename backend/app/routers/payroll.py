@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from bson import ObjectId
 from typing import List
 from datetime import date, timedelta
@@ -6,20 +6,67 @@ from datetime import date, timedelta
 from app.models.user import User
 from app.models.payroll import Payroll
 from app.models.attendance import Attendance
-from app.schemas.payroll import PayrollResponse, PayrollApprove
+from app.models.job_lock import JobLock
+from app.models.scheduled_job_run import ScheduledJobRun
+from app.schemas.payroll import PayrollResponse, PayrollApprove, ScheduledJobStatus, SchedulerStatus
 from app.utils.deps import require_admin, get_current_user
+from app.services.pay_ledger import refresh_pay_ledger
+from app.services.job_lock import SCHEDULER_LEADER_LOCK, LeaseHeld, wait_for_release
 
 router = APIRouter()
 
 @router.post("/run")
-async def run_payroll(admin: User = Depends(require_admin)):
+async def run_payroll(
+    wait: bool = Query(False, description="Wait for a run already in progress instead of failing with 409"),
+    admin: User = Depends(require_admin),
+):
     """Manually trigger payroll generation (Admin only)."""
     from app.utils.scheduler import generate_payroll
     
-    await generate_payroll()
+    try:
+        await generate_payroll(holder=admin.username)
+    except LeaseHeld as held:
+        # Never start a second run for the same period; at most wait for the current one.
+        if not wait or await wait_for_release(held) is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=held.describe(),
+                headers={"Retry-After": "5"},
+            )
     
     return {"message": "Payroll generation completed"}
 
+@router.get("/schedule", response_model=SchedulerStatus)
+async def get_payroll_schedule(admin: User = Depends(require_admin)):
+    """Next and last runs of scheduled jobs, read from the shared job store (Admin only)."""
+    from app.utils.scheduler import read_scheduled_jobs
+    
+    leader = await JobLock.find_one(JobLock.name == SCHEDULER_LEADER_LOCK)
+    leader_active = leader is not None and leader.released_at is None
+    runs = {run.job_id: run for run in await ScheduledJobRun.find_all().to_list()}
+    
+    jobs = []
+    for job in await read_scheduled_jobs():
+        run = runs.get(job["id"])
+        jobs.append(
+            ScheduledJobStatus(
+                job_id=job["id"],
+                name=job["name"],
+                next_run_time=job["next_run_time"],
+                last_started_at=run.last_started_at if run else None,
+                last_finished_at=run.last_finished_at if run else None,
+                last_status=run.last_status if run else None,
+                last_detail=run.last_detail if run else None,
+                last_runner=run.last_runner if run else None,
+            )
+        )
+    
+    return SchedulerStatus(
+        leader=leader.holder if leader_active else None,
+        leader_expires_at=leader.expires_at if leader_active else None,
+        jobs=jobs,
+    )
+
 @router.get("/pending", response_model=List[PayrollResponse])
 async def get_pending_payrolls(admin: User = Depends(require_admin)):
     """Get all pending payroll records (Admin only)."""
@@ -73,6 +120,7 @@ async def approve_payroll(payroll_id: str, admin: User = Depends(require_admin))
     payroll.status = "approved"
     payroll.approved_by = admin.id
     await payroll.save()
+    await refresh_pay_ledger([payroll.period_end])
     
     # Get user name
     user = await User.get(payroll.user_id)
@@ -8,7 +8,6 @@ from bson import ObjectId
 
 from app.models.user import User
 from app.models.shift import Shift
-from app.models.attendance import Attendance
 from app.schemas.shift import (
     ShiftCreate,
     ShiftResponse,
@@ -17,15 +16,15 @@ from app.schemas.shift import (
 )
 from app.utils.deps import require_admin, get_current_user
 from app.services.system_settings import get_current_date, get_system_timezone
+from app.services.pay_weeks import mark_dates_dirty
+from app.services.attendance_daily import record_attendance_changes
+from app.services.attendance_store import save_completed_session
+from app.services.shift_hours import minute_of_day
 
 router = APIRouter()
 
-def _time_to_minutes(value: str) -> int:
-    hours, minutes = value.split(":")
-    return int(hours) * 60 + int(minutes)
-
 def _validate_time_window(start_time: str, end_time: str) -> None:
-    if _time_to_minutes(start_time) >= _time_to_minutes(end_time):
+    if minute_of_day(start_time) >= minute_of_day(end_time):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="End time must be later than start time",
@@ -70,26 +69,15 @@ async def _ensure_completed_shift_attendance(shift: Shift) -> None:
 
     hours = round((clock_out_dt - clock_in_dt).total_seconds() / 3600, 2)
 
-    existing = await Attendance.find_one(
-        Attendance.user_id == shift.employee_id,
-        Attendance.clock_in == clock_in_dt,
+    existing = await save_completed_session(
+        shift.employee_id, clock_in_dt, clock_out_dt, hours, shift.shift_date
     )
 
-    if existing:
-        existing.clock_out = clock_out_dt
-        existing.hours_worked = hours
-        existing.date = shift.shift_date
-        await existing.save()
-        return
-
-    attendance = Attendance(
-        user_id=shift.employee_id,
-        clock_in=clock_in_dt,
-        clock_out=clock_out_dt,
-        hours_worked=hours,
-        date=shift.shift_date,
-    )
-    await attendance.insert()
+    changes = [(shift.employee_id, shift.shift_date, hours, 1)]
+    if existing and existing.get("clock_out") is not None:
+        # Replaces a completed session: take its old hours off its old day.
+        changes.insert(0, (shift.employee_id, existing["date"], -(existing.get("hours_worked") or 0), -1))
+    await record_attendance_changes(changes)
 
 def _serialize_shift(shift: Shift, employee: Optional[User]) -> ShiftWithEmployeeResponse:
     display_name = employee.name if employee else "Unknown Employee"
@@ -160,6 +148,7 @@ async def create_shift(shift_data: ShiftCreate, admin: User = Depends(require_ad
     await shift.insert()
     if shift.status == "completed":
         await _ensure_completed_shift_attendance(shift)
+        await mark_dates_dirty([shift.shift_date])
     return _serialize_shift(shift, employee)
 
 @router.get("/shifts", response_model=List[ShiftWithEmployeeResponse])
@@ -218,6 +207,9 @@ async def update_shift(
         employee = await User.get(shift.employee_id)
         return _serialize_shift(shift, employee)
 
+    previous_date = shift.shift_date
+    previous_status = shift.status
+
     new_employee: Optional[User] = None
     if "employee_id" in update_values:
         new_employee = await _validate_employee(update_values["employee_id"])
@@ -243,6 +235,8 @@ async def update_shift(
     await shift.save()
     if shift.status == "completed":
         await _ensure_completed_shift_attendance(shift)
+    if "completed" in (previous_status, shift.status):
+        await mark_dates_dirty([previous_date, shift.shift_date])
 
     employee = new_employee or await User.get(shift.employee_id)
     return _serialize_shift(shift, employee)
@@ -14,7 +14,6 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 
 from app.models.user import User
 from app.models.shift import Shift
-from app.models.attendance import Attendance
 from app.models.deleted_employee import DeletedEmployee
 from app.schemas.user import (
     UserCreate,
@@ -27,6 +26,10 @@ from app.schemas.user import (
 from app.utils.security import hash_password
 from app.utils.deps import require_admin, get_current_user
 from app.services.system_settings import get_system_timezone
+from app.services.pay_weeks import mark_pay_approval_weeks_dirty
+from app.services.pay_ledger import LEDGER_USER_FIELDS, refresh_pay_ledger_for_employee
+from app.services.attendance_feed import broadcaster as attendance_feed
+from app.services.attendance_store import latest_completed
 
 router = APIRouter()
 EXPORT_HEADERS = ["Sr. No.", "Full Name", "Username", "Email", "Pay Rate"]
@@ -246,11 +249,8 @@ async def list_employee_management(admin: User = Depends(require_admin)):
     results: List[EmployeeSummary] = []
 
     for employee in employees:
-        last_clock = await Attendance.find(
-            Attendance.user_id == employee.id,
-            Attendance.clock_out != None  # type: ignore
-        ).sort("-clock_out").to_list(1)
-        last_attendance_out = last_clock[0].clock_out if last_clock else None
+        last_clock = await latest_completed(employee.id)
+        last_attendance_out = last_clock.clock_out if last_clock else None
 
         last_shift_out = await _latest_shift_clock_out(employee.id)
 
@@ -332,10 +332,23 @@ async def update_user(
     if not update_values:
         return _serialize_user(user)
 
+    pay_rate_changed = "pay_rate" in update_values and update_values["pay_rate"] != user.pay_rate
+    # The pay ledger files an employee's pay under their current department;
+    # only fields UserUpdate accepts can reach this check.
+    ledger_changed = any(
+        field in update_values and update_values[field] != getattr(user, field) for field in LEDGER_USER_FIELDS
+    )
+
     for field, value in update_values.items():
         setattr(user, field, value)
 
     await user.save()
+    if pay_rate_changed:
+        await mark_pay_approval_weeks_dirty(user.id)
+    if ledger_changed:
+        await refresh_pay_ledger_for_employee(user.id)
+    if "name" in update_values:
+        attendance_feed.forget_employee(user.id)
 
     return _serialize_user(user)
 
@@ -367,6 +380,8 @@ async def delete_user(
     await archived.insert()
 
     await user.delete()
+    # Their pay now reports under "Unassigned".
+    await refresh_pay_ledger_for_employee(user.id)
 
     return {"message": "Employee deleted and archived"}
 
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, date
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 class AttendanceStart(BaseModel):
     pass  # No input needed, uses current user and time
@@ -29,3 +29,25 @@ class AttendanceLogEntry(BaseModel):
     clock_out: Optional[datetime]
     expected_clock_out: datetime
     status: Literal["active", "completed"]
+
+class AttendanceEvent(BaseModel):
+    event_id: str = Field(..., min_length=8, max_length=128)
+    user_id: str
+    type: Literal["clock_in", "clock_out"]
+    timestamp: datetime
+    signature: str
+
+class AttendanceBatchRequest(BaseModel):
+    events: List[AttendanceEvent] = Field(..., min_length=1)
+
+class AttendanceEventResult(BaseModel):
+    event_id: str
+    status: Literal["accepted", "duplicate", "rejected"]
+    attendance_id: Optional[str] = None
+    detail: Optional[str] = None
+
+class AttendanceBatchResponse(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: int
+    results: List[AttendanceEventResult]
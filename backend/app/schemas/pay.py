@@ -1,9 +1,11 @@
 from datetime import date, datetime
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from app.schemas.adjustment import AdjustmentTypeCreate
 
-class PayRecordResponse(BaseModel):
+
+class PayRecordSummaryResponse(BaseModel):
     id: str
     user_id: str
     employee_name: str
@@ -12,11 +14,20 @@ class PayRecordResponse(BaseModel):
     hours_worked: float
     gross_amount: float
     amount: float
-    adjustments: list[dict]
     status: str
     created_at: datetime
 
 
+class PayRecordResponse(PayRecordSummaryResponse):
+    adjustments: list[dict]
+
+
+class PayAdjustmentTotal(BaseModel):
+    name: str
+    direction: str
+    amount: float
+
+
 class PayApproveResponse(BaseModel):
     id: str
     status: str
@@ -25,11 +36,77 @@ class PayApproveResponse(BaseModel):
     week_end: date
 
 
+class PayBulkApproveResponse(BaseModel):
+    approved: int
+    # Records held or recomputed while they were being approved; still in the queue.
+    skipped: int = 0
+    status: str
+    approved_by: str
+
+
 class PayGenerateResponse(BaseModel):
     generated: int
     weeks_processed: int
+    failed_weeks: int = 0
 
 
 class PaySyncApproveResponse(BaseModel):
     synced_weeks: int
     approved: int
+    failed_weeks: int = 0
+
+
+class PayJobResponse(BaseModel):
+    id: str
+    kind: str
+    state: str
+    weeks_total: int
+    weeks_done: int
+    weeks_failed: int
+    generated: int
+    attempts: int
+    error: Optional[str] = None
+    requested_by: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class PayRateChange(BaseModel):
+    employee_id: str
+    pay_rate: float = Field(..., ge=0)
+
+
+class HypotheticalAdjustmentType(AdjustmentTypeCreate):
+    # Limit the adjustment to these employees; omitted applies it to everyone.
+    employee_ids: Optional[list[str]] = None
+
+
+class PaySimulationRequest(BaseModel):
+    weeks: int = Field(8, ge=1, le=104)
+    rate_changes: list[PayRateChange] = Field(default_factory=list)
+    adjustments: list[HypotheticalAdjustmentType] = Field(default_factory=list)
+
+
+class PaySimulationWeek(BaseModel):
+    week_start: date
+    week_end: date
+    baseline: float
+    scenario: float
+    delta: float
+
+
+class PaySimulationEmployee(BaseModel):
+    employee_id: str
+    employee_name: str
+    baseline: float
+    scenario: float
+    delta: float
+
+
+class PaySimulationResponse(BaseModel):
+    baseline_total: float
+    scenario_total: float
+    delta_total: float
+    weeks: list[PaySimulationWeek]
+    employees: list[PaySimulationEmployee]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime, date
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 class PayrollResponse(BaseModel):
     id: str
@@ -16,3 +16,18 @@ class PayrollResponse(BaseModel):
 
 class PayrollApprove(BaseModel):
     pass  # No input needed, uses current admin user
+
+class ScheduledJobStatus(BaseModel):
+    job_id: str
+    name: Optional[str] = None
+    next_run_time: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_status: Optional[Literal["succeeded", "failed", "skipped"]] = None
+    last_detail: Optional[str] = None
+    last_runner: Optional[str] = None
+
+class SchedulerStatus(BaseModel):
+    leader: Optional[str] = None
+    leader_expires_at: Optional[datetime] = None
+    jobs: List[ScheduledJobStatus]
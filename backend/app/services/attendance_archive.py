@@ -0,0 +1,143 @@
+"""Hot/cold tiering for attendance history.
+
+Closed sessions whose attendance ``date`` is more than
+ATTENDANCE_ARCHIVE_AFTER_DAYS old move from ``attendance`` to
+``attendance_archive`` in throttled batches, keeping the hot collection and
+its indexes sized to what the API reads day to day. The archive is created
+with a stronger block compressor. ``app.services.attendance_store`` reads
+both tiers, so callers never need to know where a session lives.
+
+With ATTENDANCE_STORAGE="monthly" closed sessions already leave
+``attendance`` on clock-out and the job has little or nothing to move.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.attendance_archive import AttendanceArchive
+from app.services.attendance_store import DUPLICATE_KEY, SESSION_FIELDS, settle_closed_sessions
+from app.services.job_lock import ATTENDANCE_ARCHIVE_LOCK, JobLease
+from app.services.pay_weeks import bson_date
+from app.services.system_settings import get_current_date
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_archive_collection(database: AsyncIOMotorDatabase) -> None:
+    """Create the archive with ATTENDANCE_ARCHIVE_COMPRESSOR; compression is fixed at creation."""
+    name = AttendanceArchive.Settings.name
+    if await database.list_collection_names(filter={'name': name}):
+        return
+    compressor = settings.ATTENDANCE_ARCHIVE_COMPRESSOR
+    options = {}
+    if compressor and compressor != 'none':
+        options['storageEngine'] = {'wiredTiger': {'configString': f'block_compressor={compressor}'}}
+    try:
+        await database.create_collection(name, **options)
+    except CollectionInvalid:
+        pass  # another worker created it first
+    except OperationFailure as exc:
+        if not options:
+            raise
+        logger.warning('Creating %s with %s compression failed (%s); using the server default', name, compressor, exc)
+        try:
+            await database.create_collection(name)
+        except CollectionInvalid:
+            pass
+
+
+async def archive_attendance(
+    before: date,
+    batch_size: int,
+    pause: float = 0.0,
+    lease: Optional[JobLease] = None,
+) -> int:
+    """Move closed sessions dated before ``before`` into the archive; returns how many moved."""
+    hot = Attendance.get_motor_collection()
+    archive = AttendanceArchive.get_motor_collection()
+    query = {'date': {'$lt': bson_date(before)}, 'clock_out': {'$ne': None}}
+    moved = 0
+    while True:
+        docs = await hot.find(query, SESSION_FIELDS, sort=[('date', ASCENDING)], limit=batch_size).to_list(None)
+        if not docs:
+            return moved
+        if lease is not None:
+            lease.check()
+        archived_at = datetime.now(timezone.utc)
+        # Replace rather than insert: a rerun after an interrupted batch, or
+        # after an edit that kept a session hot, overwrites the older copy.
+        await archive.bulk_write(
+            [ReplaceOne({'_id': doc['_id']}, {**doc, 'archived_at': archived_at}, upsert=True) for doc in docs],
+            ordered=False,
+        )
+        # Only delete what is unchanged since it was copied; an edited session
+        # stays hot and is archived again on the next run.
+        result = await hot.bulk_write(
+            [
+                DeleteOne({
+                    '_id': doc['_id'],
+                    'clock_out': doc['clock_out'],
+                    'hours_worked': doc.get('hours_worked'),
+                    'date': doc['date'],
+                })
+                for doc in docs
+            ],
+            ordered=False,
+        )
+        moved += result.deleted_count
+        if result.deleted_count == 0:
+            return moved  # everything left is being edited; try again next run
+        if lease is not None:
+            await lease.set_status(f'Archived {moved} sessions dated before {before.isoformat()}')
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def restore_archived(batch_size: int, pause: float = 0.0, lease: Optional[JobLease] = None) -> int:
+    """Move every archived session back to ``attendance`` (and on to buckets in monthly mode)."""
+    hot = Attendance.get_motor_collection()
+    archive = AttendanceArchive.get_motor_collection()
+    restored = 0
+    while True:
+        docs = await archive.find({}, SESSION_FIELDS, limit=batch_size).to_list(None)
+        if not docs:
+            return restored
+        if lease is not None:
+            lease.check()
+        try:
+            await hot.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            # Still hot: the archive job copied it but had not deleted it yet.
+            if any(error['code'] != DUPLICATE_KEY for error in exc.details['writeErrors']):
+                raise
+        ids = [doc['_id'] for doc in docs]
+        await settle_closed_sessions({'_id': {'$in': ids}})
+        await archive.delete_many({'_id': {'$in': ids}})
+        restored += len(docs)
+        if lease is not None:
+            await lease.set_status(f'Restored {restored} archived sessions')
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def run_attendance_archive(holder: str = 'scheduler') -> int:
+    """Archive past the configured horizon under the archive lease; raises LeaseHeld if a run is in progress."""
+    if settings.ATTENDANCE_ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    async with JobLease(ATTENDANCE_ARCHIVE_LOCK, job='attendance.archive', holder=holder) as lease:
+        today = await get_current_date()
+        return await archive_attendance(
+            today - timedelta(days=settings.ATTENDANCE_ARCHIVE_AFTER_DAYS),
+            settings.ATTENDANCE_ARCHIVE_BATCH_SIZE,
+            settings.ATTENDANCE_ARCHIVE_PAUSE_SECONDS,
+            lease,
+        )
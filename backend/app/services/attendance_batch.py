@@ -0,0 +1,345 @@
+"""Batched clock events from offline kiosks and mobile retries.
+
+Every event carries a client timestamp, an idempotency key (``event_id``) and
+an HMAC-SHA256 signature over::
+
+    "{event_id}\\n{user_id}\\n{type}\\n{timestamp in epoch milliseconds}"
+
+keyed with ATTENDANCE_EVENT_SECRET. Events are paired per user in timestamp
+order against the sessions already stored, then written with one
+``insert_many``, one ``bulk_write`` and one shift ``update_many``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.attendance_event_receipt import AttendanceEventReceipt
+from app.models.shift import Shift
+from app.models.user import User
+from app.schemas.attendance import AttendanceEvent, AttendanceEventResult
+from app.services.attendance_daily import DailyChange, record_attendance_changes
+from app.services.attendance_feed import broadcaster
+from app.services.attendance_store import last_clock_outs, settle_closed_sessions
+from app.services.pay_weeks import bson_date, mark_dates_dirty
+from app.services.system_settings import get_system_timezone
+
+DUPLICATE_KEY = 11000
+
+
+def _epoch_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def event_signature(event_id: str, user_id: str, event_type: str, timestamp: datetime) -> str:
+    """Hex HMAC a client must send with the event; see the module docstring."""
+    message = f"{event_id}\n{user_id}\n{event_type}\n{_epoch_ms(timestamp)}"
+    return hmac.new(
+        settings.ATTENDANCE_EVENT_SECRET.encode(), message.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Aware UTC datetime truncated to the millisecond precision MongoDB stores."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def _hours_between(clock_in: datetime, clock_out: datetime) -> float:
+    return round((clock_out - clock_in).total_seconds() / 3600, 2)
+
+
+@dataclass
+class _Event:
+    index: int
+    event: AttendanceEvent
+    user_id: Optional[ObjectId] = None
+    timestamp: Optional[datetime] = None
+    status: Optional[str] = None
+    attendance_id: Optional[ObjectId] = None
+    detail: Optional[str] = None
+    claimed: bool = False
+    # Session as of this event, for the live feed.
+    record: Optional[dict] = None
+
+    def accept(self, attendance_id: ObjectId) -> None:
+        self.status, self.attendance_id, self.detail = 'accepted', attendance_id, None
+
+    def reject(self, detail: str) -> None:
+        self.status, self.attendance_id, self.detail = 'rejected', None, detail
+
+    def result(self) -> AttendanceEventResult:
+        return AttendanceEventResult(
+            event_id=self.event.event_id,
+            status=self.status,
+            attendance_id=str(self.attendance_id) if self.attendance_id else None,
+            detail=self.detail,
+        )
+
+
+def _validate(item: _Event, submitted_by: User, now: datetime) -> None:
+    event = item.event
+    expected = event_signature(event.event_id, event.user_id, event.type, event.timestamp)
+    if not hmac.compare_digest(expected, event.signature.lower()):
+        item.reject('Invalid signature')
+        return
+    if not ObjectId.is_valid(event.user_id):
+        item.reject('Invalid user ID format')
+        return
+    item.user_id = ObjectId(event.user_id)
+    if submitted_by.role != 'admin' and item.user_id != submitted_by.id:
+        item.reject('Cannot submit events for another user')
+        return
+    item.timestamp = _as_utc(event.timestamp)
+    if item.timestamp > now + timedelta(seconds=settings.ATTENDANCE_EVENT_MAX_SKEW_SECONDS):
+        item.reject('Timestamp is in the future')
+    # Keep a day of margin so a replay can never outlive its receipt.
+    elif item.timestamp < now - timedelta(days=settings.ATTENDANCE_EVENT_RETENTION_DAYS - 1):
+        item.reject('Event is too old to accept')
+
+
+async def _claim(items: List[_Event], submitted_by: User) -> None:
+    """Take the idempotency key of every valid event; replays become duplicates."""
+    by_key = {item.event.event_id: item for item in items}
+    for receipt in await AttendanceEventReceipt.find(
+        {'event_id': {'$in': list(by_key)}}
+    ).to_list():
+        item = by_key.pop(receipt.event_id)
+        item.status, item.attendance_id, item.detail = 'duplicate', receipt.attendance_id, receipt.detail
+    if not by_key:
+        return
+
+    pending = list(by_key.values())
+    received_at = datetime.now(timezone.utc)
+    operations = [
+        InsertOne({
+            'event_id': item.event.event_id,
+            'user_id': item.user_id,
+            'type': item.event.type,
+            'timestamp': item.timestamp,
+            'status': 'processing',
+            'attendance_id': None,
+            'detail': None,
+            'submitted_by': submitted_by.id,
+            'received_at': received_at,
+        })
+        for item in pending
+    ]
+    failed: Set[int] = set()
+    try:
+        await AttendanceEventReceipt.get_motor_collection().bulk_write(operations, ordered=False)
+    except BulkWriteError as exc:
+        for error in exc.details['writeErrors']:
+            if error['code'] != DUPLICATE_KEY:
+                raise
+            failed.add(error['index'])
+    for position, item in enumerate(pending):
+        if position in failed:
+            item.status, item.detail = 'duplicate', 'Event is already being processed'
+        else:
+            item.claimed = True
+
+
+async def _session_state(user_ids: List[ObjectId]) -> Tuple[Dict[ObjectId, dict], Dict[ObjectId, datetime]]:
+    """Open session and latest clock-out of each user, in two queries."""
+    collection = Attendance.get_motor_collection()
+    open_sessions = {
+        doc['user_id']: doc
+        async for doc in collection.find(
+            {'user_id': {'$in': user_ids}, 'clock_out': None}, {'user_id': 1, 'clock_in': 1, 'date': 1}
+        )
+    }
+    last_clock_out = {
+        user_id: _as_utc(clock_out) for user_id, clock_out in (await last_clock_outs(user_ids)).items()
+    }
+    return open_sessions, last_clock_out
+
+
+async def ingest_events(events: List[AttendanceEvent], submitted_by: User) -> List[AttendanceEventResult]:
+    """Apply a batch of clock events; returns one result per event, in order."""
+    now = datetime.now(timezone.utc)
+    tz = await get_system_timezone()
+    items = [_Event(index, event) for index, event in enumerate(events)]
+
+    first_by_key: Dict[str, _Event] = {}
+    repeats: List[Tuple[_Event, _Event]] = []
+    for item in items:
+        first = first_by_key.setdefault(item.event.event_id, item)
+        if first is not item:
+            repeats.append((item, first))
+            continue
+        _validate(item, submitted_by, now)
+
+    candidates = [item for item in first_by_key.values() if item.status is None]
+    if candidates:
+        await _claim(candidates, submitted_by)
+    claimed = [item for item in candidates if item.claimed]
+
+    users = {
+        user.id: user
+        for user in await User.find({'_id': {'$in': list({item.user_id for item in claimed})}}).to_list()
+    }
+    by_user: Dict[ObjectId, List[_Event]] = {}
+    for item in claimed:
+        user = users.get(item.user_id)
+        if user is None or user.role != 'employee':
+            item.reject('Employee not found')
+        elif user.status != 'active':
+            item.reject('Cannot modify attendance for disabled employee')
+        else:
+            by_user.setdefault(item.user_id, []).append(item)
+
+    open_sessions, last_clock_out = await _session_state(list(by_user))
+    inserts: List[dict] = []
+    insert_events: List[_Event] = []
+    closes: List[Tuple[_Event, dict]] = []
+    completed: List[Tuple[_Event, DailyChange]] = []
+    for user_id, user_events in by_user.items():
+        session = open_sessions.get(user_id)
+        if session is not None:
+            session = {
+                '_id': session['_id'],
+                'clock_in': _as_utc(session['clock_in']),
+                'date': session['date'],
+                'new': False,
+            }
+        latest_out = last_clock_out.get(user_id)
+        for item in sorted(user_events, key=lambda entry: (entry.timestamp, entry.index)):
+            if item.event.type == 'clock_in':
+                if session is not None:
+                    item.reject('Already clocked in')
+                elif latest_out is not None and item.timestamp < latest_out:
+                    item.reject('Overlaps an earlier attendance session')
+                else:
+                    doc = {
+                        '_id': ObjectId(),
+                        'user_id': user_id,
+                        'clock_in': item.timestamp,
+                        'clock_out': None,
+                        'hours_worked': None,
+                        'date': bson_date(item.timestamp.astimezone(tz).date()),
+                    }
+                    inserts.append(doc)
+                    insert_events.append(item)
+                    session = {
+                        '_id': doc['_id'],
+                        'clock_in': item.timestamp,
+                        'date': doc['date'],
+                        'new': True,
+                        'doc': doc,
+                    }
+                    item.accept(doc['_id'])
+                    item.record = {**doc}
+            elif session is None:
+                item.reject('Not clocked in')
+            elif item.timestamp < session['clock_in']:
+                item.reject('Clock-out precedes clock-in')
+            else:
+                fields = {
+                    'clock_out': item.timestamp,
+                    'hours_worked': _hours_between(session['clock_in'], item.timestamp),
+                }
+                if session['new']:
+                    session['doc'].update(fields)
+                else:
+                    closes.append((item, {'_id': session['_id'], **fields}))
+                item.accept(session['_id'])
+                item.record = {'_id': session['_id'], 'user_id': user_id, 'clock_in': session['clock_in'], **fields}
+                completed.append((item, (user_id, session['date'], fields['hours_worked'], 1)))
+                latest_out = item.timestamp
+                session = None
+
+    collection = Attendance.get_motor_collection()
+    if inserts:
+        try:
+            await collection.insert_many(inserts, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details['writeErrors']:
+                if error['code'] != DUPLICATE_KEY:
+                    raise
+                # Only open sessions can collide: a live clock-in won the race.
+                insert_events[error['index']].reject('Already clocked in')
+    if closes:
+        result = await collection.bulk_write(
+            [
+                UpdateOne(
+                    {'_id': fields['_id'], 'clock_out': None},
+                    {'$set': {'clock_out': fields['clock_out'], 'hours_worked': fields['hours_worked']}},
+                )
+                for _, fields in closes
+            ],
+            ordered=False,
+        )
+        if result.matched_count < len(closes):
+            # Some sessions were closed by a live clock-out meanwhile; find which.
+            stored = {
+                doc['_id']: doc.get('clock_out')
+                async for doc in collection.find(
+                    {'_id': {'$in': [fields['_id'] for _, fields in closes]}}, {'clock_out': 1}
+                )
+            }
+            for item, fields in closes:
+                clock_out = stored.get(fields['_id'])
+                if clock_out is None or _as_utc(clock_out) != fields['clock_out']:
+                    item.reject('Not clocked in')
+
+    await asyncio.gather(
+        _mark_shifts_attended(
+            {(item.user_id, item.timestamp.astimezone(tz).date()) for item in claimed if item.status == 'accepted'}
+        ),
+        record_attendance_changes(change for item, change in completed if item.status == 'accepted'),
+        broadcaster.publish_local([
+            item.record
+            for item in sorted(claimed, key=lambda entry: (entry.timestamp, entry.index))
+            if item.status == 'accepted'
+        ]),
+        settle_closed_sessions({'user_id': {'$in': list({item.user_id for item, _ in completed})}}),
+    )
+
+    if claimed:
+        await AttendanceEventReceipt.get_motor_collection().bulk_write(
+            [
+                UpdateOne(
+                    {'event_id': item.event.event_id},
+                    {'$set': {'status': item.status, 'attendance_id': item.attendance_id, 'detail': item.detail}},
+                )
+                for item in claimed
+            ],
+            ordered=False,
+        )
+
+    for item, first in repeats:
+        item.status, item.attendance_id, item.detail = 'duplicate', first.attendance_id, first.detail
+    return [item.result() for item in items]
+
+
+async def _mark_shifts_attended(user_days: Set[Tuple[ObjectId, date]]) -> None:
+    """Complete every assigned shift on the days employees clocked, in one update."""
+    if not user_days:
+        return
+    result = await Shift.get_motor_collection().update_many(
+        {
+            'status': 'assigned',
+            '$or': [
+                {'employee_id': user_id, 'shift_date': bson_date(day)}
+                for user_id, day in user_days
+            ],
+        },
+        {'$set': {'status': 'completed'}},
+    )
+    if result.modified_count:
+        await mark_dates_dirty(day for _, day in user_days)
@@ -0,0 +1,195 @@
+"""Per-user daily attendance rollup backing ``/attendance/summary``.
+
+Rows in ``attendance_daily`` hold completed hours and session counts per
+(user_id, date), keyed by the attendance ``date`` (the local clock-in day).
+Write paths adjust them with ``$inc`` as sessions close or change; a rebuild
+recomputes them from attendance history and repairs any drift.
+
+The first build runs once at startup, on whichever worker takes the
+ATTENDANCE_DAILY_LOCK lease; until it finishes the summary reads raw
+sessions instead.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteMany, UpdateOne
+
+from app.models.attendance_daily import AttendanceDaily
+from app.models.system_settings import SystemSettings
+from app.services.attendance_store import iter_daily_totals, iter_sessions
+from app.services.job_lock import ATTENDANCE_DAILY_LOCK, JobLease, LeaseHeld
+from app.services.pay_weeks import bson_date
+from app.services.system_settings import get_system_settings
+
+logger = logging.getLogger(__name__)
+
+# (user_id, attendance date, hours delta, sessions delta)
+DailyChange = Tuple[ObjectId, date, float, int]
+
+REBUILD_BATCH_SIZE = 1000
+
+# Hour differences below this are float noise, not drift.
+HOURS_TOLERANCE = 1e-9
+
+_build_task: Optional[asyncio.Task] = None
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+async def record_attendance_changes(changes: Iterable[DailyChange]) -> None:
+    """Apply hour and session deltas to the rollup in one bulk write."""
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {'user_id': user_id, 'date': bson_date(_as_date(day))},
+            {'$inc': {'hours': hours, 'sessions': sessions}, '$set': {'updated_at': now}},
+            upsert=True,
+        )
+        for user_id, day, hours, sessions in changes
+        if hours or sessions
+    ]
+    if operations:
+        await AttendanceDaily.get_motor_collection().bulk_write(operations, ordered=False)
+
+
+async def _rows_and_totals(user_id: Optional[ObjectId]) -> AsyncIterator[Tuple[tuple, Optional[dict], float, int]]:
+    """Rollup rows joined with recomputed totals on (user, date): ``(key, row, hours, sessions)``."""
+    match = {} if user_id is None else {'user_id': user_id}
+    rows = AttendanceDaily.get_motor_collection().find(
+        match, {'user_id': 1, 'date': 1, 'hours': 1, 'sessions': 1}, sort=[('user_id', ASCENDING), ('date', ASCENDING)]
+    ).__aiter__()
+    totals = iter_daily_totals(user_id).__aiter__()
+    row = await anext(rows, None)
+    total = await anext(totals, None)
+    while row is not None or total is not None:
+        row_key = (row['user_id'], _as_date(row['date'])) if row is not None else None
+        total_key = total[:2] if total is not None else None
+        if total_key is None or (row_key is not None and row_key < total_key):
+            yield row_key, row, 0.0, 0
+            row = await anext(rows, None)
+        elif row_key is None or total_key < row_key:
+            yield total_key, None, total[2], total[3]
+            total = await anext(totals, None)
+        else:
+            yield row_key, row, total[2], total[3]
+            row = await anext(rows, None)
+            total = await anext(totals, None)
+
+
+async def rebuild_attendance_daily(user_id: Optional[ObjectId] = None, lease: Optional[JobLease] = None) -> int:
+    """Recompute the rollup from completed attendance, for one user or everyone.
+
+    Rows are corrected with an ``$inc`` of the difference between the
+    recomputed totals and the row as read beside them, never replaced, so a
+    clock-out that increments a row while the rebuild runs is kept. Returns
+    how many rows were corrected.
+    """
+    collection = AttendanceDaily.get_motor_collection()
+    operations = []
+    corrected = 0
+    async for (row_user, day), row, hours, sessions in _rows_and_totals(user_id):
+        hours_delta = hours - (row['hours'] if row else 0.0)
+        sessions_delta = sessions - (row['sessions'] if row else 0)
+        if abs(hours_delta) < HOURS_TOLERANCE and not sessions_delta:
+            continue
+        operations.append(
+            UpdateOne(
+                {'user_id': row_user, 'date': bson_date(day)},
+                {
+                    '$inc': {'hours': hours_delta, 'sessions': sessions_delta},
+                    '$set': {'updated_at': datetime.now(timezone.utc)},
+                },
+                upsert=True,
+            )
+        )
+        if len(operations) >= REBUILD_BATCH_SIZE:
+            if lease is not None:
+                lease.check()
+            await collection.bulk_write(operations, ordered=False)
+            corrected += len(operations)
+            operations = []
+
+    # Rows left without completed attendance.
+    empty = {'sessions': {'$lte': 0}}
+    if user_id is not None:
+        empty['user_id'] = user_id
+    operations.append(DeleteMany(empty))
+    if lease is not None:
+        lease.check()
+    await collection.bulk_write(operations, ordered=True)
+    corrected += len(operations) - 1
+
+    if user_id is None:
+        settings = await get_system_settings()
+        settings.attendance_daily_built_at = datetime.now(timezone.utc)
+        await settings.save()
+    return corrected
+
+
+async def _is_built() -> bool:
+    raw = await SystemSettings.get_motor_collection().find_one({}, {'attendance_daily_built_at': 1})
+    return bool(raw and raw.get('attendance_daily_built_at'))
+
+
+async def build_attendance_daily(holder: str = 'startup') -> None:
+    """Build the rollup if it never was, under the rollup lease; other workers skip it."""
+    if await _is_built():
+        return
+    try:
+        async with JobLease(ATTENDANCE_DAILY_LOCK, job='attendance.daily.build', holder=holder) as lease:
+            if await _is_built():
+                return
+            rows = await rebuild_attendance_daily(lease=lease)
+            logger.info('Built attendance_daily: %d rows', rows)
+    except LeaseHeld as held:
+        logger.info('Skipping attendance_daily build: %s', held.describe())
+
+
+async def _build_in_background() -> None:
+    try:
+        await build_attendance_daily()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        # The next start tries again; the summary reads raw sessions until then.
+        logger.exception('Building attendance_daily failed')
+
+
+def start_attendance_daily_build() -> None:
+    global _build_task
+    if _build_task is None:
+        _build_task = asyncio.create_task(_build_in_background())
+
+
+async def stop_attendance_daily_build() -> None:
+    global _build_task
+    if _build_task is None:
+        return
+    _build_task.cancel()
+    try:
+        await _build_task
+    except asyncio.CancelledError:
+        pass
+    _build_task = None
+
+
+async def get_attendance_days(user_id: ObjectId, since: date) -> List[AttendanceDaily]:
+    """Rollup rows for a user from ``since`` on; raw sessions until the rollup is built."""
+    if await _is_built():
+        return await AttendanceDaily.find(
+            {'user_id': user_id, 'date': {'$gte': bson_date(since)}}
+        ).to_list()
+
+    days: dict = {}
+    async for doc in iter_sessions(since, user_id=user_id, completed=True):
+        day = days.setdefault(_as_date(doc['date']), AttendanceDaily(user_id=user_id, date=_as_date(doc['date'])))
+        day.hours += doc.get('hours_worked') or 0
+        day.sessions += 1
+    return list(days.values())
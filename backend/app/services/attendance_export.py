@@ -0,0 +1,199 @@
+"""Attendance history export for payroll audits.
+
+Rows are read in order through ``app.services.attendance_store``, so either
+storage layout works, in batches with employee names resolved once per
+batch, and each format is written incrementally so memory stays flat
+however long the range. CSV and JSONL are yielded batch by batch;
+XLSX goes through openpyxl's write-only mode into a spooled temporary file
+and is streamed out once the workbook is closed.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, datetime, timezone
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models.deleted_employee import DeletedEmployee
+from app.models.user import User
+from app.services.attendance_store import iter_sessions
+
+EXPORT_COLUMNS = [
+    'attendance_id',
+    'employee_id',
+    'employee_name',
+    'date',
+    'clock_in',
+    'clock_out',
+    'hours_worked',
+]
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Excel has no time zones, so the sheet says which one its times are in.
+XLSX_HEADERS = [
+    'attendance_id',
+    'employee_id',
+    'employee_name',
+    'date',
+    'clock_in_utc',
+    'clock_out_utc',
+    'hours_worked',
+]
+XLSX_COLUMN_WIDTHS = [26, 26, 28, 12, 20, 20, 13]
+XLSX_READ_CHUNK = 64 * 1024
+
+
+async def _export_batches(
+    start: date,
+    end: date,
+    user_id: Optional[ObjectId],
+) -> AsyncIterator[List[dict]]:
+    """Yield attendance rows in ``date``/``clock_in`` order, one batch at a time."""
+    batch_size = settings.ATTENDANCE_EXPORT_BATCH_SIZE
+    # An employee list is small next to their attendance; keep names for the whole export.
+    names: Dict[ObjectId, str] = {}
+    batch: List[dict] = []
+    async for record in iter_sessions(start, end, user_id, batch_size=batch_size):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield await _with_names(batch, names)
+            batch = []
+    if batch:
+        yield await _with_names(batch, names)
+
+
+async def _with_names(records: List[dict], names: Dict[ObjectId, str]) -> List[dict]:
+    missing = list({record['user_id'] for record in records} - names.keys())
+    if missing:
+        async for doc in User.get_motor_collection().find({'_id': {'$in': missing}}, {'name': 1}):
+            names[doc['_id']] = doc['name']
+        # Attendance outlives the employee; audits still want the name.
+        archived = [user_id for user_id in missing if user_id not in names]
+        if archived:
+            async for doc in DeletedEmployee.get_motor_collection().find(
+                {'original_id': {'$in': archived}}, {'original_id': 1, 'name': 1}
+            ):
+                names[doc['original_id']] = doc['name']
+        for user_id in missing:
+            names.setdefault(user_id, 'Unknown Employee')
+
+    return [
+        {
+            'attendance_id': str(record['_id']),
+            'employee_id': str(record['user_id']),
+            'employee_name': names[record['user_id']],
+            'date': _as_date(record['date']),
+            'clock_in': _as_utc(record['clock_in']),
+            'clock_out': _as_utc(record.get('clock_out')),
+            'hours_worked': record.get('hours_worked'),
+        }
+        for record in records
+    ]
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+async def stream_csv(start: date, end: date, user_id: Optional[ObjectId] = None) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    async for rows in _export_batches(start, end, user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [
+                row['attendance_id'],
+                row['employee_id'],
+                row['employee_name'],
+                row['date'].isoformat(),
+                _iso(row['clock_in']),
+                _iso(row['clock_out']) or '',
+                '' if row['hours_worked'] is None else row['hours_worked'],
+            ]
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+async def stream_jsonl(start: date, end: date, user_id: Optional[ObjectId] = None) -> AsyncIterator[str]:
+    async for rows in _export_batches(start, end, user_id):
+        yield ''.join(
+            json.dumps(
+                {
+                    **row,
+                    'date': row['date'].isoformat(),
+                    'clock_in': _iso(row['clock_in']),
+                    'clock_out': _iso(row['clock_out']),
+                }
+            )
+            + '\n'
+            for row in rows
+        )
+
+
+def _append_xlsx_rows(worksheet, rows: List[dict]) -> None:
+    for row in rows:
+        clock_out = row['clock_out']
+        worksheet.append(
+            [
+                row['attendance_id'],
+                row['employee_id'],
+                row['employee_name'],
+                row['date'],
+                row['clock_in'].replace(tzinfo=None),
+                clock_out.replace(tzinfo=None) if clock_out else None,
+                row['hours_worked'],
+            ]
+        )
+
+
+async def stream_xlsx(start: date, end: date, user_id: Optional[ObjectId] = None) -> AsyncIterator[bytes]:
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Attendance')
+    for index, width in enumerate(XLSX_COLUMN_WIDTHS, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = width
+    worksheet.append(XLSX_HEADERS)
+
+    # Row serialisation is CPU-bound; keep it off the event loop.
+    async for rows in _export_batches(start, end, user_id):
+        await run_in_threadpool(_append_xlsx_rows, worksheet, rows)
+
+    with SpooledTemporaryFile(max_size=settings.ATTENDANCE_EXPORT_SPOOL_BYTES) as spool:
+        await run_in_threadpool(workbook.save, spool)
+        spool.seek(0)
+        while True:
+            chunk = await run_in_threadpool(spool.read, XLSX_READ_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+
+EXPORT_WRITERS = {
+    'csv': stream_csv,
+    'jsonl': stream_jsonl,
+    'xlsx': stream_xlsx,
+}
@@ -0,0 +1,188 @@
+"""Live clock-in/clock-out feed for admin consoles.
+
+One in-process broadcaster fans each event out to every subscriber. Each
+subscriber has a bounded queue; a slow client loses its oldest events rather
+than holding up the others, and is told how many it missed so it can reload.
+
+With ATTENDANCE_FEED_SOURCE="local" events are published by the clock
+endpoints of this process. With "change_stream" every worker tails the
+``attendance`` collection instead, so consoles see taps handled by any
+worker; this needs MongoDB running as a replica set. With
+ATTENDANCE_STORAGE="monthly" a closed session has usually left
+``attendance`` by the time its clock-out is read from the stream, so the
+event is built from its monthly bucket.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.user import User
+from app.services.attendance_store import find_session
+
+logger = logging.getLogger(__name__)
+
+# Employee names are looked up once per event, not once per subscriber.
+NAME_CACHE_SIZE = 10_000
+CHANGE_STREAM_RETRY_SECONDS = 5
+
+
+class FeedSubscription:
+    def __init__(self, maxsize: int):
+        self._events: Deque[dict] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, event: dict) -> None:
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Tuple[List[dict], int]:
+        """Wait up to ``timeout`` seconds; returns queued events and the drop count since last call."""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        events = list(self._events)
+        self._events.clear()
+        dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+
+class AttendanceBroadcaster:
+    def __init__(self):
+        self._subscribers: Set[FeedSubscription] = set()
+        self._names: Dict[ObjectId, str] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self._sequence = 0
+
+    @property
+    def uses_change_stream(self) -> bool:
+        return settings.ATTENDANCE_FEED_SOURCE == 'change_stream'
+
+    def subscribe(self) -> FeedSubscription:
+        subscription = FeedSubscription(settings.ATTENDANCE_FEED_QUEUE_SIZE)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def publish(self, records: List[dict]) -> None:
+        """Fan out raw attendance documents that were just opened or closed."""
+        if not self._subscribers or not records:
+            return
+        names = await self._employee_names({record['user_id'] for record in records})
+        for record in records:
+            self._sequence += 1
+            event = _feed_event(record, names.get(record['user_id'], 'Unknown Employee'), self._sequence)
+            for subscription in self._subscribers:
+                subscription.put(event)
+
+    async def publish_local(self, records: List[dict]) -> None:
+        """Publish from a write path; a no-op when the change stream is the source."""
+        if not self.uses_change_stream:
+            try:
+                await self.publish(records)
+            except Exception as exc:
+                # The feed is best effort; never fail the clock request over it.
+                logger.warning('Attendance feed publish failed: %s', exc)
+
+    async def _employee_names(self, user_ids: Set[ObjectId]) -> Dict[ObjectId, str]:
+        missing = [user_id for user_id in user_ids if user_id not in self._names]
+        if missing:
+            if len(self._names) + len(missing) > NAME_CACHE_SIZE:
+                self._names.clear()
+            async for doc in User.get_motor_collection().find({'_id': {'$in': missing}}, {'name': 1}):
+                self._names[doc['_id']] = doc['name']
+        return {user_id: self._names[user_id] for user_id in user_ids if user_id in self._names}
+
+    def forget_employee(self, user_id: ObjectId) -> None:
+        self._names.pop(user_id, None)
+
+    async def _watch(self) -> None:
+        pipeline = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}}]
+        resume_after = None
+        while True:
+            try:
+                async with Attendance.get_motor_collection().watch(
+                    pipeline, full_document='updateLookup', resume_after=resume_after
+                ) as stream:
+                    async for change in stream:
+                        resume_after = change['_id']
+                        record = await _changed_record(change)
+                        if record:
+                            await self.publish([record])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error('Attendance change stream failed, retrying: %s', exc)
+                await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+
+    def start(self) -> None:
+        if self.uses_change_stream and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+            logger.info('Attendance feed following the attendance change stream')
+
+    async def stop(self) -> None:
+        if self._watcher:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+
+async def _changed_record(change: dict) -> Optional[dict]:
+    """The session a clock-in or clock-out change is about, or None for other changes."""
+    if not _is_clock_change(change):
+        return None
+    record = change.get('fullDocument')
+    if record is None and change['operationType'] == 'update':
+        # Deleted since the update, having moved to its monthly bucket.
+        record = await find_session(change['documentKey']['_id'])
+    return record
+
+
+def _is_clock_change(change: dict) -> bool:
+    if change['operationType'] != 'update':
+        return True
+    updated = change.get('updateDescription', {}).get('updatedFields', {})
+    return 'clock_out' in updated
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def _feed_event(record: dict, employee_name: str, sequence: int) -> dict:
+    closed = record.get('clock_out') is not None
+    return {
+        'id': sequence,
+        'type': 'clock_out' if closed else 'clock_in',
+        'attendance_id': str(record['_id']),
+        'employee_id': str(record['user_id']),
+        'employee_name': employee_name,
+        'clock_in': _iso(record['clock_in']),
+        'clock_out': _iso(record.get('clock_out')),
+        'hours_worked': record.get('hours_worked'),
+    }
+
+
+broadcaster = AttendanceBroadcaster()
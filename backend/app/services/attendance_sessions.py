@@ -0,0 +1,120 @@
+"""Clock-in and clock-out writes for attendance sessions.
+
+A partial unique index allows one open session per user, so clock-in is a
+plain insert and clock-out a single ``find_one_and_update``. Neither reads
+the session first, and two taps at once cannot open two sessions.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.models.attendance import OPEN_SESSION_INDEX, Attendance
+from app.models.shift import Shift
+from app.services.attendance_daily import record_attendance_changes
+from app.services.attendance_feed import broadcaster
+from app.services.attendance_store import settle_closed_sessions
+from app.services.pay_weeks import bson_date, mark_dates_dirty
+from app.services.system_settings import get_current_time
+
+MILLISECONDS_PER_HOUR = 3_600_000
+
+
+def hours_worked_expr(clock_out) -> dict:
+    """``round((clock_out - clock_in) / 1h, 2)`` evaluated by the server."""
+    return {
+        '$round': [
+            {'$divide': [{'$subtract': [clock_out, '$clock_in']}, MILLISECONDS_PER_HOUR]},
+            2,
+        ]
+    }
+
+
+async def open_session(user_id: ObjectId) -> Optional[Attendance]:
+    """Start a session for the user. Returns None if one is already open."""
+    now = await get_current_time()
+    attendance = Attendance(user_id=user_id, clock_in=now, date=now.date())
+    try:
+        await attendance.insert()
+    except DuplicateKeyError:
+        return None
+    await asyncio.gather(
+        mark_shift_attended(user_id, now.date()),
+        broadcaster.publish_local([attendance.model_dump(by_alias=True)]),
+    )
+    return attendance
+
+
+async def close_session(user_id: ObjectId) -> Optional[Attendance]:
+    """Close the user's open session. Returns None if nothing is open."""
+    now = await get_current_time()
+    doc = await Attendance.get_motor_collection().find_one_and_update(
+        {'user_id': user_id, 'clock_out': None},
+        [{'$set': {'clock_out': now, 'hours_worked': hours_worked_expr(now)}}],
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        return None
+    await asyncio.gather(
+        mark_shift_attended(user_id, now.date()),
+        record_attendance_changes([(user_id, doc['date'], doc['hours_worked'], 1)]),
+        broadcaster.publish_local([doc]),
+        settle_closed_sessions({'_id': doc['_id']}),
+    )
+    return Attendance.model_validate(doc)
+
+
+async def mark_shift_attended(user_id: ObjectId, event_date: date) -> None:
+    """Mark the user's earliest assigned shift for the day as completed."""
+    # Shift hooks only derive time fields, which a status change leaves intact.
+    shift = await Shift.get_motor_collection().find_one_and_update(
+        {'employee_id': user_id, 'shift_date': bson_date(event_date), 'status': 'assigned'},
+        {'$set': {'status': 'completed'}},
+        sort=[('start_time', 1)],
+        projection={'_id': 1},
+    )
+    if shift:
+        await mark_dates_dirty([event_date])
+
+
+async def has_open_session_index(collection: AsyncIOMotorCollection) -> bool:
+    return OPEN_SESSION_INDEX in await collection.index_information()
+
+
+async def close_overlapping_sessions(collection: AsyncIOMotorCollection) -> int:
+    """Close all but the latest open session of each user so the unique index can be built.
+
+    Each earlier session ends when the next one started. Returns the number of
+    sessions closed.
+    """
+    groups = collection.aggregate(
+        [
+            {'$match': {'clock_out': None}},
+            {'$sort': {'clock_in': 1}},
+            {'$group': {'_id': '$user_id', 'sessions': {'$push': {'_id': '$_id', 'clock_in': '$clock_in'}}}},
+            {'$match': {'sessions.1': {'$exists': True}}},
+        ]
+    )
+    operations = []
+    async for group in groups:
+        sessions = group['sessions']
+        for session, following in zip(sessions, sessions[1:]):
+            operations.append(
+                UpdateOne(
+                    {'_id': session['_id'], 'clock_out': None},
+                    [{'$set': {
+                        'clock_out': following['clock_in'],
+                        'hours_worked': hours_worked_expr(following['clock_in']),
+                    }}],
+                )
+            )
+    if not operations:
+        return 0
+    result = await collection.bulk_write(operations, ordered=False)
+    return result.modified_count
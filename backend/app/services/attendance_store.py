@@ -0,0 +1,631 @@
+"""Attendance storage layouts and the reads that work on either.
+
+With ATTENDANCE_STORAGE="sessions" (the default) every session is one
+``attendance`` document. With "monthly" only open sessions stay there: once
+a session closes it moves into the user's ``attendance_months`` bucket, one
+document per (user, month) holding a compact session array and the month's
+totals, so history costs one small index entry per user-month instead of
+several per session. Clock-in and the one-open-session index are the same
+in both layouts.
+
+Everything that reads attendance history goes through this module. In
+monthly mode those reads also pick up closed sessions that have not moved
+yet (the move follows the close; ``app/migrations/bucket_attendance.py``
+moves existing history), and skip any that are already in a bucket.
+
+Either layout has a cold tier too: closed sessions past
+ATTENDANCE_ARCHIVE_AFTER_DAYS move to ``attendance_archive``
+(``app.services.attendance_archive``), and the reads here union it in.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.attendance_archive import AttendanceArchive
+from app.models.attendance_month import AttendanceMonth
+from app.services.pay_weeks import bson_date
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+MOVE_BATCH_SIZE = 500
+SESSION_FIELDS = {'user_id': 1, 'date': 1, 'clock_in': 1, 'clock_out': 1, 'hours_worked': 1}
+SESSION_ORDER = [('date', ASCENDING), ('clock_in', ASCENDING)]
+
+# (user_id, attendance date, completed hours, completed sessions)
+DailyTotal = Tuple[ObjectId, date, float, int]
+
+
+def uses_monthly_buckets() -> bool:
+    return settings.ATTENDANCE_STORAGE == 'monthly'
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _months(start: date, end: date) -> List[date]:
+    months = [month_start(start)]
+    while _next_month(months[-1]) <= end:
+        months.append(_next_month(months[-1]))
+    return months
+
+
+def _date_range(start: Optional[date], end: Optional[date]) -> dict:
+    bounds = {}
+    if start is not None:
+        bounds['$gte'] = bson_date(start)
+    if end is not None:
+        bounds['$lte'] = bson_date(end)
+    return bounds
+
+
+def _bucket_sessions(match: dict, session_match: Optional[dict] = None, bucket_stages: Optional[list] = None) -> list:
+    """Pipeline turning bucketed sessions back into attendance-shaped documents.
+
+    ``bucket_stages`` run on the matched buckets before their sessions are unwound.
+    """
+    return [
+        {'$match': match},
+        *(bucket_stages or []),
+        {'$unwind': '$sessions'},
+        *([{'$match': session_match}] if session_match else []),
+        {
+            '$project': {
+                '_id': '$sessions.id',
+                'user_id': 1,
+                'date': '$sessions.date',
+                'clock_in': '$sessions.clock_in',
+                'clock_out': '$sessions.clock_out',
+                'hours_worked': '$sessions.hours_worked',
+            }
+        },
+    ]
+
+
+def _archived_only(match: dict) -> list:
+    """Pipeline stages for archived sessions matching ``match`` that are not also still hot.
+
+    A session is in both tiers after the archive job copied it but kept it hot
+    (edited meanwhile), or after a crash between the copy and the delete.
+    """
+    return [
+        {'$match': match},
+        {'$lookup': {'from': Attendance.Settings.name, 'localField': '_id', 'foreignField': '_id', 'as': 'hot'}},
+        {'$match': {'hot.0': {'$exists': False}}},
+    ]
+
+
+def _from_bucket(user_id: ObjectId, entry: dict) -> dict:
+    return {
+        '_id': entry['id'],
+        'user_id': user_id,
+        'date': entry['date'],
+        'clock_in': entry['clock_in'],
+        'clock_out': entry['clock_out'],
+        'hours_worked': entry.get('hours_worked'),
+    }
+
+
+async def _hot_sessions(query: dict, sort=None) -> List[dict]:
+    """``attendance`` documents matching ``query``, less closed ones already moved to a bucket."""
+    docs = await Attendance.get_motor_collection().find(query, SESSION_FIELDS, sort=sort).to_list(None)
+    closed = [doc for doc in docs if doc.get('clock_out') is not None]
+    if not closed:
+        return docs
+    moved: Set[ObjectId] = set()
+    async for bucket in AttendanceMonth.get_motor_collection().find(
+        {
+            'user_id': {'$in': list({doc['user_id'] for doc in closed})},
+            'sessions.id': {'$in': [doc['_id'] for doc in closed]},
+        },
+        {'sessions.id': 1},
+    ):
+        moved.update(entry['id'] for entry in bucket['sessions'])
+    return [doc for doc in docs if doc['_id'] not in moved]
+
+
+async def _merge(streams: List[AsyncIterator], key: Callable[[Any], Any]) -> AsyncIterator:
+    """Merge streams each sorted by ``key``; on equal keys earlier streams come first."""
+    iterators = [stream.__aiter__() for stream in streams]
+    heap = []
+    for index, iterator in enumerate(iterators):
+        item = await anext(iterator, None)
+        if item is not None:
+            heap.append((key(item), index, item))
+    heapq.heapify(heap)
+    while heap:
+        _, index, item = heap[0]
+        yield item
+        following = await anext(iterators[index], None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(following), index, following))
+
+
+def _session_key(doc: dict) -> tuple:
+    return doc['date'], doc['clock_in']
+
+
+async def iter_sessions(
+    start: date,
+    end: Optional[date] = None,
+    user_id: Optional[ObjectId] = None,
+    completed: bool = False,
+    batch_size: int = 1000,
+) -> AsyncIterator[dict]:
+    """Raw session documents with ``date`` in range, in ``date``/``clock_in`` order."""
+    query = {'date': _date_range(start, end)}
+    if user_id is not None:
+        query['user_id'] = user_id
+    if completed:
+        query['clock_out'] = {'$ne': None}
+
+    archived = AttendanceArchive.get_motor_collection().find(
+        query, SESSION_FIELDS, sort=SESSION_ORDER, batch_size=batch_size
+    )
+    # A session being archived can briefly be in both tiers; keep one copy.
+    current, seen = None, set()
+    async for doc in _merge([_layout_sessions(query, start, end, user_id, batch_size), archived], _session_key):
+        if _session_key(doc) != current:
+            current, seen = _session_key(doc), set()
+        if doc['_id'] in seen:
+            continue
+        seen.add(doc['_id'])
+        yield doc
+
+
+async def _layout_sessions(
+    query: dict,
+    start: date,
+    end: Optional[date],
+    user_id: Optional[ObjectId],
+    batch_size: int,
+) -> AsyncIterator[dict]:
+    """``iter_sessions`` for the configured layout, without the archive."""
+    if not uses_monthly_buckets():
+        async for doc in Attendance.get_motor_collection().find(
+            query, SESSION_FIELDS, sort=SESSION_ORDER, batch_size=batch_size
+        ):
+            yield doc
+        return
+
+    buckets = AttendanceMonth.get_motor_collection()
+    if end is None:
+        latest = await buckets.find_one({}, {'month': 1}, sort=[('month', DESCENDING)])
+        end = _as_date(latest['month']) if latest else start
+    hot = await _hot_sessions(query, sort=SESSION_ORDER)
+    # A session read here may reach its bucket before the bucket is read.
+    hot_ids = {doc['_id'] for doc in hot}
+    position = 0
+
+    # One month at a time keeps each server-side sort small.
+    for month in _months(start, end):
+        match = {'month': bson_date(month)}
+        if user_id is not None:
+            match['user_id'] = user_id
+        pipeline = _bucket_sessions(match, {'sessions.date': query['date']}) + [
+            {'$sort': {'date': 1, 'clock_in': 1}}
+        ]
+        async for doc in buckets.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size):
+            if doc['_id'] in hot_ids:
+                continue
+            while position < len(hot) and (hot[position]['date'], hot[position]['clock_in']) <= (doc['date'], doc['clock_in']):
+                yield hot[position]
+                position += 1
+            yield doc
+    for doc in hot[position:]:
+        yield doc
+
+
+async def find_session(session_id: ObjectId) -> Optional[dict]:
+    """One session by id as a raw document, from whichever tier holds it."""
+    doc = await Attendance.get_motor_collection().find_one({'_id': session_id}, SESSION_FIELDS)
+    if doc is None and uses_monthly_buckets():
+        bucket = await AttendanceMonth.get_motor_collection().find_one(
+            {'sessions.id': session_id}, {'user_id': 1, 'sessions': {'$elemMatch': {'id': session_id}}}
+        )
+        if bucket is not None:
+            doc = _from_bucket(bucket['user_id'], bucket['sessions'][0])
+    if doc is None:
+        doc = await AttendanceArchive.get_motor_collection().find_one({'_id': session_id}, SESSION_FIELDS)
+    return doc
+
+
+async def latest_completed(user_id: ObjectId) -> Optional[Attendance]:
+    """The user's completed session with the latest clock-out."""
+    doc = await Attendance.get_motor_collection().find_one(
+        {'user_id': user_id, 'clock_out': {'$ne': None}}, SESSION_FIELDS, sort=[('clock_out', DESCENDING)]
+    )
+    if uses_monthly_buckets():
+        # Sessions never overlap, so the latest clock-out is in the newest bucket.
+        bucket = await AttendanceMonth.get_motor_collection().find_one(
+            {'user_id': user_id, 'session_count': {'$gt': 0}},
+            {'sessions': 1},
+            sort=[('month', DESCENDING)],
+        )
+        if bucket and bucket['sessions']:
+            entry = max(bucket['sessions'], key=lambda item: item['clock_out'])
+            if doc is None or entry['clock_out'] > doc['clock_out']:
+                doc = _from_bucket(user_id, entry)
+    if doc is None:
+        # Everything archived is older than the hot tier, so only look there
+        # for users without recent attendance.
+        doc = await AttendanceArchive.get_motor_collection().find_one(
+            {'user_id': user_id}, SESSION_FIELDS, sort=[('date', DESCENDING), ('clock_in', DESCENDING)]
+        )
+    return Attendance.model_validate(doc) if doc else None
+
+
+async def recent_sessions(limit: int) -> List[Attendance]:
+    """The latest sessions across all users by clock-in, newest first."""
+    docs = await Attendance.get_motor_collection().find(
+        {}, SESSION_FIELDS, sort=[('clock_in', DESCENDING)], limit=limit
+    ).to_list(None)
+    if uses_monthly_buckets():
+        buckets = AttendanceMonth.get_motor_collection()
+        seen = {doc['_id'] for doc in docs}
+        bucketed: List[dict] = []
+        newest = await buckets.find_one({}, {'month': 1}, sort=[('month', DESCENDING)])
+        while newest and len(bucketed) < limit:
+            # The newest ``limit`` sessions of a month lie in the ``limit``
+            # buckets with the latest clock-ins, so only those are unwound.
+            latest_buckets = [
+                {'$addFields': {'last_clock_in': {'$max': '$sessions.clock_in'}}},
+                {'$sort': {'last_clock_in': -1}},
+                {'$limit': limit},
+            ]
+            pipeline = _bucket_sessions({'month': newest['month']}, bucket_stages=latest_buckets) + [
+                {'$sort': {'clock_in': -1}},
+                {'$limit': limit},
+            ]
+            bucketed.extend([doc async for doc in buckets.aggregate(pipeline) if doc['_id'] not in seen])
+            newest = await buckets.find_one(
+                {'month': {'$lt': newest['month']}}, {'month': 1}, sort=[('month', DESCENDING)]
+            )
+        docs = sorted(docs + bucketed, key=lambda doc: doc['clock_in'], reverse=True)[:limit]
+    if len(docs) < limit:
+        seen = {doc['_id'] for doc in docs}
+        archived = await AttendanceArchive.get_motor_collection().find(
+            {}, SESSION_FIELDS, sort=[('date', DESCENDING), ('clock_in', DESCENDING)], limit=limit
+        ).to_list(None)
+        docs = sorted(
+            docs + [doc for doc in archived if doc['_id'] not in seen], key=lambda doc: doc['clock_in'], reverse=True
+        )[:limit]
+    return [Attendance.model_validate(doc) for doc in docs]
+
+
+async def last_clock_outs(user_ids: List[ObjectId]) -> Dict[ObjectId, datetime]:
+    """Latest clock-out of each user that has completed attendance."""
+    latest: Dict[ObjectId, datetime] = {
+        row['_id']: row['last_clock_out']
+        async for row in Attendance.get_motor_collection().aggregate(
+            [
+                {'$match': {'user_id': {'$in': user_ids}, 'clock_out': {'$ne': None}}},
+                {'$group': {'_id': '$user_id', 'last_clock_out': {'$max': '$clock_out'}}},
+            ]
+        )
+    }
+    if uses_monthly_buckets():
+        async for row in AttendanceMonth.get_motor_collection().aggregate(
+            [
+                {'$match': {'user_id': {'$in': user_ids}, 'session_count': {'$gt': 0}}},
+                {'$sort': {'month': -1}},
+                {'$group': {'_id': '$user_id', 'sessions': {'$first': '$sessions'}}},
+            ]
+        ):
+            clock_out = max(entry['clock_out'] for entry in row['sessions'])
+            if row['_id'] not in latest or clock_out > latest[row['_id']]:
+                latest[row['_id']] = clock_out
+    missing = [user_id for user_id in user_ids if user_id not in latest]
+    if missing:
+        async for row in AttendanceArchive.get_motor_collection().aggregate(
+            [
+                {'$match': {'user_id': {'$in': missing}}},
+                {'$group': {'_id': '$user_id', 'last_clock_out': {'$max': '$clock_out'}}},
+            ]
+        ):
+            latest[row['_id']] = row['last_clock_out']
+    return latest
+
+
+async def completed_hours_by_user(start: date, end: date) -> Dict[ObjectId, float]:
+    """Completed hours per user for attendance dates ``start``..``end``."""
+    hours: Dict[ObjectId, float] = {}
+
+    def add(user_id: ObjectId, value: float) -> None:
+        hours[user_id] = hours.get(user_id, 0.0) + value
+
+    group = {'$group': {'_id': '$user_id', 'hours': {'$sum': {'$ifNull': ['$hours_worked', 0]}}}}
+    in_range = {'date': _date_range(start, end), 'clock_out': {'$ne': None}}
+    hot_ids: List[ObjectId] = []
+
+    if not uses_monthly_buckets():
+        async for row in Attendance.get_motor_collection().aggregate([{'$match': in_range}, group]):
+            add(row['_id'], row['hours'])
+    else:
+        # Hot sessions first, then the buckets without them: a session that
+        # moves to its bucket meanwhile is counted from the hot read only.
+        for doc in await _hot_sessions(in_range):
+            hot_ids.append(doc['_id'])
+            add(doc['user_id'], doc.get('hours_worked') or 0)
+        buckets = AttendanceMonth.get_motor_collection()
+        months = _months(start, end)
+        full = [month for month in months if month >= start and _next_month(month) - timedelta(days=1) <= end]
+        partial = [month for month in months if month not in full]
+        # Whole months come straight from the bucket totals, less any hot
+        # session already in the bucket (read with the total, atomically).
+        if full:
+            pipeline = [
+                {'$match': {'month': {'$in': [bson_date(month) for month in full]}}},
+                {
+                    '$project': {
+                        'user_id': 1,
+                        'hours': 1,
+                        'counted': {'$filter': {'input': '$sessions', 'cond': {'$in': ['$$this.id', hot_ids]}}},
+                    }
+                },
+            ]
+            async for bucket in buckets.aggregate(pipeline):
+                add(bucket['user_id'], bucket['hours'] - sum(entry.get('hours_worked') or 0 for entry in bucket['counted']))
+        if partial:
+            pipeline = _bucket_sessions(
+                {'month': {'$in': [bson_date(month) for month in partial]}},
+                {'sessions.date': in_range['date'], 'sessions.id': {'$nin': hot_ids}},
+            ) + [group]
+            async for row in buckets.aggregate(pipeline, allowDiskUse=True):
+                add(row['_id'], row['hours'])
+
+    # Archived last: the archive job copies before it deletes, so a session
+    # it moves during this read is never missed. Sessions counted from the
+    # hot read, or still in ``attendance``, are left out.
+    archive_match = {'date': in_range['date']}
+    if hot_ids:
+        archive_match['_id'] = {'$nin': hot_ids}
+    async for row in AttendanceArchive.get_motor_collection().aggregate(_archived_only(archive_match) + [group]):
+        add(row['_id'], row['hours'])
+    return hours
+
+
+async def iter_daily_totals(user_id: Optional[ObjectId] = None) -> AsyncIterator[DailyTotal]:
+    """Completed hours and sessions per (user, attendance date)."""
+    match = {'clock_out': {'$ne': None}}
+    if user_id is not None:
+        match['user_id'] = user_id
+    group = {
+        '$group': {
+            '_id': {'user_id': '$user_id', 'date': '$date'},
+            'hours': {'$sum': {'$ifNull': ['$hours_worked', 0]}},
+            'sessions': {'$sum': 1},
+        }
+    }
+
+    # Every source is sorted by (user, date) so their totals can be merged.
+    in_order = {'$sort': {'_id.user_id': 1, '_id.date': 1}}
+    sources = []
+    hot_ids: List[ObjectId] = []
+
+    if not uses_monthly_buckets():
+        sources.append(Attendance.get_motor_collection().aggregate([{'$match': match}, group, in_order], allowDiskUse=True))
+    else:
+        pending: Dict[Tuple[ObjectId, datetime], List[float]] = {}
+        for doc in await _hot_sessions(match):
+            hot_ids.append(doc['_id'])
+            totals = pending.setdefault((doc['user_id'], doc['date']), [0.0, 0])
+            totals[0] += doc.get('hours_worked') or 0
+            totals[1] += 1
+        sources.append(_rows_in_order(pending))
+        bucket_match = {} if user_id is None else {'user_id': user_id}
+        pipeline = _bucket_sessions(bucket_match, {'sessions.id': {'$nin': hot_ids}}) + [group, in_order]
+        sources.append(AttendanceMonth.get_motor_collection().aggregate(pipeline, allowDiskUse=True))
+
+    archive_match = {} if user_id is None else {'user_id': user_id}
+    if hot_ids:
+        archive_match['_id'] = {'$nin': hot_ids}
+    sources.append(
+        AttendanceArchive.get_motor_collection().aggregate(
+            _archived_only(archive_match) + [group, in_order], allowDiskUse=True
+        )
+    )
+
+    current: Optional[list] = None
+    async for row in _merge(sources, key=lambda row: (row['_id']['user_id'], row['_id']['date'])):
+        key = (row['_id']['user_id'], row['_id']['date'])
+        if current is not None and current[0] == key:
+            current[1] += row['hours']
+            current[2] += row['sessions']
+            continue
+        if current is not None:
+            yield current[0][0], _as_date(current[0][1]), float(current[1]), current[2]
+        current = [key, row['hours'], row['sessions']]
+    if current is not None:
+        yield current[0][0], _as_date(current[0][1]), float(current[1]), current[2]
+
+
+async def _rows_in_order(totals: Dict[Tuple[ObjectId, datetime], List[float]]) -> AsyncIterator[dict]:
+    """Per-day totals gathered in Python, shaped and ordered like the grouped aggregation rows."""
+    for (row_user, day), (hours, sessions) in sorted(totals.items()):
+        yield {'_id': {'user_id': row_user, 'date': day}, 'hours': hours, 'sessions': sessions}
+
+
+async def _push_to_buckets(docs: List[dict]) -> List[ObjectId]:
+    """Append closed sessions to their monthly buckets; sessions already there are skipped.
+
+    Returns the ids of sessions that are still not in their bucket; callers
+    must keep those in ``attendance``.
+    """
+    now = datetime.now(timezone.utc)
+    pending = docs
+    # A duplicate key means the session is already in its bucket, or two
+    # upserts raced to create the bucket; retrying once tells them apart.
+    for _ in range(2):
+        operations = [
+            UpdateOne(
+                {
+                    'user_id': doc['user_id'],
+                    'month': bson_date(month_start(_as_date(doc['date']))),
+                    'sessions.id': {'$ne': doc['_id']},
+                },
+                {
+                    '$push': {
+                        'sessions': {
+                            'id': doc['_id'],
+                            'date': bson_date(_as_date(doc['date'])),
+                            'clock_in': doc['clock_in'],
+                            'clock_out': doc['clock_out'],
+                            'hours_worked': doc.get('hours_worked'),
+                        }
+                    },
+                    '$inc': {'hours': doc.get('hours_worked') or 0, 'session_count': 1},
+                    '$set': {'updated_at': now},
+                },
+                upsert=True,
+            )
+            for doc in pending
+        ]
+        try:
+            await AttendanceMonth.get_motor_collection().bulk_write(operations, ordered=False)
+            return []
+        except BulkWriteError as exc:
+            retry = []
+            for error in exc.details['writeErrors']:
+                if error['code'] != DUPLICATE_KEY:
+                    raise
+                retry.append(pending[error['index']])
+            pending = retry
+
+    # Still failing: whatever is not in its bucket by now lost a race again.
+    ids = [doc['_id'] for doc in pending]
+    bucketed: Set[ObjectId] = set()
+    async for bucket in AttendanceMonth.get_motor_collection().find({'sessions.id': {'$in': ids}}, {'sessions.id': 1}):
+        bucketed.update(entry['id'] for entry in bucket['sessions'])
+    return [session_id for session_id in ids if session_id not in bucketed]
+
+
+async def move_closed_sessions(query: Optional[dict] = None, batch_size: int = MOVE_BATCH_SIZE, pause: float = 0.0) -> int:
+    """Move closed sessions matching ``query`` from ``attendance`` into buckets, in batches."""
+    collection = Attendance.get_motor_collection()
+    closed = {**(query or {}), 'clock_out': {'$ne': None}}
+    moved = 0
+    while True:
+        docs = await collection.find(closed, SESSION_FIELDS, limit=batch_size).to_list(None)
+        if not docs:
+            return moved
+        unpushed = set(await _push_to_buckets(docs))
+        pushed = [doc['_id'] for doc in docs if doc['_id'] not in unpushed]
+        await collection.delete_many({'_id': {'$in': pushed}, 'clock_out': {'$ne': None}})
+        moved += len(pushed)
+        if unpushed:
+            # They stay hot, where every read still finds them; the next move retries.
+            logger.warning('Could not move %d closed sessions to their monthly buckets', len(unpushed))
+            return moved
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def settle_closed_sessions(query: dict) -> None:
+    """After a write that closed sessions: move them to buckets in monthly mode."""
+    if uses_monthly_buckets():
+        await move_closed_sessions(query)
+
+
+async def unbucket_sessions(batch_size: int = 100, pause: float = 0.0) -> int:
+    """Move every bucketed session back to one ``attendance`` document each, ``batch_size`` buckets at a time."""
+    buckets = AttendanceMonth.get_motor_collection()
+    collection = Attendance.get_motor_collection()
+    restored = 0
+    while True:
+        batch = await buckets.find({}, limit=batch_size).to_list(None)
+        if not batch:
+            return restored
+        docs = [_from_bucket(bucket['user_id'], entry) for bucket in batch for entry in bucket['sessions']]
+        if docs:
+            try:
+                await collection.insert_many(docs, ordered=False)
+            except BulkWriteError as exc:
+                # Restored by an earlier, interrupted run.
+                if any(error['code'] != DUPLICATE_KEY for error in exc.details['writeErrors']):
+                    raise
+        await buckets.delete_many({'_id': {'$in': [bucket['_id'] for bucket in batch]}})
+        restored += len(docs)
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def save_completed_session(
+    user_id: ObjectId,
+    clock_in: datetime,
+    clock_out: datetime,
+    hours_worked: float,
+    day: date,
+) -> Optional[dict]:
+    """Record a completed session starting at ``clock_in``, replacing any existing one.
+
+    Returns the session that was replaced, as a raw document, or None.
+    """
+    collection = Attendance.get_motor_collection()
+    fields = {'clock_out': clock_out, 'hours_worked': hours_worked, 'date': bson_date(day)}
+    existing = await collection.find_one({'user_id': user_id, 'clock_in': clock_in}, SESSION_FIELDS)
+    if existing is None and uses_monthly_buckets():
+        buckets = AttendanceMonth.get_motor_collection()
+        naive_clock_in = clock_in.astimezone(timezone.utc).replace(tzinfo=None)
+        bucket = await buckets.find_one({'user_id': user_id, 'sessions.clock_in': clock_in})
+        if bucket is not None:
+            entry = next(item for item in bucket['sessions'] if item['clock_in'] == naive_clock_in)
+            await buckets.update_one(
+                {'_id': bucket['_id'], 'sessions.id': entry['id']},
+                {
+                    '$pull': {'sessions': {'id': entry['id']}},
+                    '$inc': {'hours': -(entry.get('hours_worked') or 0), 'session_count': -1},
+                    '$set': {'updated_at': datetime.now(timezone.utc)},
+                },
+            )
+            existing = _from_bucket(user_id, entry)
+            await _save_to_buckets({**existing, 'clock_in': clock_in, **fields})
+            return existing
+
+    if existing is None:
+        # Edited in place; the archive holds whatever date it is given.
+        existing = await AttendanceArchive.get_motor_collection().find_one_and_update(
+            {'user_id': user_id, 'clock_in': clock_in}, {'$set': fields}, projection=SESSION_FIELDS
+        )
+        if existing is not None:
+            return existing
+
+    if existing is not None:
+        await collection.update_one({'_id': existing['_id']}, {'$set': fields})
+        await settle_closed_sessions({'_id': existing['_id']})
+        return existing
+
+    doc = {'_id': ObjectId(), 'user_id': user_id, 'clock_in': clock_in, **fields}
+    if uses_monthly_buckets():
+        await _save_to_buckets(doc)
+    else:
+        await collection.insert_one(doc)
+    return None
+
+
+async def _save_to_buckets(doc: dict) -> None:
+    """Push one closed session to its bucket, keeping it in ``attendance`` if that fails."""
+    if await _push_to_buckets([doc]):
+        await Attendance.get_motor_collection().insert_one(doc)
+
@@ -0,0 +1,231 @@
+"""Mongo-backed lease locks for jobs that must run on one worker at a time.
+
+A lease is a document in ``job_locks`` that names its owner and an expiry.
+The owner extends the expiry from a heartbeat task while the job runs, so a
+worker that dies mid-job only blocks others until the lease expires. A
+worker whose lease lapsed anyway (a long pause, failed heartbeats) learns so
+from ``check()`` or ``set_status()``, which raise LeaseLost; jobs call one of
+them between batches of writes::
+
+    async with JobLease(PAY_SYNC_LOCK, job='pay.generate') as lease:
+        await lease.set_status('Syncing 12 pay weeks')
+        for batch in batches:
+            lease.check()
+            ...
+        lease.result = {'generated': 3}
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.models.job_lock import JobLock
+
+logger = logging.getLogger(__name__)
+
+PAY_SYNC_LOCK = 'pay-sync'
+PAYROLL_RUN_LOCK = 'payroll-run'
+SCHEDULER_LEADER_LOCK = 'scheduler-leader'
+ATTENDANCE_ARCHIVE_LOCK = 'attendance-archive'
+ATTENDANCE_DAILY_LOCK = 'attendance-daily'
+
+WAIT_POLL_SECONDS = 1.0
+
+
+class LeaseHeld(Exception):
+    """Raised when another owner holds an unexpired lease."""
+
+    def __init__(self, lock: JobLock):
+        self.lock = lock
+        super().__init__(self.describe())
+
+    def describe(self) -> str:
+        lock = self.lock
+        started = f"started at {lock.acquired_at.isoformat(timespec='seconds')}"
+        if lock.holder:
+            started = f"started by {lock.holder} at {lock.acquired_at.isoformat(timespec='seconds')}"
+        message = f"{lock.job or lock.name} is already running, {started}"
+        if lock.status:
+            message += f" ({lock.status})"
+        return message
+
+
+class LeaseLost(Exception):
+    """Raised by a lease holder that found its lease expired or taken over."""
+
+    def __init__(self, lease: 'JobLease'):
+        self.lease = lease
+        super().__init__(self.describe())
+
+    def describe(self) -> str:
+        return f"Lost the {self.lease.name} lease; stopped {self.lease.job} so it does not run twice"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_lock(doc: dict) -> JobLock:
+    return JobLock.model_validate(doc)
+
+
+class JobLease:
+    def __init__(
+        self,
+        name: str,
+        job: Optional[str] = None,
+        holder: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        heartbeat_seconds: Optional[int] = None,
+    ):
+        self.name = name
+        self.job = job or name
+        self.holder = holder
+        self.ttl = timedelta(seconds=ttl_seconds or settings.JOB_LOCK_TTL_SECONDS)
+        self.heartbeat_seconds = heartbeat_seconds or settings.JOB_LOCK_HEARTBEAT_SECONDS
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        self.result: Optional[dict] = None
+        self.lost = False
+        self._expires_at: Optional[datetime] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def _collection(self):
+        return JobLock.get_motor_collection()
+
+    async def acquire(self) -> bool:
+        """Take the lease if it is free or expired. Returns False when held elsewhere."""
+        now = _now()
+        try:
+            await self._collection.find_one_and_update(
+                {'name': self.name, '$or': [{'expires_at': {'$lte': now}}, {'owner': self.owner}]},
+                {
+                    '$set': {
+                        'owner': self.owner,
+                        'holder': self.holder,
+                        'job': self.job,
+                        'status': None,
+                        'acquired_at': now,
+                        'heartbeat_at': now,
+                        'expires_at': now + self.ttl,
+                        'released_at': None,
+                        'result': None,
+                    }
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The upsert raced an unexpired lease owned by someone else.
+            return False
+        self.lost = False
+        self._expires_at = now + self.ttl
+        return True
+
+    async def current(self) -> Optional[JobLock]:
+        doc = await self._collection.find_one({'name': self.name})
+        return _as_lock(doc) if doc else None
+
+    async def extend(self) -> bool:
+        now = _now()
+        result = await self._collection.update_one(
+            {'name': self.name, 'owner': self.owner},
+            {'$set': {'heartbeat_at': now, 'expires_at': now + self.ttl}},
+        )
+        if result.matched_count == 1:
+            self._expires_at = now + self.ttl
+            return True
+        return False
+
+    def check(self) -> None:
+        """Raise LeaseLost if another worker may hold the lease now; call between batches of writes."""
+        if not self.lost and self._expires_at is not None and _now() >= self._expires_at:
+            # Heartbeats kept failing until the lease ran out.
+            self.lost = True
+        if self.lost:
+            raise LeaseLost(self)
+
+    async def set_status(self, status: str) -> None:
+        """Publish progress; raises LeaseLost instead once the lease is gone."""
+        self.check()
+        result = await self._collection.update_one(
+            {'name': self.name, 'owner': self.owner},
+            {'$set': {'status': status}},
+        )
+        if result.matched_count == 0:
+            self.lost = True
+            raise LeaseLost(self)
+
+    async def release(self) -> None:
+        now = _now()
+        await self._collection.update_one(
+            {'name': self.name, 'owner': self.owner},
+            {'$set': {'released_at': now, 'expires_at': now, 'result': self.result}},
+        )
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                if not await self.extend():
+                    self.lost = True
+                    logger.error('Lost lease %s; another worker may run %s concurrently', self.name, self.job)
+                    return
+            except Exception as exc:
+                # Keep beating; the lease only lapses if failures outlast the TTL.
+                logger.warning('Heartbeat for lease %s failed: %s', self.name, exc)
+
+    async def __aenter__(self) -> 'JobLease':
+        if not await self.acquire():
+            current = await self.current()
+            if current is None:
+                # Released between the failed upsert and the read; try once more.
+                if await self.acquire():
+                    self._heartbeat = asyncio.create_task(self._beat())
+                    return self
+                current = await self.current()
+            raise LeaseHeld(current)
+        self._heartbeat = asyncio.create_task(self._beat())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        await self.release()
+
+
+async def wait_for_release(held: LeaseHeld, timeout_seconds: Optional[float] = None) -> Optional[JobLock]:
+    """Wait until the lease in ``held`` is released or expires.
+
+    Returns the lock as its owner left it, or None if it is still held after
+    the timeout.
+    """
+    lock = held.lock
+    timeout = timeout_seconds if timeout_seconds is not None else settings.JOB_LOCK_WAIT_SECONDS
+    deadline = asyncio.get_running_loop().time() + timeout
+    collection = JobLock.get_motor_collection()
+    while True:
+        doc = await collection.find_one({'name': lock.name})
+        if doc is None or doc['owner'] != lock.owner or doc.get('released_at'):
+            return _as_lock(doc) if doc else None
+        still_held = await collection.count_documents(
+            {'name': lock.name, 'owner': lock.owner, 'expires_at': {'$gt': _now()}}
+        )
+        if not still_held:
+            return _as_lock(doc)
+        if asyncio.get_running_loop().time() >= deadline:
+            return None
+        await asyncio.sleep(WAIT_POLL_SECONDS)
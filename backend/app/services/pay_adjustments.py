@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.models.adjustment import AdjustmentType, EmployeeAdjustment
+
+ApplicableAdjustment = Tuple[AdjustmentType, Optional[EmployeeAdjustment]]
+
+
+def effective_on(start: Optional[date], end: Optional[date], day: date) -> bool:
+    if start and day < start:
+        return False
+    if end and day > end:
+        return False
+    return True
+
+
+def adjustment_terms(
+    adjustment_type: AdjustmentType, assignment: Optional[EmployeeAdjustment]
+) -> Tuple[float, Optional[float]]:
+    """Effective (rate_or_amount, cap) after per-employee overrides."""
+    rate = (
+        assignment.override_rate_or_amount
+        if assignment and assignment.override_rate_or_amount is not None
+        else adjustment_type.rate_or_amount
+    )
+    cap = (
+        assignment.override_cap
+        if assignment and assignment.override_cap is not None
+        else adjustment_type.cap_per_period
+    )
+    return rate, cap
+
+
+def adjustment_entry(
+    adjustment_type: AdjustmentType,
+    rate: float,
+    cap: Optional[float],
+    value: float,
+    cap_hit: bool,
+) -> dict:
+    """Adjustment line as stored on pay records."""
+    return {
+        "name": adjustment_type.name,
+        "direction": adjustment_type.direction,
+        "mode": adjustment_type.mode,
+        "rate_or_amount": rate,
+        "apply_on": adjustment_type.apply_on,
+        "overtime_rule": adjustment_type.overtime_rule,
+        "cap_per_period": cap,
+        "amount_applied": value,
+        "cap_hit": cap_hit,
+    }
+
+
+class AdjustmentResolver:
+    """In-memory view of adjustment types and active assignments.
+
+    Built once per pay sync run so resolving adjustments for an employee
+    does not cost any database round trips.
+    """
+
+    def __init__(self, types: List[AdjustmentType], assignments: List[EmployeeAdjustment]):
+        self._types = types
+        self._types_by_id: Dict[ObjectId, AdjustmentType] = {}
+        for adjustment_type in types:
+            # Keep the first match, mirroring the previous linear scan.
+            self._types_by_id.setdefault(adjustment_type.id, adjustment_type)
+        self._global_types = [t for t in types if t.applies_globally]
+        self._assignments_by_employee: Dict[ObjectId, List[EmployeeAdjustment]] = defaultdict(list)
+        for assignment in assignments:
+            self._assignments_by_employee[assignment.employee_id].append(assignment)
+
+    @classmethod
+    async def load(cls) -> "AdjustmentResolver":
+        types = await AdjustmentType.find().to_list()
+        assignments = await EmployeeAdjustment.find(EmployeeAdjustment.status == "active").to_list()
+        return cls(types, assignments)
+
+    def applicable(self, employee_id: ObjectId, day: date) -> List[ApplicableAdjustment]:
+        """Adjustments that apply to ``employee_id`` for a pay week ending on ``day``."""
+        assignments = self._assignments_by_employee.get(employee_id, [])
+
+        active_global = {
+            t.id: t for t in self._global_types if effective_on(t.effective_start, t.effective_end, day)
+        }
+        # Remove globals if replaced
+        for assignment in assignments:
+            if assignment.replace_global:
+                active_global.pop(assignment.adjustment_type_id, None)
+
+        applicable: List[ApplicableAdjustment] = [(t, None) for t in active_global.values()]
+        for assignment in assignments:
+            adjustment_type = self._types_by_id.get(assignment.adjustment_type_id)
+            if not adjustment_type:
+                continue
+            if not effective_on(assignment.effective_start, assignment.effective_end, day):
+                continue
+            applicable.append((adjustment_type, assignment))
+        return applicable
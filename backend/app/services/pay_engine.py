@@ -0,0 +1,122 @@
+"""Columnar weekly pay calculation.
+
+Computes the same figures as ``pay._calculate_amount`` and
+``pay._compute_adjustments`` for a whole week of employees at once. Every
+arithmetic step mirrors the scalar code so results are cent-exact.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from app.services.pay_adjustments import ApplicableAdjustment, adjustment_entry, adjustment_terms
+
+STANDARD_WEEK_HOURS = 40.0
+OVERTIME_MULTIPLIER = 1.5
+
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """Vectorized ``round(x, 2)`` matching Python's correctly rounded result.
+
+    ``rint(x * 100) / 100`` agrees with ``round`` except when ``x * 100`` lands
+    next to a half cent, where the product's own rounding can tip the result.
+    Those rare elements are recomputed with the builtin.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 100.0
+    rounded = np.rint(scaled) / 100.0
+    distance_from_half = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5)
+    ambiguous = distance_from_half <= np.abs(scaled) * 1e-12 + 1e-9
+    if ambiguous.any():
+        for index in np.flatnonzero(ambiguous):
+            rounded[index] = round(float(values[index]), 2)
+    return rounded
+
+
+@dataclass
+class WeekPay:
+    gross: List[float]
+    base: List[float]
+    overtime: List[float]
+    adjustment_delta: List[float]
+    net: List[float]
+    adjustments: List[List[dict]]
+
+
+def compute_week_pay(
+    hours: Sequence[float],
+    pay_rates: Sequence[float],
+    applicable: Sequence[Sequence[ApplicableAdjustment]],
+) -> WeekPay:
+    """Compute pay for every employee of a week in one vectorized pass.
+
+    ``applicable[i]`` lists the adjustments for employee ``i`` in the order the
+    scalar code applies them.
+    """
+    hours_arr = np.asarray(hours, dtype=np.float64)
+    rates_arr = np.asarray(pay_rates, dtype=np.float64)
+    count = hours_arr.shape[0]
+
+    base_hours = np.minimum(hours_arr, STANDARD_WEEK_HOURS)
+    overtime_hours = np.maximum(hours_arr - STANDARD_WEEK_HOURS, 0.0)
+    base_pay = base_hours * rates_arr
+    overtime_pay = overtime_hours * rates_arr * OVERTIME_MULTIPLIER
+    gross = round_cents(base_pay + overtime_pay)
+    base = round_cents(base_pay)
+    overtime = round_cents(overtime_pay)
+
+    # Flatten the ragged per-employee adjustment lists into one adjustment matrix.
+    owners: List[int] = []
+    terms: List[tuple] = []
+    rate_col: List[float] = []
+    cap_col: List[float] = []
+    flat_col: List[bool] = []
+    overtime_only_col: List[bool] = []
+    sign_col: List[float] = []
+    for index, entries in enumerate(applicable):
+        for adjustment_type, assignment in entries:
+            rate, cap = adjustment_terms(adjustment_type, assignment)
+            owners.append(index)
+            terms.append((adjustment_type, rate, cap))
+            rate_col.append(rate)
+            cap_col.append(np.nan if cap is None else cap)
+            flat_col.append(adjustment_type.mode == "flat")
+            overtime_only_col.append(adjustment_type.apply_on == "overtime_only")
+            sign_col.append(1.0 if adjustment_type.direction == "add" else -1.0)
+
+    adjustments: List[List[dict]] = [[] for _ in range(count)]
+    delta = np.zeros(count, dtype=np.float64)
+    if owners:
+        owner_idx = np.asarray(owners, dtype=np.intp)
+        rate_arr = np.asarray(rate_col, dtype=np.float64)
+        cap_arr = np.asarray(cap_col, dtype=np.float64)
+        flat = np.asarray(flat_col, dtype=bool)
+        base_amount = np.where(overtime_only_col, overtime[owner_idx], gross[owner_idx])
+
+        values = round_cents(np.where(flat, rate_arr, base_amount * (rate_arr / 100.0)))
+        has_cap = ~np.isnan(cap_arr)
+        cap_hit = has_cap & (values > np.where(has_cap, cap_arr, 0.0))
+        values = np.where(cap_hit, round_cents(np.where(has_cap, cap_arr, 0.0)), values)
+
+        # bincount accumulates in input order, matching the scalar running sum.
+        delta = np.bincount(owner_idx, weights=np.asarray(sign_col) * values, minlength=count)
+
+        for position, (adjustment_type, rate, cap) in enumerate(terms):
+            adjustments[owners[position]].append(
+                adjustment_entry(
+                    adjustment_type, rate, cap, float(values[position]), bool(cap_hit[position])
+                )
+            )
+
+    adjustment_delta = round_cents(delta)
+    net = round_cents(gross + adjustment_delta)
+    return WeekPay(
+        gross=gross.tolist(),
+        base=base.tolist(),
+        overtime=overtime.tolist(),
+        adjustment_delta=adjustment_delta.tolist(),
+        net=net.tolist(),
+        adjustments=adjustments,
+    )
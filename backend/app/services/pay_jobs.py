@@ -0,0 +1,207 @@
+"""Background pay sync jobs.
+
+``POST /pay/jobs`` stores a ``PayJob``; a worker task in every API process
+claims queued jobs and works through the dirty-week ledger in chunks of
+PAY_JOB_CHUNK_WEEKS. Each finished chunk is cleared from the ledger and
+counted on the job, so a job picked up again after a restart continues with
+the weeks that are still dirty. Jobs whose worker stops heartbeating are
+reclaimed by any process after JOB_LOCK_TTL_SECONDS.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from app.config import settings
+from app.models.pay_job import PayJob
+from app.services.job_lock import PAY_SYNC_LOCK, JobLease, LeaseHeld, LeaseLost
+from app.services.pay_adjustments import AdjustmentResolver
+from app.services.pay_weeks import clear_dirty_weeks, get_dirty_weeks
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ['queued', 'running']
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_sync_job(requested_by: Optional[ObjectId]) -> PayJob:
+    """Queue a pay sync, or return the job that is already queued or running."""
+    active = await PayJob.find({'kind': 'sync', 'state': {'$in': ACTIVE_STATES}}).sort('+created_at').first_or_none()
+    if active:
+        return active
+    job = PayJob(requested_by=requested_by)
+    await job.insert()
+    worker.notify()
+    return job
+
+
+async def _claim_next_job(worker_id: str) -> Optional[PayJob]:
+    collection = PayJob.get_motor_collection()
+    stale = _now() - timedelta(seconds=settings.JOB_LOCK_TTL_SECONDS)
+    # Give up on jobs that keep taking their worker down.
+    await collection.update_many(
+        {'state': 'running', 'heartbeat_at': {'$lt': stale}, 'attempts': {'$gte': settings.PAY_JOB_MAX_ATTEMPTS}},
+        {'$set': {'state': 'failed', 'error': 'Worker stopped responding', 'finished_at': _now()}},
+    )
+    now = _now()
+    doc = await collection.find_one_and_update(
+        {'$or': [{'state': 'queued'}, {'state': 'running', 'heartbeat_at': {'$lt': stale}}]},
+        {
+            '$set': {'state': 'running', 'worker': worker_id, 'started_at': now, 'heartbeat_at': now},
+            '$inc': {'attempts': 1},
+        },
+        sort=[('created_at', ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+    return PayJob.model_validate(doc) if doc else None
+
+
+async def _update_job(job: PayJob, worker_id: str, update: dict) -> None:
+    await PayJob.get_motor_collection().update_one({'_id': job.id, 'worker': worker_id}, update)
+
+
+async def _requeue_job(job: PayJob, worker_id: str) -> None:
+    """Hand a job back without charging it the attempt taken at claim time.
+
+    Attempts count runs that took their worker down; waiting on the sync
+    lease or shutting down is not one.
+    """
+    await _update_job(job, worker_id, {'$set': {'state': 'queued', 'worker': None}, '$inc': {'attempts': -1}})
+
+
+async def _run_sync_job(job: PayJob, worker_id: str, lease: JobLease) -> None:
+    from app.routers.pay import _sync_weeks
+
+    dirty_weeks = await get_dirty_weeks()
+    week_ranges = sorted({(entry.week_start, entry.week_end) for entry in dirty_weeks})
+    # Weeks finished by an earlier attempt are already cleared from the ledger.
+    weeks_total = job.weeks_done + len(week_ranges)
+    await _update_job(job, worker_id, {'$set': {'weeks_total': weeks_total, 'weeks_failed': 0}})
+
+    resolver = await AdjustmentResolver.load()
+    chunk_size = max(settings.PAY_JOB_CHUNK_WEEKS, 1)
+    weeks_done = job.weeks_done
+    for index in range(0, len(week_ranges), chunk_size):
+        chunk = week_ranges[index:index + chunk_size]
+        summary = await _sync_weeks(chunk, resolver, settings.PAY_SYNC_CONCURRENCY, lease)
+        # Failed weeks stay dirty for the next sync.
+        await clear_dirty_weeks(
+            entry for entry in dirty_weeks if (entry.week_start, entry.week_end) in summary.week_ranges
+        )
+        weeks_done += len(summary.week_ranges)
+        await _update_job(
+            job,
+            worker_id,
+            {
+                '$inc': {
+                    'weeks_done': len(summary.week_ranges),
+                    'weeks_failed': len(summary.failed_weeks),
+                    'generated': summary.generated,
+                },
+                '$set': {'heartbeat_at': _now()},
+            },
+        )
+        await lease.set_status(f'Pay job {job.id}: {weeks_done}/{weeks_total} weeks')
+
+
+class PayJobWorker:
+    def __init__(self):
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+            logger.info('Pay job worker %s started', self.worker_id)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                job = await _claim_next_job(self.worker_id)
+                if job:
+                    await self._execute(job)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Pay job worker iteration failed')
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.PAY_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, job: PayJob) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_LOCK_HEARTBEAT_SECONDS)
+            try:
+                await _update_job(job, self.worker_id, {'$set': {'heartbeat_at': _now()}})
+            except Exception as exc:
+                logger.warning('Heartbeat for pay job %s failed: %s', job.id, exc)
+
+    async def _execute(self, job: PayJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            async with JobLease(PAY_SYNC_LOCK, job='pay.job', holder=f'pay job {job.id}') as lease:
+                await _run_sync_job(job, self.worker_id, lease)
+        except LeaseHeld as held:
+            # A request-driven sync is running; requeue and try again later.
+            logger.info('Pay job %s waiting: %s', job.id, held.describe())
+            await _requeue_job(job, self.worker_id)
+            await asyncio.sleep(settings.PAY_JOB_POLL_SECONDS)
+        except LeaseLost as lost:
+            # Another worker may be syncing now; requeue and resume from the
+            # weeks still dirty once the lease is free.
+            logger.warning('Pay job %s stopped: %s', job.id, lost.describe())
+            await _requeue_job(job, self.worker_id)
+            await asyncio.sleep(settings.PAY_JOB_POLL_SECONDS)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next worker resumes it right away.
+            await _requeue_job(job, self.worker_id)
+            raise
+        except Exception as exc:
+            logger.exception('Pay job %s failed', job.id)
+            await _update_job(
+                job, self.worker_id, {'$set': {'state': 'failed', 'error': str(exc), 'finished_at': _now()}}
+            )
+        else:
+            await _update_job(job, self.worker_id, {'$set': {'state': 'succeeded', 'finished_at': _now()}})
+            logger.info('Pay job %s finished', job.id)
+        finally:
+            heartbeat.cancel()
+
+
+worker = PayJobWorker()
+
+
+def start_pay_job_worker() -> None:
+    worker.start()
+
+
+async def stop_pay_job_worker() -> None:
+    await worker.stop()
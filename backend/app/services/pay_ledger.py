@@ -0,0 +1,177 @@
+"""Weekly pay ledger rollup used by dashboard reporting.
+
+Rows in ``pay_ledger_weekly`` are recomputed per week straight from the
+source collections, so a refresh is idempotent and any week can be repaired
+by refreshing it again.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, ReplaceOne
+
+from app.models.pay import Pay
+from app.models.pay_approve import PayApprove
+from app.models.pay_ledger_week import PayLedgerWeek
+from app.models.payroll import Payroll
+from app.models.system_settings import SystemSettings
+from app.services.pay_weeks import bson_date
+from app.services.system_settings import get_system_settings
+
+# (source, model, week date field, amount field)
+LEDGER_SOURCES = (
+    ('pay', Pay, 'week_end', 'amount'),
+    ('pay_approve', PayApprove, 'week_end', 'amount'),
+    ('payroll', Payroll, 'period_end', 'gross_pay'),
+)
+
+# Weeks refreshed per aggregation round trip during a rebuild.
+REBUILD_BATCH_WEEKS = 52
+
+# Employee fields the department column is derived from; changing one needs refresh_pay_ledger_for_employee.
+LEDGER_USER_FIELDS = ('department', 'role')
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _ledger_pipeline(date_field: str, amount_field: str, week_ends: List[datetime]) -> list:
+    employee = {'$ifNull': [{'$arrayElemAt': ['$employee', 0]}, {}]}
+    return [
+        {'$match': {date_field: {'$in': week_ends}}},
+        {
+            '$lookup': {
+                'from': 'users',
+                'localField': 'user_id',
+                'foreignField': '_id',
+                'as': 'employee',
+            }
+        },
+        {
+            '$group': {
+                '_id': {
+                    'week_end': f'${date_field}',
+                    'status': '$status',
+                    # Same rule as the dashboard: only current employees keep a department.
+                    'department': {
+                        '$let': {
+                            'vars': {'employee': employee},
+                            'in': {
+                                '$cond': [
+                                    {
+                                        '$and': [
+                                            {'$eq': ['$$employee.role', 'employee']},
+                                            {'$gt': [{'$ifNull': ['$$employee.department', '']}, '']},
+                                        ]
+                                    },
+                                    '$$employee.department',
+                                    'Unassigned',
+                                ]
+                            },
+                        }
+                    },
+                    'approved_year': {
+                        '$cond': [{'$eq': ['$status', 'approved']}, {'$year': '$created_at'}, None]
+                    },
+                    'approved_month': {
+                        '$cond': [{'$eq': ['$status', 'approved']}, {'$month': '$created_at'}, None]
+                    },
+                },
+                'amount': {'$sum': f'${amount_field}'},
+                'records': {'$sum': 1},
+            }
+        },
+    ]
+
+
+async def refresh_pay_ledger(week_ends: Iterable[Optional[date]]) -> int:
+    """Recompute the ledger rows for the given week end dates from source."""
+    weeks = sorted({_as_date(day) for day in week_ends if day})
+    if not weeks:
+        return 0
+    encoded = [bson_date(day) for day in weeks]
+    refreshed_at = datetime.now(timezone.utc)
+
+    operations: list = []
+    for source, model, date_field, amount_field in LEDGER_SOURCES:
+        rows = await model.get_motor_collection().aggregate(
+            _ledger_pipeline(date_field, amount_field, encoded)
+        ).to_list(None)
+        for row in rows:
+            key = row['_id']
+            approved_month = (
+                datetime(key['approved_year'], key['approved_month'], 1)
+                if key.get('approved_year')
+                else None
+            )
+            filter_ = {
+                'week_end': key['week_end'],
+                'source': source,
+                'status': key['status'],
+                'department': key['department'],
+                'approved_month': approved_month,
+            }
+            operations.append(
+                ReplaceOne(
+                    filter_,
+                    {
+                        **filter_,
+                        'amount': float(row['amount']),
+                        'records': row['records'],
+                        'refreshed_at': refreshed_at,
+                    },
+                    upsert=True,
+                )
+            )
+    # Whatever this refresh did not rewrite no longer exists in the sources.
+    operations.append(DeleteMany({'week_end': {'$in': encoded}, 'refreshed_at': {'$lt': refreshed_at}}))
+
+    await PayLedgerWeek.get_motor_collection().bulk_write(operations, ordered=True)
+    return len(weeks)
+
+
+async def refresh_pay_ledger_for_employee(user_id: ObjectId) -> int:
+    """Refresh every week an employee has pay in, e.g. after their department changes."""
+    weeks = set()
+    for _, model, date_field, _ in LEDGER_SOURCES:
+        values = await model.get_motor_collection().distinct(date_field, {'user_id': user_id})
+        weeks.update(_as_date(value) for value in values)
+    return await refresh_pay_ledger(weeks)
+
+
+async def rebuild_pay_ledger() -> int:
+    """Recompute the whole ledger from the source collections."""
+    weeks = set()
+    for _, model, date_field, _ in LEDGER_SOURCES:
+        values = await model.get_motor_collection().distinct(date_field)
+        weeks.update(_as_date(value) for value in values)
+    ordered = sorted(weeks)
+
+    # Drop rows for weeks that no longer have any pay at all.
+    await PayLedgerWeek.get_motor_collection().delete_many(
+        {'week_end': {'$nin': [bson_date(day) for day in ordered]}}
+    )
+    for index in range(0, len(ordered), REBUILD_BATCH_WEEKS):
+        await refresh_pay_ledger(ordered[index:index + REBUILD_BATCH_WEEKS])
+
+    settings = await get_system_settings()
+    settings.pay_ledger_built_at = datetime.now(timezone.utc)
+    await settings.save()
+    return len(ordered)
+
+
+async def get_pay_ledger_rows(since: date) -> List[PayLedgerWeek]:
+    """Ledger rows for weeks ending on or after ``since``, plus every unapproved row.
+
+    The ledger is built from source the first time it is read.
+    """
+    raw = await SystemSettings.get_motor_collection().find_one({}, {'pay_ledger_built_at': 1})
+    if not raw or not raw.get('pay_ledger_built_at'):
+        await rebuild_pay_ledger()
+
+    return await PayLedgerWeek.find(
+        {'$or': [{'week_end': {'$gte': bson_date(since)}}, {'source': 'pay_approve'}]}
+    ).to_list()
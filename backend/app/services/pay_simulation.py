@@ -0,0 +1,172 @@
+"""What-if pay simulation over a cached employee x week hours matrix."""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from app.config import settings
+from app.models.adjustment import AdjustmentType
+from app.models.shift import Shift
+from app.services import pay_engine
+from app.services.pay_adjustments import AdjustmentResolver, ApplicableAdjustment, effective_on
+from app.services.pay_weeks import WeekRange, containing_week, shift_generation, week_range
+from app.services.shift_hours import SHIFT_MINUTES_EXPR
+
+
+@dataclass
+class HoursMatrix:
+    weeks: List[WeekRange]
+    employee_ids: List[ObjectId]
+    hours: np.ndarray  # shape (len(employee_ids), len(weeks))
+    generation: int
+    built_at: float
+
+
+@dataclass
+class HypotheticalAdjustment:
+    adjustment_type: AdjustmentType
+    employee_ids: Optional[set] = None  # None applies to every employee
+
+
+@dataclass
+class SimulationResult:
+    weeks: List[WeekRange]
+    employee_ids: List[ObjectId]
+    baseline: np.ndarray
+    scenario: np.ndarray
+
+
+_matrix_cache: Dict[Tuple[int, date], HoursMatrix] = {}
+
+
+def _recent_weeks(count: int, reference: date) -> List[WeekRange]:
+    _, last_week_end = week_range(reference)
+    return [week_range(last_week_end - timedelta(weeks=offset)) for offset in range(count - 1, -1, -1)]
+
+
+async def _build_hours_matrix(weeks: List[WeekRange]) -> HoursMatrix:
+    generation = shift_generation()
+    rows = await Shift.find(
+        Shift.shift_date >= weeks[0][0],
+        Shift.shift_date <= weeks[-1][1],
+        Shift.status == 'completed',
+    ).aggregate(
+        [
+            {
+                '$group': {
+                    '_id': {'employee_id': '$employee_id', 'shift_date': '$shift_date'},
+                    'minutes': {'$sum': SHIFT_MINUTES_EXPR},
+                }
+            },
+        ]
+    ).to_list()
+
+    week_index = {week_end: index for index, (_, week_end) in enumerate(weeks)}
+    employee_index: Dict[ObjectId, int] = {}
+    cells: List[Tuple[int, int, int]] = []
+    for row in rows:
+        employee_id = row['_id']['employee_id']
+        shift_day = row['_id']['shift_date']
+        shift_day = shift_day.date() if isinstance(shift_day, datetime) else shift_day
+        column = week_index[containing_week(shift_day)[1]]
+        line = employee_index.setdefault(employee_id, len(employee_index))
+        cells.append((line, column, int(row['minutes'])))
+
+    minutes = np.zeros((len(employee_index), len(weeks)), dtype=np.int64)
+    for line, column, value in cells:
+        minutes[line, column] += value
+
+    return HoursMatrix(
+        weeks=weeks,
+        employee_ids=list(employee_index),
+        hours=minutes / 60,
+        generation=generation,
+        built_at=time.monotonic(),
+    )
+
+
+async def get_hours_matrix(week_count: int, reference: date) -> HoursMatrix:
+    """Employee x week hours for the last ``week_count`` pay weeks, cached per process.
+
+    Entries are dropped when this process writes shifts, and expire after
+    PAY_SIMULATION_CACHE_SECONDS to pick up writes made by other workers.
+    """
+    weeks = _recent_weeks(week_count, reference)
+    key = (week_count, weeks[-1][1])
+    cached = _matrix_cache.get(key)
+    if (
+        cached
+        and cached.generation == shift_generation()
+        and time.monotonic() - cached.built_at < settings.PAY_SIMULATION_CACHE_SECONDS
+    ):
+        return cached
+
+    matrix = await _build_hours_matrix(weeks)
+    _matrix_cache.clear()
+    _matrix_cache[key] = matrix
+    return matrix
+
+
+def _scenario_adjustments(
+    employee_id: ObjectId,
+    week_end: date,
+    current: Sequence[ApplicableAdjustment],
+    hypothetical: Sequence[HypotheticalAdjustment],
+) -> List[ApplicableAdjustment]:
+    applicable = list(current)
+    for extra in hypothetical:
+        adjustment_type = extra.adjustment_type
+        if extra.employee_ids is not None and employee_id not in extra.employee_ids:
+            continue
+        if not effective_on(adjustment_type.effective_start, adjustment_type.effective_end, week_end):
+            continue
+        applicable.append((adjustment_type, None))
+    return applicable
+
+
+def simulate(
+    matrix: HoursMatrix,
+    pay_rates: Dict[ObjectId, float],
+    rate_changes: Dict[ObjectId, float],
+    resolver: AdjustmentResolver,
+    hypothetical: Sequence[HypotheticalAdjustment],
+) -> SimulationResult:
+    """Net pay per employee and week under current rules and under the scenario."""
+    shape = matrix.hours.shape
+    baseline = np.zeros(shape, dtype=np.float64)
+    scenario = np.zeros(shape, dtype=np.float64)
+
+    # Employees missing from ``pay_rates`` were deleted and are skipped, as in pay sync.
+    known = [line for line, employee_id in enumerate(matrix.employee_ids) if employee_id in pay_rates]
+
+    for column, (_, week_end) in enumerate(matrix.weeks):
+        lines = [line for line in known if matrix.hours[line, column] > 0]
+        if not lines:
+            continue
+        ids = [matrix.employee_ids[line] for line in lines]
+        hours = matrix.hours[lines, column]
+        current = [resolver.applicable(employee_id, week_end) for employee_id in ids]
+
+        before = pay_engine.compute_week_pay(hours, [pay_rates[employee_id] for employee_id in ids], current)
+        after = pay_engine.compute_week_pay(
+            hours,
+            [rate_changes.get(employee_id, pay_rates[employee_id]) for employee_id in ids],
+            [
+                _scenario_adjustments(employee_id, week_end, applicable, hypothetical)
+                for employee_id, applicable in zip(ids, current)
+            ],
+        )
+        baseline[lines, column] = before.net
+        scenario[lines, column] = after.net
+
+    return SimulationResult(
+        weeks=matrix.weeks,
+        employee_ids=matrix.employee_ids,
+        baseline=baseline,
+        scenario=scenario,
+    )
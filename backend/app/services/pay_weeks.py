@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.models.pay_approve import PayApprove
+from app.models.pay_dirty_week import PayDirtyWeek
+from app.models.shift import Shift
+from app.models.system_settings import SystemSettings
+from app.services.system_settings import get_current_date, get_system_settings
+
+WeekRange = Tuple[date, date]
+
+# Bumped on every shift-driven mark so in-process caches of shift hours can invalidate.
+_shift_generation = 0
+
+
+def week_range(reference: date) -> WeekRange:
+    """Return the latest Saturday-Friday pay week ending on or before ``reference``."""
+    days_since_friday = (reference.weekday() - 4) % 7
+    week_end = reference - timedelta(days=days_since_friday)
+    week_start = week_end - timedelta(days=6)
+    return week_start, week_end
+
+
+def containing_week(day: date) -> WeekRange:
+    """Return the Saturday-Friday pay week that contains ``day``."""
+    week_end = day + timedelta(days=(4 - day.weekday()) % 7)
+    return week_end - timedelta(days=6), week_end
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def bson_date(value: date) -> datetime:
+    """Encode a ``date`` the way Beanie stores it, for raw driver queries."""
+    return datetime.combine(value, time.min)
+
+
+async def mark_weeks_dirty(week_ranges: Iterable[WeekRange]) -> int:
+    """Flag pay weeks for recomputation on the next pay sync."""
+    ranges: Set[WeekRange] = set(week_ranges)
+    if not ranges:
+        return 0
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {'week_start': bson_date(week_start), 'week_end': bson_date(week_end)},
+            {'$set': {'marked_at': now}},
+            upsert=True,
+        )
+        for week_start, week_end in ranges
+    ]
+    await PayDirtyWeek.get_motor_collection().bulk_write(operations, ordered=False)
+    return len(ranges)
+
+
+def shift_generation() -> int:
+    return _shift_generation
+
+
+async def mark_dates_dirty(days: Iterable[Optional[date]]) -> int:
+    """Flag the pay weeks containing shift dates that were written."""
+    global _shift_generation
+    _shift_generation += 1
+    return await mark_weeks_dirty(containing_week(day) for day in days if day)
+
+
+async def mark_pay_approval_weeks_dirty(employee_id: Optional[ObjectId] = None) -> int:
+    """Flag every week that still has unapproved pay, optionally for one employee.
+
+    Rate and adjustment changes only affect records that have not been approved
+    yet, and every such record lives in ``payapprove``.
+    """
+    match = {'user_id': employee_id} if employee_id else {}
+    rows = await PayApprove.get_motor_collection().aggregate(
+        [
+            {'$match': match},
+            {'$group': {'_id': {'week_start': '$week_start', 'week_end': '$week_end'}}},
+        ]
+    ).to_list(None)
+    return await mark_weeks_dirty(
+        (_as_date(row['_id']['week_start']), _as_date(row['_id']['week_end'])) for row in rows
+    )
+
+
+async def _seed_from_completed_shifts() -> None:
+    """Mark every week with completed shifts once, when the ledger is first used."""
+    raw = await SystemSettings.get_motor_collection().find_one({}, {'pay_weeks_seeded_at': 1})
+    if raw and raw.get('pay_weeks_seeded_at'):
+        return
+
+    shift_dates = await Shift.get_motor_collection().distinct('shift_date', {'status': 'completed'})
+    await mark_dates_dirty(_as_date(value) for value in shift_dates)
+
+    settings = await get_system_settings()
+    settings.pay_weeks_seeded_at = datetime.now(timezone.utc)
+    await settings.save()
+
+
+async def get_dirty_weeks() -> List[PayDirtyWeek]:
+    """Dirty weeks that have ended; the current week stays marked until it is over.
+
+    Pending pay for a week in progress could be approved before its last
+    shifts, and sync leaves approved employees alone for the rest of the week.
+    """
+    await _seed_from_completed_shifts()
+    today = await get_current_date()
+    return await PayDirtyWeek.find(PayDirtyWeek.week_end < today).sort('+week_end').to_list()
+
+
+async def clear_dirty_weeks(entries: Iterable[PayDirtyWeek]) -> int:
+    """Clear processed weeks unless they were marked again while the sync ran."""
+    conditions = [{'_id': entry.id, 'marked_at': entry.marked_at} for entry in entries]
+    if not conditions:
+        return 0
+    result = await PayDirtyWeek.get_motor_collection().delete_many({'$or': conditions})
+    return result.deleted_count
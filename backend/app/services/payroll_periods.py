@@ -0,0 +1,64 @@
+"""Keep one payroll row per employee and pay period.
+
+``Payroll`` carries a unique index on (user_id, period_start, period_end).
+Databases written before the index existed may hold duplicate periods, and
+creating the index would fail on them, so they are collapsed first.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime
+from typing import List, Set
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.models.payroll import PAYROLL_PERIOD_INDEX
+
+DEDUP_BATCH_SIZE = 500
+
+
+async def has_period_index(collection: AsyncIOMotorCollection) -> bool:
+    return PAYROLL_PERIOD_INDEX in await collection.index_information()
+
+
+async def dedup_payroll_periods(
+    collection: AsyncIOMotorCollection,
+    batch_size: int = DEDUP_BATCH_SIZE,
+    pause: float = 0.0,
+) -> List[date]:
+    """Delete duplicate payroll rows, keeping approved over pending, then the oldest.
+
+    Deletes run in batches of ``batch_size`` ids with ``pause`` seconds between
+    them. Returns the period_end of every period that lost rows so callers can
+    refresh the pay ledger.
+    """
+    pipeline = [
+        # "approved" sorts before "pending", so the keeper is first in each group.
+        {"$sort": {"status": 1, "created_at": 1, "_id": 1}},
+        {
+            "$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "period_start": "$period_start",
+                    "period_end": "$period_end",
+                },
+                "ids": {"$push": "$_id"},
+            }
+        },
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+
+    affected: Set[date] = set()
+    pending_ids = []
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        period_end = group["_id"]["period_end"]
+        affected.add(period_end.date() if isinstance(period_end, datetime) else period_end)
+        pending_ids.extend(group["ids"][1:])
+        while len(pending_ids) >= batch_size:
+            await collection.delete_many({"_id": {"$in": pending_ids[:batch_size]}})
+            del pending_ids[:batch_size]
+            await asyncio.sleep(pause)
+    if pending_ids:
+        await collection.delete_many({"_id": {"$in": pending_ids}})
+
+    return sorted(affected)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.models.shift import Shift
+
+
+def minute_of_day(value: str) -> int:
+    """Convert an ``HH:MM`` string into minutes since midnight."""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def duration_between(start_minute: int, end_minute: int) -> int:
+    """Paid minutes between two times of day; end times before the start count as zero."""
+    return max(end_minute - start_minute, 0)
+
+
+def shift_minutes(shift: Shift) -> int:
+    if shift.duration_minutes is not None:
+        return shift.duration_minutes
+    return duration_between(minute_of_day(shift.start_time), minute_of_day(shift.end_time))
+
+
+def shift_hours(shift: Shift) -> float:
+    return round(shift_minutes(shift) / 60, 2)
+
+
+def time_minutes_expr(field: str) -> dict:
+    # "HH:MM" -> minutes since midnight
+    return {
+        '$add': [
+            {'$multiply': [{'$toInt': {'$substrBytes': [field, 0, 2]}}, 60]},
+            {'$toInt': {'$substrBytes': [field, 3, 2]}},
+        ]
+    }
+
+
+# Aggregation expression mirroring ``shift_minutes``: the stored duration, or
+# one derived from the time strings for documents not yet backfilled.
+SHIFT_MINUTES_EXPR = {
+    '$ifNull': [
+        '$duration_minutes',
+        {
+            '$let': {
+                'vars': {
+                    'start': time_minutes_expr('$start_time'),
+                    'end': time_minutes_expr('$end_time'),
+                },
+                'in': {'$max': [{'$subtract': ['$$end', '$$start']}, 0]},
+            }
+        },
+    ]
+}
@@ -0,0 +1,52 @@
+"""Keyset (cursor) pagination helpers for Mongo queries."""
+import base64
+import binascii
+from datetime import date, datetime, time
+from typing import Any, List, Sequence, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, status
+from pymongo import ASCENDING
+
+SortKey = Tuple[str, int]
+
+
+def _bson_value(value: Any) -> Any:
+    # BSON has no date type; Beanie stores dates as midnight datetimes.
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time.min)
+    return value
+
+
+def cursor_values(document: Any, sort: Sequence[SortKey]) -> List[Any]:
+    """Sort key values of a Beanie document, in ``sort`` order."""
+    return [_bson_value(getattr(document, "id" if field == "_id" else field)) for field, _ in sort]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json_util.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Sequence[SortKey]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json_util.loads(raw)
+    except (binascii.Error, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: Sequence[SortKey], values: Sequence[Any]) -> dict:
+    """Match documents that sort strictly after ``values``.
+
+    The last sort key must be unique (normally ``_id``) for pages to be stable.
+    """
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        clause = {prior: values[position] for position, (prior, _) in enumerate(sort[:index])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[index]}
+        clauses.append(clause)
+    return {"$or": clauses}
@@ -1,96 +1,317 @@
+from apscheduler.jobstores.mongodb import MongoDBJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_RUNNING, STATE_STOPPED
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+import asyncio
 from datetime import datetime, timedelta, timezone, date
 import logging
+import os
+import pickle
+import socket
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
 from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
 
-from app.models.user import User
-from app.models.attendance import Attendance
+from app.config import settings
 from app.models.payroll import Payroll
-from app.services.system_settings import get_current_date
+from app.models.scheduled_job_run import ScheduledJobRun
+from app.models.system_settings import SystemSettings
+from app.models.user import User
+from app.services.pay_ledger import refresh_pay_ledger
+from app.services.pay_weeks import bson_date
+from app.services.attendance_store import completed_hours_by_user
+from app.services.attendance_archive import run_attendance_archive
+from app.services.job_lock import PAYROLL_RUN_LOCK, SCHEDULER_LEADER_LOCK, JobLease, LeaseHeld
 
 logger = logging.getLogger(__name__)
-scheduler = AsyncIOScheduler()
+# Jobs live in MongoDB so schedules survive restarts. A run missed while no
+# leader was up fires once when one takes over.
+scheduler = AsyncIOScheduler(job_defaults={"coalesce": True, "misfire_grace_time": None})
+
+PAYROLL_JOB_ID = "payroll_generation"
+ARCHIVE_JOB_ID = "attendance_archive"
+
+_leader_task: Optional[asyncio.Task] = None
+_leader_lease: Optional[JobLease] = None
+_jobs_timezone: Optional[str] = None
+
+async def schedule_timezone() -> str:
+    """PAYROLL_SCHEDULE_TIMEZONE if set, else the system timezone admins choose in settings."""
+    if settings.PAYROLL_SCHEDULE_TIMEZONE:
+        return settings.PAYROLL_SCHEDULE_TIMEZONE
+    # Read it fresh: the admin may have changed it through another worker.
+    raw = await SystemSettings.get_motor_collection().find_one({}, {"timezone": 1})
+    return (raw or {}).get("timezone") or SystemSettings.model_fields["timezone"].default
+
+def payroll_period(at: datetime, zone_name: str) -> Tuple[date, date]:
+    """The pay period closed by the latest scheduled run at or before ``at``.
+
+    Runs fire at PAYROLL_SCHEDULE_ANCHOR + k * PAYROLL_SCHEDULE_DAYS; each
+    covers the PAYROLL_SCHEDULE_DAYS days before its fire date, so
+    consecutive periods meet without gaps or overlap. Deriving the
+    period from that grid rather than from the current date keeps a run that
+    fires late (after downtime, or coalesced misfires) on the period it was
+    scheduled for. The grid is laid out in ``zone_name``.
+    """
+    zone = ZoneInfo(zone_name)
+    anchor = settings.PAYROLL_SCHEDULE_ANCHOR
+    if anchor.tzinfo is not None:
+        anchor = anchor.astimezone(zone).replace(tzinfo=None)
+    if at.tzinfo is not None:
+        at = at.astimezone(zone).replace(tzinfo=None)
+    interval = timedelta(days=settings.PAYROLL_SCHEDULE_DAYS)
+    fired_at = anchor + interval * ((at - anchor) // interval)
+    period_end = fired_at.date() - timedelta(days=1)
+    return period_end - timedelta(days=settings.PAYROLL_SCHEDULE_DAYS - 1), period_end
+
+async def generate_payroll(holder: str = "scheduler", at: Optional[datetime] = None) -> int:
+    """Generate payroll for ``payroll_period(at)`` (default now) under the payroll lease.
+
+    Raises LeaseHeld if a run is in progress.
+    """
+    period_start, period_end = payroll_period(at or datetime.now(timezone.utc), await schedule_timezone())
+    async with JobLease(PAYROLL_RUN_LOCK, job="payroll.run", holder=holder):
+        return await _generate_payroll(period_start, period_end)
+
+async def _record_run(job_id: str, started_at: datetime, status: str, detail: Optional[str]) -> None:
+    await ScheduledJobRun.get_motor_collection().update_one(
+        {"job_id": job_id},
+        {"$set": {
+            "last_started_at": started_at,
+            "last_finished_at": datetime.now(timezone.utc),
+            "last_status": status,
+            "last_detail": detail,
+            "last_runner": _process_name(),
+        }},
+        upsert=True,
+    )
 
-async def generate_payroll():
-    """Generate payroll for all employees for the previous 14-day period."""
+async def scheduled_payroll():
+    """Scheduler entry point; another worker already running payroll is not an error."""
+    started_at = datetime.now(timezone.utc)
+    try:
+        count = await generate_payroll()
+    except LeaseHeld as held:
+        logger.info(f"[Scheduler] Skipping payroll generation: {held.describe()}")
+        await _record_run(PAYROLL_JOB_ID, started_at, "skipped", held.describe())
+    except Exception as e:
+        await _record_run(PAYROLL_JOB_ID, started_at, "failed", str(e))
+    else:
+        await _record_run(PAYROLL_JOB_ID, started_at, "succeeded", f"Created {count} payroll entries")
+
+async def scheduled_attendance_archive():
+    """Scheduler entry point for moving old attendance to the archive tier."""
+    started_at = datetime.now(timezone.utc)
+    try:
+        moved = await run_attendance_archive()
+    except LeaseHeld as held:
+        logger.info(f"[Scheduler] Skipping attendance archive: {held.describe()}")
+        await _record_run(ARCHIVE_JOB_ID, started_at, "skipped", held.describe())
+    except Exception as e:
+        logger.error(f"[Scheduler] Attendance archive failed: {e}")
+        await _record_run(ARCHIVE_JOB_ID, started_at, "failed", str(e))
+    else:
+        await _record_run(ARCHIVE_JOB_ID, started_at, "succeeded", f"Archived {moved} attendance sessions")
+
+async def _generate_payroll(period_start: date, period_end: date):
+    """Generate payroll for all employees for the given period."""
     try:
         logger.info("[Scheduler] Starting payroll generation...")
         
-        # Calculate period
-        today = await get_current_date()
-        period_end = today - timedelta(days=1)  # Yesterday
-        period_start = period_end - timedelta(days=13)  # 14 days total
-        
         logger.info(f"[Scheduler] Generating payroll for period {period_start} to {period_end}")
         
-        # Get all active employees
-        employees = await User.find(User.role == "employee", User.status == "active").to_list()
-        
-        payroll_count = 0
+        # Completed hours per employee for the period, joined with active
+        # employees' pay rates; employees without hours in the period drop out.
+        hours = await completed_hours_by_user(period_start, period_end)
+        rows = [
+            {
+                "_id": employee["_id"],
+                "total_hours": hours[employee["_id"]],
+                "pay_rate": employee["pay_rate"],
+                "username": employee["username"],
+            }
+            async for employee in User.get_motor_collection().find(
+                {
+                    "_id": {"$in": [user_id for user_id, total in hours.items() if total != 0]},
+                    "role": "employee",
+                    "status": "active",
+                },
+                {"pay_rate": 1, "username": 1},
+            )
+        ]
         
-        for employee in employees:
-            # Get attendance records for the period
-            attendance_records = await Attendance.find(
-                Attendance.user_id == employee.id,
-                Attendance.date >= period_start,
-                Attendance.date <= period_end,
-                Attendance.clock_out != None  # Only completed attendance
-            ).to_list()
-            
-            # Calculate total hours
-            total_hours = sum(record.hours_worked or 0 for record in attendance_records)
-            
-            # Skip if no hours worked
-            if total_hours == 0:
-                logger.info(f"[Scheduler] Skipping {employee.username} - no hours worked")
-                continue
-            
-            # Calculate gross pay
-            gross_pay = total_hours * employee.pay_rate
-            
-            # Create payroll entry
-            payroll = Payroll(
-                user_id=employee.id,
-                period_start=period_start,
-                period_end=period_end,
-                total_hours=total_hours,
-                gross_pay=gross_pay,
-                status="pending"
+        # Upsert on the unique period key so re-running a period refreshes pending
+        # rows instead of duplicating them; approved rows are left untouched.
+        period_key = {"period_start": bson_date(period_start), "period_end": bson_date(period_end)}
+        operations = []
+        for row in rows:
+            total_hours = row["total_hours"]
+            gross_pay = total_hours * row["pay_rate"]
+            key = {"user_id": row["_id"], **period_key}
+            operations.append(
+                UpdateOne(
+                    key,
+                    {"$setOnInsert": {
+                        "total_hours": total_hours,
+                        "gross_pay": gross_pay,
+                        "status": "pending",
+                        "approved_by": None,
+                        "created_at": datetime.now(timezone.utc),
+                    }},
+                    upsert=True,
+                )
             )
-            
-            await payroll.insert()
-            payroll_count += 1
-            
-            logger.info(f"[Scheduler] Created payroll for {employee.username}: {total_hours}h = ${gross_pay:.2f}")
+            operations.append(
+                UpdateOne(
+                    {**key, "status": "pending"},
+                    {"$set": {"total_hours": total_hours, "gross_pay": gross_pay}},
+                )
+            )
+            logger.info(f"[Scheduler] Payroll for {row['username']}: {total_hours}h = ${gross_pay:.2f}")
+        
+        payroll_count = updated_count = 0
+        if operations:
+            result = await Payroll.get_motor_collection().bulk_write(operations, ordered=True)
+            payroll_count = result.upserted_count
+            updated_count = result.modified_count
         
-        logger.info(f"[Scheduler] Created {payroll_count} payroll entries for period {period_start} to {period_end}")
+        if payroll_count or updated_count:
+            await refresh_pay_ledger([period_end])
+        logger.info(
+            f"[Scheduler] Created {payroll_count} and refreshed {updated_count} payroll entries "
+            f"for period {period_start} to {period_end}"
+        )
+        return payroll_count
         
     except Exception as e:
         logger.error(f"[Scheduler] Payroll generation failed: {e}")
+        raise
 
-def start_scheduler():
-    """Start the APScheduler for automated payroll."""
-    try:
-        # Run every 14 days at midnight
+def _process_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def payroll_trigger(zone_name: str) -> IntervalTrigger:
+    """Every PAYROLL_SCHEDULE_DAYS, counted from the configured anchor rather than from startup."""
+    return IntervalTrigger(
+        days=settings.PAYROLL_SCHEDULE_DAYS,
+        start_date=settings.PAYROLL_SCHEDULE_ANCHOR,
+        timezone=zone_name,
+    )
+
+async def read_scheduled_jobs() -> List[dict]:
+    """Jobs as persisted by whichever process leads, so any API worker can report them."""
+    collection = Payroll.get_motor_collection().database[settings.SCHEDULER_JOBS_COLLECTION]
+    jobs = []
+    async for doc in collection.find({}).sort("next_run_time", 1):
+        state = pickle.loads(doc["job_state"])
+        next_run = doc.get("next_run_time")
+        jobs.append({
+            "id": doc["_id"],
+            "name": state.get("name"),
+            "next_run_time": datetime.fromtimestamp(next_run, timezone.utc) if next_run is not None else None,
+        })
+    return jobs
+
+def _ensure_payroll_job(zone_name: str):
+    trigger = payroll_trigger(zone_name)
+    job = scheduler.get_job(PAYROLL_JOB_ID)
+    if job is None:
         scheduler.add_job(
-            generate_payroll,
-            trigger=IntervalTrigger(days=14),
-            id="payroll_generation",
+            scheduled_payroll,
+            trigger=trigger,
+            id=PAYROLL_JOB_ID,
             name="Generate bi-weekly payroll",
-            replace_existing=True
         )
-        
-        scheduler.start()
-        logger.info("[Scheduler] APScheduler started - payroll will run every 14 days")
-    except Exception as e:
-        logger.error(f"[Scheduler] Failed to start scheduler: {e}")
+    elif (job.trigger.interval, job.trigger.start_date) != (trigger.interval, trigger.start_date):
+        # Only reschedule on config changes; otherwise keep the stored next run.
+        job.reschedule(trigger=trigger)
+
+def _ensure_archive_job(zone_name: str):
+    job = scheduler.get_job(ARCHIVE_JOB_ID)
+    if settings.ATTENDANCE_ARCHIVE_AFTER_DAYS <= 0:
+        if job is not None:
+            job.remove()
+        return
+    trigger = CronTrigger(hour=settings.ATTENDANCE_ARCHIVE_HOUR, timezone=zone_name)
+    if job is None:
+        scheduler.add_job(
+            scheduled_attendance_archive,
+            trigger=trigger,
+            id=ARCHIVE_JOB_ID,
+            name="Archive old attendance",
+        )
+    elif (str(job.trigger), str(job.trigger.timezone)) != (str(trigger), str(trigger.timezone)):
+        job.reschedule(trigger=trigger)
+
+def _ensure_jobs(zone_name: str):
+    """Add the scheduled jobs, or reschedule them when their settings or timezone changed."""
+    global _jobs_timezone
+    _ensure_payroll_job(zone_name)
+    _ensure_archive_job(zone_name)
+    _jobs_timezone = zone_name
+
+def _become_leader(zone_name: str):
+    if scheduler.state == STATE_PAUSED:
+        scheduler.resume()
+        _ensure_jobs(zone_name)
+        return
+    scheduler.add_jobstore(
+        MongoDBJobStore(
+            database=settings.DB_NAME,
+            collection=settings.SCHEDULER_JOBS_COLLECTION,
+            client=MongoClient(settings.MONGODB_URI),
+        ),
+        "default",
+    )
+    scheduler.start()
+    _ensure_jobs(zone_name)
+
+async def _lead():
+    """Keep trying to be the one process that runs scheduled jobs."""
+    lease = _leader_lease
+    while True:
+        try:
+            if scheduler.state == STATE_RUNNING:
+                if not await lease.extend():
+                    scheduler.pause()
+                    logger.warning("[Scheduler] Lost scheduler leadership; pausing scheduled jobs")
+                elif (zone_name := await schedule_timezone()) != _jobs_timezone:
+                    _ensure_jobs(zone_name)
+                    logger.info(f"[Scheduler] Rescheduled jobs for timezone {zone_name}")
+            elif await lease.acquire():
+                _become_leader(await schedule_timezone())
+                job = scheduler.get_job(PAYROLL_JOB_ID)
+                logger.info(f"[Scheduler] Elected scheduler leader; next payroll run at {job.next_run_time}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[Scheduler] Leader election failed: {e}")
+        await asyncio.sleep(settings.JOB_LOCK_HEARTBEAT_SECONDS)
+
+def start_scheduler():
+    """Join scheduler leader election; only the elected process runs scheduled jobs."""
+    global _leader_task, _leader_lease
+    if _leader_task is None:
+        _leader_lease = JobLease(SCHEDULER_LEADER_LOCK, job="scheduler", holder=_process_name())
+        _leader_task = asyncio.create_task(_lead())
+        logger.info("[Scheduler] Joined scheduler leader election")
 
-def shutdown_scheduler():
-    """Shutdown the APScheduler."""
+async def shutdown_scheduler():
+    """Stop scheduled jobs and hand leadership to another process."""
+    global _leader_task
     try:
-        if scheduler.running:
-            scheduler.shutdown()
+        if _leader_task:
+            _leader_task.cancel()
+            try:
+                await _leader_task
+            except asyncio.CancelledError:
+                pass
+            _leader_task = None
+        if scheduler.state != STATE_STOPPED:
+            scheduler.shutdown(wait=False)
+            await _leader_lease.release()
             logger.info("[Scheduler] APScheduler shut down")
     except Exception as e:
         logger.error(f"[Scheduler] Failed to shutdown scheduler: {e}")
@@ -0,0 +1,200 @@
+"""Compare the per-session and monthly-bucket attendance layouts.
+
+Seeds ``--employees`` x ``--days`` of attendance into a scratch database,
+measures collection and index sizes and the latency of the attendance reads
+the API makes (summary, users list, payroll, dashboard, batch overlap
+checks, rollup rebuild) with ATTENDANCE_STORAGE="sessions", then moves the
+history into monthly buckets and repeats with "monthly". Writes the sizes
+and p50/p95 latencies to a JSON report like the other benchmarks.
+
+Needs a local mongod (MONGODB_URI); the API does not have to be running:
+
+    python benchmarks/attendance_layouts.py --employees 2000 --days 365
+
+The scratch database (``--database``, default ``<DB_NAME>_layout_bench``)
+is dropped at the start of every run.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+# clock_storm also puts the backend directory on the path for the app imports below.
+from clock_storm import RESULTS_DIR, _git_commit
+
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import settings
+from app.database import init_db
+from app.models.attendance import Attendance
+from app.models.attendance_month import AttendanceMonth
+from app.services import attendance_store
+from app.services.pay_weeks import bson_date
+
+SEED_BATCH_SIZE = 5000
+
+
+async def seed(user_ids: List[ObjectId], start: date, days: int, rng: random.Random) -> int:
+    collection = Attendance.get_motor_collection()
+    batch = []
+    total = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for user_id in user_ids:
+            if rng.random() < 0.3:
+                continue  # a day off
+            clock_in = datetime.combine(day, day_time(6), tzinfo=timezone.utc) + timedelta(minutes=rng.randint(0, 600))
+            hours = round(rng.uniform(3, 10), 2)
+            batch.append(
+                {
+                    "user_id": user_id,
+                    "clock_in": clock_in,
+                    "clock_out": clock_in + timedelta(hours=hours),
+                    "hours_worked": hours,
+                    "date": bson_date(day),
+                }
+            )
+            if len(batch) >= SEED_BATCH_SIZE:
+                await collection.insert_many(batch, ordered=False)
+                total += len(batch)
+                batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        total += len(batch)
+    return total
+
+
+async def storage_sizes() -> Dict[str, Dict]:
+    sizes = {}
+    for model in (Attendance, AttendanceMonth):
+        collection = model.get_motor_collection()
+        stats = await collection.database.command("collStats", collection.name)
+        sizes[collection.name] = {
+            "count": stats.get("count", 0),
+            "data_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+            "index_sizes": dict(stats.get("indexSizes", {})),
+        }
+    sizes["total_index_bytes"] = sum(entry["index_bytes"] for entry in sizes.values())
+    return sizes
+
+
+async def _drain(iterator) -> int:
+    count = 0
+    async for _ in iterator:
+        count += 1
+    return count
+
+
+def read_operations(user_ids: List[ObjectId], end: date, rng: random.Random) -> Dict[str, Callable[[], Awaitable]]:
+    last_month_end = date(end.year, end.month, 1) - timedelta(days=1)
+    last_month_start = date(last_month_end.year, last_month_end.month, 1)
+    return {
+        "summary_latest_completed": lambda: attendance_store.latest_completed(rng.choice(user_ids)),
+        "logs_recent_sessions": lambda: attendance_store.recent_sessions(10),
+        "batch_last_clock_outs_50": lambda: attendance_store.last_clock_outs(rng.sample(user_ids, min(50, len(user_ids)))),
+        "payroll_hours_14_days": lambda: attendance_store.completed_hours_by_user(end - timedelta(days=13), end),
+        "hours_full_month": lambda: attendance_store.completed_hours_by_user(last_month_start, last_month_end),
+        "dashboard_sessions_60_days": lambda: _drain(attendance_store.iter_sessions(end - timedelta(days=60))),
+        "export_one_employee_year": lambda: _drain(
+            attendance_store.iter_sessions(end - timedelta(days=364), end, rng.choice(user_ids))
+        ),
+        "rollup_rebuild_one_employee": lambda: _drain(attendance_store.iter_daily_totals(rng.choice(user_ids))),
+    }
+
+
+async def time_reads(operations: Dict[str, Callable[[], Awaitable]], repeat: int) -> Dict[str, Dict]:
+    results = {}
+    for name, operation in operations.items():
+        await operation()  # warm the cache
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await operation()
+            latencies.append((time.perf_counter() - started) * 1000)
+        values = np.array(latencies)
+        results[name] = {
+            "runs": repeat,
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "max_ms": round(float(values.max()), 2),
+        }
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings.DB_NAME = args.database
+    settings.ATTENDANCE_STORAGE = "sessions"
+    client = AsyncIOMotorClient(settings.MONGODB_URI)
+    await client.drop_database(args.database)
+    client.close()
+    await init_db()
+
+    rng = random.Random(args.seed)
+    user_ids = [ObjectId() for _ in range(args.employees)]
+    end = date.today() - timedelta(days=1)
+    started = time.perf_counter()
+    sessions = await seed(user_ids, end - timedelta(days=args.days - 1), args.days, rng)
+    print(f"Seeded {sessions} sessions in {time.perf_counter() - started:.1f}s")
+
+    started_at = datetime.now(timezone.utc)
+    layouts = {}
+    for layout in ("sessions", "monthly"):
+        settings.ATTENDANCE_STORAGE = layout
+        if layout == "monthly":
+            started = time.perf_counter()
+            moved = await attendance_store.move_closed_sessions(batch_size=args.move_batch_size)
+            print(f"Moved {moved} sessions into monthly buckets in {time.perf_counter() - started:.1f}s")
+            # Deleted documents leave their space in the files until compacted.
+            try:
+                await Attendance.get_motor_collection().database.command("compact", Attendance.Settings.name)
+            except Exception as exc:
+                print(f"compact skipped: {exc}")
+        layouts[layout] = {
+            "storage": await storage_sizes(),
+            "reads": await time_reads(read_operations(user_ids, end, rng), args.repeat),
+        }
+        print(
+            f"{layout}: {layouts[layout]['storage']['total_index_bytes'] / 2**20:.1f} MiB of indexes; "
+            + ", ".join(f"{name} p50 {row['p50_ms']} ms" for name, row in layouts[layout]["reads"].items())
+        )
+
+    commit = _git_commit()
+    report = {
+        "benchmark": "attendance_layouts",
+        "git_commit": commit,
+        "started_at": started_at.isoformat(),
+        "config": {
+            "database": args.database,
+            "employees": args.employees,
+            "days": args.days,
+            "sessions": sessions,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "layouts": layouts,
+    }
+
+    output = args.output or RESULTS_DIR / f"attendance_layouts_{started_at:%Y%m%dT%H%M%SZ}_{commit or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default=f"{settings.DB_NAME}_layout_bench", help="scratch database, dropped first")
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per read")
+    parser.add_argument("--move-batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="report path (default: benchmarks/results/)")
+    asyncio.run(main(parser.parse_args()))
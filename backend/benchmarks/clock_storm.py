@@ -0,0 +1,295 @@
+"""Clock-storm load test for the attendance clock-in/clock-out endpoints.
+
+Simulates a shift change: N employees clock in within a ramp window, hold,
+then clock out the same way. Seeds the employees straight into the database
+the API uses (MONGODB_URI / DB_NAME), mints their tokens with JWT_SECRET
+instead of logging in, and writes latency percentiles, throughput and error
+rates to a JSON report that can be compared across commits.
+
+Start the API against a local mongod first, then:
+
+    python benchmarks/clock_storm.py --employees 2000 --ramp 120 --concurrency 200
+
+Seeded employees are named bench00000, bench00001, ... and are reused across
+runs; ``--cleanup`` removes them and their attendance and shifts.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import numpy as np
+
+from app.database import init_db
+from app.models.attendance import Attendance
+from app.models.shift import Shift
+from app.models.user import User
+from app.services.system_settings import get_current_date
+from app.utils.security import create_access_token, hash_password
+
+USERNAME_PREFIX = "bench"
+BENCH_DEPARTMENT = "Benchmark"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: Optional[int]  # None when the request failed before a response
+    expected: bool  # a deliberate duplicate tap, which should be rejected
+
+
+@dataclass
+class Phase:
+    name: str
+    round: int
+    samples: List[Sample] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+
+
+def _username(index: int) -> str:
+    return f"{USERNAME_PREFIX}{index:05d}"
+
+
+async def seed_employees(count: int) -> List[User]:
+    """Create any missing benchmark employees and return the first ``count``."""
+    usernames = [_username(index) for index in range(count)]
+    existing = {
+        user.username: user
+        for user in await User.find({"username": {"$in": usernames}}).to_list()
+    }
+    missing = [username for username in usernames if username not in existing]
+    if missing:
+        # Nobody logs in with it, so one hash for everyone keeps seeding fast.
+        password_hash = hash_password(f"{USERNAME_PREFIX}-password")
+        await User.insert_many(
+            [
+                User(
+                    username=username,
+                    password_hash=password_hash,
+                    role="employee",
+                    name=f"Bench {username[len(USERNAME_PREFIX):]}",
+                    email=f"{username}@bench.example.com",
+                    pay_rate=20.0,
+                    department=BENCH_DEPARTMENT,
+                )
+                for username in missing
+            ]
+        )
+        existing.update(
+            {
+                user.username: user
+                for user in await User.find({"username": {"$in": missing}}).to_list()
+            }
+        )
+    return [existing[username] for username in usernames]
+
+
+async def reset_employees(employees: List[User], with_shifts: bool) -> None:
+    """Remove earlier benchmark attendance so every clock-in starts from a clean slate."""
+    ids = [employee.id for employee in employees]
+    await Attendance.find({"user_id": {"$in": ids}}).delete()
+    await Shift.find({"employee_id": {"$in": ids}}).delete()
+    if with_shifts:
+        today = await get_current_date()
+        await Shift.insert_many(
+            [
+                Shift(employee_id=employee_id, shift_date=today, start_time="07:00", end_time="15:00")
+                for employee_id in ids
+            ]
+        )
+
+
+async def cleanup() -> int:
+    employees = await User.find({"username": {"$regex": f"^{USERNAME_PREFIX}\\d{{5}}$"}}).to_list()
+    ids = [employee.id for employee in employees]
+    await Attendance.find({"user_id": {"$in": ids}}).delete()
+    await Shift.find({"employee_id": {"$in": ids}}).delete()
+    await User.find({"_id": {"$in": ids}}).delete()
+    return len(ids)
+
+
+def mint_tokens(employees: List[User], valid_for: timedelta) -> List[str]:
+    return [
+        create_access_token(
+            data={"user_id": str(employee.id), "username": employee.username, "role": employee.role},
+            expires_delta=valid_for,
+        )
+        for employee in employees
+    ]
+
+
+async def _tap(
+    client: httpx.AsyncClient,
+    path: str,
+    token: str,
+    start_at: float,
+    slots: asyncio.Semaphore,
+    phase: Phase,
+    expected: bool,
+) -> None:
+    delay = start_at - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    async with slots:
+        began = time.perf_counter()
+        try:
+            response = await client.post(path, headers={"Authorization": f"Bearer {token}"})
+            status = response.status_code
+        except httpx.HTTPError:
+            status = None
+        phase.samples.append(Sample(time.perf_counter() - began, status, expected))
+
+
+async def run_phase(
+    client: httpx.AsyncClient,
+    phase: Phase,
+    path: str,
+    tokens: List[str],
+    ramp: float,
+    double_tap: float,
+    concurrency: int,
+    rng: random.Random,
+) -> Phase:
+    """Fire one request per token, arrivals spread uniformly over ``ramp`` seconds."""
+    slots = asyncio.Semaphore(concurrency)
+    phase.started = time.perf_counter()
+    taps = []
+    for token in tokens:
+        start_at = phase.started + rng.uniform(0, ramp)
+        taps.append(_tap(client, path, token, start_at, slots, phase, expected=False))
+        if rng.random() < double_tap:
+            taps.append(_tap(client, path, token, start_at, slots, phase, expected=True))
+    await asyncio.gather(*taps)
+    phase.finished = time.perf_counter()
+    return phase
+
+
+def summarize(phase: Phase) -> Dict:
+    latencies = np.array([sample.latency for sample in phase.samples]) * 1000
+    status_counts: Dict[str, int] = {}
+    for sample in phase.samples:
+        key = str(sample.status) if sample.status is not None else "transport_error"
+        status_counts[key] = status_counts.get(key, 0) + 1
+
+    succeeded = sum(1 for sample in phase.samples if sample.status == 200)
+    # Exactly one of each duplicate pair should win; anything beyond that is an error.
+    expected_rejections = sum(1 for sample in phase.samples if sample.expected)
+    rejected = sum(1 for sample in phase.samples if sample.status == 400)
+    errors = len(phase.samples) - succeeded - min(rejected, expected_rejections)
+    duration = phase.finished - phase.started
+    return {
+        "phase": phase.name,
+        "round": phase.round,
+        "requests": len(phase.samples),
+        "succeeded": succeeded,
+        "expected_rejections": expected_rejections,
+        "errors": errors,
+        "error_rate": round(errors / len(phase.samples), 6) if phase.samples else 0.0,
+        "status_counts": status_counts,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(phase.samples) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "max": round(float(latencies.max()), 2),
+            "mean": round(float(latencies.mean()), 2),
+        } if len(latencies) else {},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> None:
+    await init_db()
+    if args.cleanup:
+        removed = await cleanup()
+        print(f"Removed {removed} benchmark employees")
+        return
+
+    employees = await seed_employees(args.employees)
+    await reset_employees(employees, args.with_shifts)
+    tokens = mint_tokens(employees, timedelta(hours=2))
+    rng = random.Random(args.seed)
+
+    started_at = datetime.now(timezone.utc)
+    phases: List[Phase] = []
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        for round_number in range(1, args.rounds + 1):
+            for name, path in (("clock_in", "/attendance/start"), ("clock_out", "/attendance/end")):
+                phase = await run_phase(
+                    client, Phase(name, round_number), path, tokens,
+                    args.ramp, args.double_tap, args.concurrency, rng,
+                )
+                phases.append(phase)
+                summary = summarize(phase)
+                print(
+                    f"round {round_number} {name}: {summary['requests']} requests, "
+                    f"{summary['throughput_rps']} req/s, p95 {summary['latency_ms'].get('p95')} ms, "
+                    f"{summary['errors']} errors"
+                )
+                if name == "clock_in" and args.hold:
+                    await asyncio.sleep(args.hold)
+
+    commit = _git_commit()
+    report = {
+        "benchmark": "clock_storm",
+        "git_commit": commit,
+        "started_at": started_at.isoformat(),
+        "config": {
+            "base_url": args.base_url,
+            "employees": args.employees,
+            "ramp_s": args.ramp,
+            "hold_s": args.hold,
+            "rounds": args.rounds,
+            "concurrency": args.concurrency,
+            "double_tap": args.double_tap,
+            "with_shifts": args.with_shifts,
+            "seed": args.seed,
+        },
+        "phases": [summarize(phase) for phase in phases],
+    }
+
+    output = args.output or RESULTS_DIR / f"clock_storm_{started_at:%Y%m%dT%H%M%SZ}_{commit or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--ramp", type=float, default=120.0, help="seconds over which each burst arrives (0 = all at once)")
+    parser.add_argument("--hold", type=float, default=0.0, help="seconds between the clock-in and clock-out bursts")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=200, help="maximum requests in flight")
+    parser.add_argument("--double-tap", type=float, default=0.0, help="fraction of employees that send each request twice at once")
+    parser.add_argument("--with-shifts", action="store_true", help="give every employee an assigned shift today")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="report path (default: benchmarks/results/)")
+    parser.add_argument("--cleanup", action="store_true", help="delete benchmark employees and their data, then exit")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,193 @@
+"""Throughput benchmark for the streaming attendance export.
+
+Seeds a year (by default) of completed attendance for the clock-storm
+benchmark employees, then downloads ``/attendance/export`` in every format
+and records rows per second, megabytes per second and time to first byte.
+``--in-process`` runs the export writers directly instead of over HTTP and
+also records peak Python allocations (tracemalloc), which should stay flat
+as ``--days`` grows. Results go to a JSON report like clock_storm's.
+
+Start the API against a disposable database first, then:
+
+    python benchmarks/export_throughput.py --employees 500 --days 365
+
+Seeded history is reused while it matches ``--employees``/``--days``;
+``python benchmarks/clock_storm.py --cleanup`` removes it with the employees.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# clock_storm also puts the backend directory on the path for the app imports below.
+from clock_storm import RESULTS_DIR, _git_commit, mint_tokens, seed_employees
+
+import httpx
+
+from app.database import init_db
+from app.models.attendance import Attendance
+from app.models.attendance_archive import AttendanceArchive
+from app.models.user import User
+from app.services.attendance_export import EXPORT_WRITERS
+from app.services.pay_weeks import bson_date
+
+FORMATS = ["csv", "jsonl", "xlsx"]
+SEED_BATCH_SIZE = 5000
+
+
+async def seed_history(employees: List[User], start: date, end: date) -> int:
+    """Give every employee one completed session per day from ``start`` to ``end``."""
+    ids = [employee.id for employee in employees]
+    collection = Attendance.get_motor_collection()
+    days = (end - start).days + 1
+    expected = len(ids) * days
+    in_range = {"user_id": {"$in": ids}, "date": {"$gte": bson_date(start), "$lte": bson_date(end)}}
+    archive = AttendanceArchive.get_motor_collection()
+    if await collection.count_documents(in_range) + await archive.count_documents(in_range) == expected:
+        return expected
+
+    await collection.delete_many({"user_id": {"$in": ids}})
+    await archive.delete_many({"user_id": {"$in": ids}})
+    batch = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for index, user_id in enumerate(ids):
+            clock_in = datetime.combine(day, day_time(6), tzinfo=timezone.utc) + timedelta(minutes=index % 240)
+            batch.append(
+                {
+                    "user_id": user_id,
+                    "clock_in": clock_in,
+                    "clock_out": clock_in + timedelta(hours=8),
+                    "hours_worked": 8.0,
+                    "date": bson_date(day),
+                }
+            )
+            if len(batch) >= SEED_BATCH_SIZE:
+                await collection.insert_many(batch, ordered=False)
+                batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+    return expected
+
+
+async def export_over_http(
+    client: httpx.AsyncClient, token: str, export_format: str, start: date, end: date
+) -> Dict:
+    params = {"start_date": start.isoformat(), "end_date": end.isoformat(), "format": export_format}
+    size = 0
+    first_byte: Optional[float] = None
+    started = time.perf_counter()
+    async with client.stream(
+        "GET", "/attendance/export", params=params, headers={"Authorization": f"Bearer {token}"}
+    ) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+    return {"seconds": time.perf_counter() - started, "first_byte_s": first_byte, "bytes": size}
+
+
+async def export_in_process(export_format: str, start: date, end: date) -> Dict:
+    size = 0
+    first_byte: Optional[float] = None
+    tracemalloc.start()
+    started = time.perf_counter()
+    async for chunk in EXPORT_WRITERS[export_format](start, end):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "first_byte_s": first_byte, "bytes": size, "peak_alloc_mb": round(peak / 2**20, 2)}
+
+
+def summarize(export_format: str, rows: int, run: Dict) -> Dict:
+    seconds = run["seconds"]
+    summary = {
+        "format": export_format,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "first_byte_ms": round(run["first_byte_s"] * 1000, 1) if run["first_byte_s"] is not None else None,
+        "megabytes": round(run["bytes"] / 2**20, 2),
+        "rows_per_s": round(rows / seconds, 1) if seconds else None,
+        "mb_per_s": round(run["bytes"] / 2**20 / seconds, 2) if seconds else None,
+    }
+    if "peak_alloc_mb" in run:
+        summary["peak_alloc_mb"] = run["peak_alloc_mb"]
+    return summary
+
+
+async def main(args: argparse.Namespace) -> None:
+    await init_db()
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+    employees = await seed_employees(args.employees)
+    seeding = time.perf_counter()
+    rows = await seed_history(employees, start, end)
+    print(f"{rows} attendance rows ready in {time.perf_counter() - seeding:.1f}s")
+    # Other data in the database falls in the range too, and older history
+    # may have been archived; count what the export will see.
+    in_range = {"date": {"$gte": bson_date(start), "$lte": bson_date(end)}}
+    rows = 0
+    for model in (Attendance, AttendanceArchive):
+        rows += await model.get_motor_collection().count_documents(in_range)
+
+    started_at = datetime.now(timezone.utc)
+    results = []
+    formats = args.formats or FORMATS
+    if args.in_process:
+        for export_format in formats:
+            for _ in range(args.repeat):
+                results.append(summarize(export_format, rows, await export_in_process(export_format, start, end)))
+                print(json.dumps(results[-1]))
+    else:
+        admin = await User.find_one(User.role == "admin")
+        if admin is None:
+            raise SystemExit("No admin user to export as; run app/seeds/seed_admin.py first")
+        token = mint_tokens([admin], timedelta(hours=2))[0]
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            for export_format in formats:
+                for _ in range(args.repeat):
+                    run = await export_over_http(client, token, export_format, start, end)
+                    results.append(summarize(export_format, rows, run))
+                    print(json.dumps(results[-1]))
+
+    commit = _git_commit()
+    report = {
+        "benchmark": "export_throughput",
+        "git_commit": commit,
+        "started_at": started_at.isoformat(),
+        "config": {
+            "base_url": None if args.in_process else args.base_url,
+            "in_process": args.in_process,
+            "employees": args.employees,
+            "days": args.days,
+            "rows": rows,
+            "repeat": args.repeat,
+        },
+        "runs": results,
+    }
+
+    output = args.output or RESULTS_DIR / f"export_throughput_{started_at:%Y%m%dT%H%M%SZ}_{commit or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365, help="days of history to seed and export, ending yesterday")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, help="formats to export (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="downloads per format")
+    parser.add_argument("--in-process", action="store_true", help="call the export writers directly and track peak allocations")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--output", type=Path, help="report path (default: benchmarks/results/)")
+    asyncio.run(main(parser.parse_args()))
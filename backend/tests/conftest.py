@@ -0,0 +1,40 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Settings are read at import time; tests never connect to these.
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017')
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Run ``init_beanie`` for ``models`` on an in-memory database; returns a runner for coroutines."""
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    import mongomock.aggregate
+    from beanie import init_beanie
+
+    # mongomock only implements $substr, the older alias of $substrBytes.
+    handle = mongomock.aggregate._Parser._handle_string_operator
+
+    def handle_string_operator(self, operator, values):
+        return handle(self, '$substr' if operator == '$substrBytes' else operator, values)
+
+    monkeypatch.setattr(mongomock.aggregate._Parser, '_handle_string_operator', handle_string_operator)
+
+    loop = asyncio.new_event_loop()
+
+    def run(coroutine):
+        return loop.run_until_complete(coroutine)
+
+    def setup(*models):
+        database = mongomock_motor.AsyncMongoMockClient()['test']
+        run(init_beanie(database=database, document_models=list(models)))
+        return run
+
+    yield setup
+    loop.close()
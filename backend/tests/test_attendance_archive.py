@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.attendance_archive import AttendanceArchive
+from app.models.attendance_month import AttendanceMonth
+from app.services import attendance_store
+from app.services.attendance_archive import archive_attendance, restore_archived
+from app.services.pay_weeks import bson_date
+
+ALICE = ObjectId()
+
+
+@pytest.fixture
+def tiers(mongo, monkeypatch):
+    monkeypatch.setattr(settings, 'ATTENDANCE_STORAGE', 'sessions')
+    return mongo(Attendance, AttendanceArchive, AttendanceMonth)
+
+
+def _session(day: date, hours: float) -> dict:
+    clock_in = datetime(day.year, day.month, day.day, 9)
+    return {
+        '_id': ObjectId(),
+        'user_id': ALICE,
+        'date': bson_date(day),
+        'clock_in': clock_in,
+        'clock_out': clock_in + timedelta(hours=hours),
+        'hours_worked': hours,
+    }
+
+
+def _ids(run, collection) -> set:
+    return {doc['_id'] for doc in run(collection.find({}, {'_id': 1}).to_list(None))}
+
+
+def test_archive_moves_closed_sessions_before_the_horizon(tiers):
+    run = tiers
+    old, recent = _session(date(2024, 1, 2), 8), _session(date(2024, 3, 2), 7)
+    open_session = {**_session(date(2024, 1, 3), 0), 'clock_out': None, 'hours_worked': None}
+    run(Attendance.get_motor_collection().insert_many([old, recent, open_session]))
+
+    assert run(archive_attendance(date(2024, 2, 1), batch_size=1)) == 1
+    assert _ids(run, Attendance.get_motor_collection()) == {recent['_id'], open_session['_id']}
+    assert _ids(run, AttendanceArchive.get_motor_collection()) == {old['_id']}
+
+    assert run(restore_archived(batch_size=1)) == 1
+    assert _ids(run, Attendance.get_motor_collection()) == {old['_id'], recent['_id'], open_session['_id']}
+    assert _ids(run, AttendanceArchive.get_motor_collection()) == set()
+
+
+def test_session_edited_while_archiving_stays_hot(tiers, monkeypatch):
+    run = tiers
+    session = _session(date(2024, 1, 2), 8)
+    hot = Attendance.get_motor_collection()
+    run(hot.insert_one(session))
+    bulk_write = hot.bulk_write
+
+    async def edit_then_delete(operations, ordered=True):
+        await hot.update_one({'_id': session['_id']}, {'$set': {'hours_worked': 9.0}})
+        return await bulk_write(operations, ordered=ordered)
+
+    monkeypatch.setattr(hot, 'bulk_write', edit_then_delete)
+
+    assert run(archive_attendance(date(2024, 2, 1), batch_size=10)) == 0
+    assert _ids(run, hot) == {session['_id']}
+    assert _ids(run, AttendanceArchive.get_motor_collection()) == {session['_id']}
+
+
+def test_session_in_both_tiers_is_counted_once(tiers):
+    run = tiers
+    both, archived = _session(date(2024, 1, 2), 8), _session(date(2024, 1, 3), 6)
+    hot_only = _session(date(2024, 1, 4), 5)
+    run(Attendance.get_motor_collection().insert_many([both, hot_only]))
+    run(AttendanceArchive.get_motor_collection().insert_many([both, archived]))
+
+    hours = run(attendance_store.completed_hours_by_user(date(2024, 1, 1), date(2024, 1, 31)))
+    assert hours == {ALICE: 19.0}
+
+    async def totals():
+        return [row async for row in attendance_store.iter_daily_totals()]
+
+    assert run(totals()) == [
+        (ALICE, date(2024, 1, 2), 8.0, 1),
+        (ALICE, date(2024, 1, 3), 6.0, 1),
+        (ALICE, date(2024, 1, 4), 5.0, 1),
+    ]
+
+    async def sessions():
+        return [doc['_id'] async for doc in attendance_store.iter_sessions(date(2024, 1, 1), completed=True)]
+
+    assert run(sessions()) == [both['_id'], archived['_id'], hot_only['_id']]
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.attendance_archive import AttendanceArchive
+from app.models.attendance_daily import AttendanceDaily
+from app.models.attendance_month import AttendanceMonth
+from app.models.job_lock import JobLock
+from app.models.system_settings import SystemSettings
+from app.services import attendance_daily
+from app.services.pay_weeks import bson_date
+
+ALICE = ObjectId()
+
+
+@pytest.fixture
+def rollup(mongo, monkeypatch):
+    monkeypatch.setattr(settings, 'ATTENDANCE_STORAGE', 'sessions')
+    return mongo(Attendance, AttendanceArchive, AttendanceMonth, AttendanceDaily, JobLock, SystemSettings)
+
+
+def _close(run, day: date, hours: float) -> None:
+    """A clock-out: the session is written, then the rollup is incremented."""
+    clock_in = datetime(day.year, day.month, day.day, 9)
+    run(Attendance.get_motor_collection().insert_one({
+        'user_id': ALICE,
+        'date': bson_date(day),
+        'clock_in': clock_in,
+        'clock_out': clock_in + timedelta(hours=hours),
+        'hours_worked': hours,
+    }))
+    run(attendance_daily.record_attendance_changes([(ALICE, day, hours, 1)]))
+
+
+def _rows(run) -> dict:
+    docs = run(AttendanceDaily.get_motor_collection().find({}).to_list(None))
+    return {doc['date'].date(): (doc['hours'], doc['sessions']) for doc in docs}
+
+
+def test_rebuild_repairs_drift(rollup):
+    run = rollup
+    _close(run, date(2024, 1, 2), 8)
+    _close(run, date(2024, 1, 3), 6)
+    run(attendance_daily.record_attendance_changes([(ALICE, date(2024, 1, 2), 1.5, 0), (ALICE, date(2024, 1, 9), 3, 1)]))
+
+    assert run(attendance_daily.rebuild_attendance_daily()) == 2
+    assert _rows(run) == {date(2024, 1, 2): (8.0, 1), date(2024, 1, 3): (6.0, 1)}
+    assert run(attendance_daily._is_built())
+
+
+def test_clock_out_during_the_rebuild_is_kept(rollup, monkeypatch):
+    run = rollup
+    _close(run, date(2024, 1, 2), 8)
+    iter_daily_totals = attendance_daily.iter_daily_totals
+
+    async def totals_then_clock_out(user_id=None):
+        async for total in iter_daily_totals(user_id):
+            yield total
+        # Lands after the rebuild read both the rows and the sessions.
+        clock_in = datetime(2024, 1, 2, 18)
+        await Attendance.get_motor_collection().insert_one({
+            'user_id': ALICE,
+            'date': bson_date(date(2024, 1, 2)),
+            'clock_in': clock_in,
+            'clock_out': clock_in + timedelta(hours=2),
+            'hours_worked': 2.0,
+        })
+        await attendance_daily.record_attendance_changes([(ALICE, date(2024, 1, 2), 2.0, 1)])
+
+    monkeypatch.setattr(attendance_daily, 'iter_daily_totals', totals_then_clock_out)
+    run(AttendanceDaily.get_motor_collection().update_many({}, {'$set': {'hours': 1.0}}))
+
+    run(attendance_daily.rebuild_attendance_daily())
+    assert _rows(run) == {date(2024, 1, 2): (10.0, 2)}
+
+
+def test_summary_reads_raw_sessions_until_the_rollup_is_built(rollup):
+    run = rollup
+    _close(run, date(2024, 1, 2), 8)
+    _close(run, date(2024, 1, 8), 4)
+    run(AttendanceDaily.get_motor_collection().delete_many({}))
+
+    days = run(attendance_daily.get_attendance_days(ALICE, date(2024, 1, 3)))
+    assert [(day.date, day.hours, day.sessions) for day in days] == [(date(2024, 1, 8), 4.0, 1)]
+
+    run(attendance_daily.build_attendance_daily())
+    days = run(attendance_daily.get_attendance_days(ALICE, date(2024, 1, 3)))
+    assert [(day.date, day.hours, day.sessions) for day in days] == [(date(2024, 1, 8), 4.0, 1)]
+    assert run(JobLock.get_motor_collection().count_documents({'name': 'attendance-daily'})) == 1
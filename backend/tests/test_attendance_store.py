@@ -0,0 +1,120 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+from app.models.attendance import Attendance
+from app.models.attendance_archive import AttendanceArchive
+from app.models.attendance_month import AttendanceMonth
+from app.services import attendance_feed, attendance_store
+from app.services.pay_weeks import bson_date
+
+ALICE = ObjectId()
+BOB = ObjectId()
+
+
+@pytest.fixture
+def store(mongo, monkeypatch):
+    monkeypatch.setattr(settings, 'ATTENDANCE_STORAGE', 'monthly')
+    return mongo(Attendance, AttendanceArchive, AttendanceMonth)
+
+
+def _session(user_id: ObjectId, day: date, hours: float, start_hour: int = 9) -> dict:
+    clock_in = datetime(day.year, day.month, day.day, start_hour)
+    return {
+        '_id': ObjectId(),
+        'user_id': user_id,
+        'date': bson_date(day),
+        'clock_in': clock_in,
+        'clock_out': clock_in + timedelta(hours=hours),
+        'hours_worked': hours,
+    }
+
+
+def _insert_hot(run, docs):
+    run(Attendance.get_motor_collection().insert_many(docs))
+
+
+@pytest.mark.parametrize('move_first', [True, False])
+def test_session_moving_during_the_read_is_counted_once(store, monkeypatch, move_first):
+    run = store
+    run(attendance_store._push_to_buckets([_session(ALICE, date(2024, 3, 4), 8), _session(BOB, date(2024, 3, 20), 6)]))
+    # One closing session in a fully covered month, one in a partly covered month.
+    _insert_hot(run, [_session(ALICE, date(2024, 3, 5), 4), _session(BOB, date(2024, 4, 2), 5)])
+    hot_sessions = attendance_store._hot_sessions
+
+    async def moving_hot_sessions(query, sort=None):
+        if move_first:
+            await attendance_store.move_closed_sessions()
+        docs = await hot_sessions(query, sort)
+        await attendance_store.move_closed_sessions()
+        return docs
+
+    monkeypatch.setattr(attendance_store, '_hot_sessions', moving_hot_sessions)
+
+    hours = run(attendance_store.completed_hours_by_user(date(2024, 3, 1), date(2024, 4, 10)))
+    assert hours == {ALICE: 12.0, BOB: 11.0}
+
+
+def test_sessions_that_never_reach_their_bucket_stay_hot(store, monkeypatch):
+    run = store
+    stuck = _session(ALICE, date(2024, 3, 4), 8)
+    moving = _session(BOB, date(2024, 3, 4), 6)
+    _insert_hot(run, [stuck, moving])
+    buckets = AttendanceMonth.get_motor_collection()
+    bulk_write = buckets.bulk_write
+
+    async def racing_bulk_write(operations, ordered=True):
+        # Every upsert for Alice's bucket loses a creation race.
+        keep = [op for op in operations if op._filter['user_id'] != ALICE]
+        if keep:
+            await bulk_write(keep, ordered=ordered)
+        errors = [
+            {'index': index, 'code': attendance_store.DUPLICATE_KEY}
+            for index, op in enumerate(operations)
+            if op._filter['user_id'] == ALICE
+        ]
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+    monkeypatch.setattr(buckets, 'bulk_write', racing_bulk_write)
+
+    assert run(attendance_store.move_closed_sessions()) == 1
+    remaining = run(Attendance.get_motor_collection().find({}).to_list(None))
+    assert [doc['_id'] for doc in remaining] == [stuck['_id']]
+    assert run(buckets.count_documents({'sessions.id': moving['_id']})) == 1
+
+
+def test_recent_sessions_unwinds_only_the_latest_buckets(store):
+    run = store
+    users = [ObjectId() for _ in range(6)]
+    docs = [
+        _session(user_id, date(2024, 3, day), 1, start_hour=index)
+        for index, user_id in enumerate(users)
+        for day in (1, 15)
+    ]
+    run(attendance_store._push_to_buckets(docs))
+
+    recent = run(attendance_store.recent_sessions(3))
+    assert [session.user_id for session in recent] == users[:-4:-1]
+    assert all(session.date == date(2024, 3, 15) for session in recent)
+
+
+def test_change_stream_clock_out_is_read_from_the_bucket(store):
+    run = store
+    session = _session(ALICE, date(2024, 3, 4), 8)
+    _insert_hot(run, [session])
+    run(attendance_store.move_closed_sessions())
+    change = {
+        'operationType': 'update',
+        'documentKey': {'_id': session['_id']},
+        'updateDescription': {'updatedFields': {'clock_out': session['clock_out'], 'hours_worked': 8}},
+        'fullDocument': None,
+    }
+
+    record = run(attendance_feed._changed_record(change))
+    assert record['_id'] == session['_id']
+    assert record['user_id'] == ALICE
+    assert record['clock_out'] == session['clock_out']
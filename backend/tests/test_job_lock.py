@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.job_lock import JobLock
+from app.routers import pay as pay_router
+from app.services.job_lock import JobLease, LeaseLost, _now
+
+
+def test_set_status_raises_once_another_worker_took_the_lease(mongo):
+    run = mongo(JobLock)
+    first = JobLease('test-lock', job='test.job', ttl_seconds=60)
+    second = JobLease('test-lock', job='test.job', ttl_seconds=60)
+    assert run(first.acquire())
+    run(first.set_status('batch 1'))
+
+    # The first owner stalled past its expiry and the second took over.
+    run(JobLock.get_motor_collection().update_one({'name': 'test-lock'}, {'$set': {'expires_at': _now()}}))
+    assert run(second.acquire())
+
+    with pytest.raises(LeaseLost):
+        run(first.set_status('batch 2'))
+    assert first.lost
+    with pytest.raises(LeaseLost):
+        first.check()
+    assert run(second.current()).status is None
+
+
+def test_check_raises_once_the_lease_expired_locally(mongo):
+    run = mongo(JobLock)
+    lease = JobLease('test-lock', ttl_seconds=60)
+    assert run(lease.acquire())
+    lease.check()
+
+    # Heartbeats failed for longer than the TTL.
+    lease._expires_at = _now() - timedelta(seconds=1)
+    with pytest.raises(LeaseLost):
+        lease.check()
+
+
+def test_sync_weeks_stops_before_the_next_week_once_the_lease_is_lost(mongo, monkeypatch):
+    run = mongo(JobLock)
+    lease = JobLease('test-lock', ttl_seconds=60)
+    assert run(lease.acquire())
+    synced = []
+
+    async def sync(week_start, week_end, resolver):
+        synced.append(week_start)
+        lease.lost = True  # lost while this week was being written
+        return 1
+
+    monkeypatch.setattr(pay_router, '_sync_pay_records', sync)
+    weeks = [(date(2024, 1, 1), date(2024, 1, 7)), (date(2024, 1, 8), date(2024, 1, 14))]
+
+    with pytest.raises(LeaseLost):
+        run(pay_router._sync_weeks(weeks, resolver=None, concurrency=1, lease=lease))
+    assert synced == [date(2024, 1, 1)]
+
+
+def test_sync_weeks_cancels_running_weeks_once_the_lease_is_lost(mongo, monkeypatch):
+    run = mongo(JobLock)
+    lease = JobLease('test-lock', ttl_seconds=60)
+    assert run(lease.acquire())
+    finished = []
+
+    async def sync(week_start, week_end, resolver):
+        if week_start == date(2024, 1, 1):
+            lease.lost = True  # the heartbeat found another owner
+        else:
+            await asyncio.sleep(5)
+        finished.append(week_start)
+        return 1
+
+    monkeypatch.setattr(pay_router, '_sync_pay_records', sync)
+    monkeypatch.setattr(pay_router, 'LEASE_CHECK_SECONDS', 0.01)
+    weeks = [(date(2024, 1, 1), date(2024, 1, 7)), (date(2024, 1, 8), date(2024, 1, 14))]
+
+    with pytest.raises(LeaseLost):
+        run(pay_router._sync_weeks(weeks, resolver=None, concurrency=2, lease=lease))
+    assert finished == [date(2024, 1, 1)]
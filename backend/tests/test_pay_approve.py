@@ -0,0 +1,145 @@
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import OperationFailure
+
+from app import database
+from app.config import settings
+from app.models.pay import Pay
+from app.models.pay_approve import PayApprove
+from app.routers import pay as pay_router
+
+
+def _pending(amount: float) -> PayApprove:
+    return PayApprove(
+        user_id=ObjectId(),
+        week_start=date(2026, 10, 10),
+        week_end=date(2026, 10, 16),
+        hours_worked=8,
+        gross_amount=amount,
+        amount=amount,
+    )
+
+
+def test_approve_without_transactions_leaves_records_changed_mid_approval(mongo, monkeypatch):
+    run = mongo(Pay, PayApprove)
+    records = [_pending(100 + index) for index in range(5)]
+    for record in records:
+        run(record.insert())
+    held, recomputed = records[1], records[3]
+
+    insert_many = Pay.insert_many
+
+    async def insert_then_race(documents, **kwargs):
+        result = await insert_many(documents, **kwargs)
+        # A hold and a pay sync land between the copy and the delete.
+        collection = PayApprove.get_motor_collection()
+        now = datetime.now(timezone.utc)
+        await collection.update_one({'_id': held.id}, {'$set': {'status': 'held', 'updated_at': now}})
+        await collection.update_one({'_id': recomputed.id}, {'$set': {'amount': 250.0, 'updated_at': now}})
+        return result
+
+    monkeypatch.setattr(Pay, 'insert_many', insert_then_race)
+    result = run(pay_router._approve_all_pending_without_transactions(ObjectId()))
+
+    assert (result.approved, result.skipped) == (3, 2)
+    approved = run(Pay.find().to_list())
+    assert sorted(record.amount for record in approved) == [100, 102, 104]
+    remaining = {record.id: record for record in run(PayApprove.find().to_list())}
+    assert set(remaining) == {held.id, recomputed.id}
+    assert remaining[held.id].status == 'held'
+    assert remaining[recomputed.id].amount == 250.0
+
+
+class _Session:
+    """Stands in for a client session: runs each transaction callback once."""
+
+    def __init__(self):
+        self.transactions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        self.transactions += 1
+        return await callback(self)
+
+
+class _Client:
+    def __init__(self, session=None, error=None):
+        self.session, self.error = session, error
+
+    async def start_session(self):
+        if self.error:
+            raise self.error
+        return self.session
+
+
+def test_approve_all_moves_each_chunk_in_its_own_transaction(mongo, monkeypatch):
+    run = mongo(Pay, PayApprove)
+    monkeypatch.setattr(settings, 'PAY_APPROVE_CHUNK_SIZE', 2)
+    session = _Session()
+    monkeypatch.setattr(database, 'client', _Client(session))
+    for index in range(5):
+        run(_pending(100 + index).insert())
+    held = _pending(500)
+    held.status = 'held'
+    run(held.insert())
+
+    # mongomock rejects sessions, so record the one each chunk gets and run it without.
+    sessions = []
+    approve_chunk = pay_router._approve_pending_chunk
+
+    async def approve_chunk_in(admin_id, after, session=None):
+        sessions.append(session)
+        return await approve_chunk(admin_id, after)
+
+    monkeypatch.setattr(pay_router, '_approve_pending_chunk', approve_chunk_in)
+    result = run(pay_router._approve_all_pending(ObjectId()))
+
+    assert (result.approved, result.skipped) == (5, 0)
+    # Three chunks, then the empty read that ends the loop, each in its own transaction.
+    assert session.transactions == 4
+    assert sessions == [session] * 4
+    assert sorted(record.amount for record in run(Pay.find().to_list())) == [100, 101, 102, 103, 104]
+    assert [record.id for record in run(PayApprove.find().to_list())] == [held.id]
+
+
+@pytest.fixture
+def standalone(mongo, monkeypatch):
+    run = mongo(Pay, PayApprove)
+    no_transactions = OperationFailure('Transaction numbers are only allowed on a replica set member', 20)
+    monkeypatch.setattr(database, 'client', _Client(error=no_transactions))
+
+    async def refresh(weeks):
+        return None
+
+    monkeypatch.setattr(pay_router, 'refresh_pay_ledger', refresh)
+    run(_pending(100).insert())
+    return run
+
+
+def test_approve_all_refuses_to_run_without_transactions_by_default(standalone, monkeypatch):
+    run = standalone
+    monkeypatch.setattr(settings, 'PAY_APPROVE_WITHOUT_TRANSACTIONS', False)
+
+    with pytest.raises(HTTPException) as raised:
+        run(pay_router.approve_all_pay_records(SimpleNamespace(id=ObjectId())))
+    assert raised.value.status_code == 503
+    assert run(Pay.find().count()) == 0
+    assert run(PayApprove.find().count()) == 1
+
+
+def test_approve_all_runs_without_transactions_when_allowed(standalone, monkeypatch):
+    run = standalone
+    monkeypatch.setattr(settings, 'PAY_APPROVE_WITHOUT_TRANSACTIONS', True)
+
+    response = run(pay_router.approve_all_pay_records(SimpleNamespace(id=ObjectId())))
+    assert response.approved == 1
+    assert run(PayApprove.find().count()) == 0
@@ -0,0 +1,76 @@
+import random
+from datetime import date
+
+from bson import ObjectId
+
+from app.models.adjustment import AdjustmentType, EmployeeAdjustment
+from app.routers.pay import _calculate_amount, _compute_adjustments
+from app.services import pay_engine
+
+WEEK_END = date(2026, 10, 16)
+
+
+class FixedResolver:
+    """Stands in for AdjustmentResolver with precomputed per-employee adjustments."""
+
+    def __init__(self, applicable):
+        self._applicable = applicable
+
+    def applicable(self, user_id, today):
+        return self._applicable[user_id]
+
+
+def _hours(rng: random.Random) -> float:
+    # Pay sync hours are whole minutes / 60; include the 40-hour boundary.
+    return rng.choice([0, 40 * 60, 40 * 60 + 1, rng.randint(1, 80 * 60)]) / 60
+
+
+def _adjustment(rng: random.Random, employee_id: ObjectId):
+    mode = rng.choice(['percent', 'flat'])
+    adjustment_type = AdjustmentType(
+        name='adjustment',
+        direction=rng.choice(['add', 'deduct']),
+        mode=mode,
+        rate_or_amount=round(rng.uniform(0, 25), rng.choice([0, 1, 2, 3])) if mode == 'percent' else round(rng.uniform(0, 300), 2),
+        cap_per_period=rng.choice([None, round(rng.uniform(0, 200), 2)]),
+        apply_on=rng.choice(['all', 'overtime_only']),
+    )
+    assignment = None
+    if rng.random() < 0.5:
+        assignment = EmployeeAdjustment(
+            employee_id=employee_id,
+            adjustment_type_id=ObjectId(),
+            override_rate_or_amount=rng.choice([None, round(rng.uniform(0, 20), 2)]),
+            override_cap=rng.choice([None, round(rng.uniform(0, 150), 2)]),
+        )
+    return adjustment_type, assignment
+
+
+def test_vectorized_engine_matches_scalar_pay_to_the_cent(mongo):
+    mongo(AdjustmentType, EmployeeAdjustment)  # Beanie documents need an initialized model
+    rng = random.Random(20261017)
+    employees = [ObjectId() for _ in range(5000)]
+    hours = [_hours(rng) for _ in employees]
+    rates = [round(rng.uniform(7.25, 95), rng.choice([0, 2])) for _ in employees]
+    applicable = {
+        employee_id: [_adjustment(rng, employee_id) for _ in range(rng.randint(0, 4))] for employee_id in employees
+    }
+    resolver = FixedResolver(applicable)
+
+    week = pay_engine.compute_week_pay(hours, rates, [applicable[employee_id] for employee_id in employees])
+
+    for index, employee_id in enumerate(employees):
+        gross, base_pay, overtime_pay = _calculate_amount(hours[index], rates[index])
+        adjustments, delta = _compute_adjustments(resolver, employee_id, gross, overtime_pay, WEEK_END)
+        assert week.gross[index] == gross
+        assert week.base[index] == base_pay
+        assert week.overtime[index] == overtime_pay
+        assert week.adjustment_delta[index] == delta
+        assert week.net[index] == round(gross + delta, 2)
+        assert week.adjustments[index] == adjustments
+
+
+def test_round_cents_matches_builtin_round_near_half_cents():
+    rng = random.Random(7)
+    values = [rng.randint(0, 10**7) / 1000 + offset for offset in (0, 5e-4, -5e-13, 5e-13) for _ in range(2000)]
+    assert pay_engine.round_cents(values).tolist() == [round(value, 2) for value in values]
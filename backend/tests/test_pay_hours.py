@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+from bson import ObjectId
+
+from app.models.shift import Shift
+from app.routers.pay import _calculate_hours_by_employee_aggregated, _calculate_hours_by_employee_python
+
+WEEK_START = date(2026, 10, 10)
+WEEK_END = date(2026, 10, 16)
+
+
+def _legacy(employee_id, day, start, end, status='completed'):
+    """A shift written before the derived minute fields existed."""
+    return {
+        'employee_id': employee_id,
+        'shift_date': datetime.combine(day, datetime.min.time()),
+        'start_time': start,
+        'end_time': end,
+        'status': status,
+    }
+
+
+def test_aggregated_and_python_hours_match(mongo):
+    run = mongo(Shift)
+    first, second, third = ObjectId(), ObjectId(), ObjectId()
+    stored = [
+        Shift(employee_id=first, shift_date=date(2026, 10, 10), start_time='09:00', end_time='17:30', status='completed'),
+        Shift(employee_id=first, shift_date=date(2026, 10, 16), start_time='06:15', end_time='14:50', status='completed'),
+        # Overnight: the end is before the start, which pays nothing.
+        Shift(employee_id=second, shift_date=date(2026, 10, 12), start_time='22:00', end_time='06:00', status='completed'),
+        Shift(employee_id=second, shift_date=date(2026, 10, 13), start_time='08:05', end_time='16:07', status='completed'),
+        # Outside the week or not completed.
+        Shift(employee_id=first, shift_date=date(2026, 10, 9), start_time='09:00', end_time='17:00', status='completed'),
+        Shift(employee_id=third, shift_date=date(2026, 10, 17), start_time='09:00', end_time='17:00', status='completed'),
+        Shift(employee_id=third, shift_date=date(2026, 10, 14), start_time='09:00', end_time='17:00'),
+    ]
+    for shift in stored:
+        run(shift.insert())
+    run(
+        Shift.get_motor_collection().insert_many(
+            [
+                _legacy(first, date(2026, 10, 11), '10:20', '12:41'),
+                _legacy(second, date(2026, 10, 14), '23:30', '01:15'),
+                _legacy(third, date(2026, 10, 15), '00:00', '23:59'),
+                _legacy(third, date(2026, 10, 15), '13:00', '13:00'),
+                _legacy(third, date(2026, 10, 11), '07:00', '15:00', status='assigned'),
+            ]
+        )
+    )
+
+    aggregated = run(_calculate_hours_by_employee_aggregated(WEEK_START, WEEK_END))
+    python = run(_calculate_hours_by_employee_python(WEEK_START, WEEK_END))
+
+    assert aggregated == python
+    assert python == {
+        first: (510 + 515 + 141) / 60,
+        second: (0 + 482 + 0) / 60,
+        third: (1439 + 0) / 60,
+    }
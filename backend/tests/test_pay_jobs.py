@@ -0,0 +1,22 @@
+from app.config import settings
+from app.models.job_lock import JobLock
+from app.models.pay_job import PayJob
+from app.services import pay_jobs
+from app.services.job_lock import PAY_SYNC_LOCK, JobLease
+
+
+def test_job_requeued_for_the_lease_keeps_its_attempts(mongo, monkeypatch):
+    run = mongo(PayJob, JobLock)
+    monkeypatch.setattr(settings, 'PAY_JOB_POLL_SECONDS', 0)
+    worker = pay_jobs.PayJobWorker()
+    run(PayJob().insert())
+    # A request-driven sync holds the lease for longer than the job allows attempts.
+    assert run(JobLease(PAY_SYNC_LOCK, job='pay.sync', ttl_seconds=60).acquire())
+
+    for _ in range(settings.PAY_JOB_MAX_ATTEMPTS + 1):
+        job = run(pay_jobs._claim_next_job(worker.worker_id))
+        assert job is not None
+        run(worker._execute(job))
+
+    job = run(PayJob.find_one({}))
+    assert (job.state, job.worker, job.attempts) == ('queued', None, 0)
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from app.models.pay_dirty_week import PayDirtyWeek
+from app.models.shift import Shift
+from app.models.system_settings import SystemSettings
+from app.services.pay_weeks import containing_week, get_dirty_weeks, mark_dates_dirty, mark_weeks_dirty
+
+
+def test_containing_week_is_the_saturday_to_friday_week_of_the_day():
+    for offset in range(7):
+        day = date(2026, 10, 10) + timedelta(days=offset)  # Saturday .. Friday
+        assert containing_week(day) == (date(2026, 10, 10), date(2026, 10, 16))
+    assert containing_week(date(2026, 10, 17)) == (date(2026, 10, 17), date(2026, 10, 23))
+
+
+def test_mark_dates_dirty_marks_the_week_of_each_shift(mongo):
+    run = mongo(PayDirtyWeek)
+    # A Wednesday and a Saturday: the shifts' own weeks, not the weeks before them.
+    run(mark_dates_dirty([date(2026, 10, 14), date(2026, 10, 17), None]))
+    weeks = run(PayDirtyWeek.find().sort('+week_end').to_list())
+    assert [(week.week_start, week.week_end) for week in weeks] == [
+        (date(2026, 10, 10), date(2026, 10, 16)),
+        (date(2026, 10, 17), date(2026, 10, 23)),
+    ]
+
+
+def test_get_dirty_weeks_leaves_weeks_in_progress_marked(mongo):
+    run = mongo(PayDirtyWeek, Shift, SystemSettings)
+    current = containing_week(date.today())
+    ended = containing_week(date.today() - timedelta(days=14))
+    run(mark_weeks_dirty([current, ended]))
+
+    weeks = run(get_dirty_weeks())
+
+    assert [(week.week_start, week.week_end) for week in weeks] == [ended]
+    assert run(PayDirtyWeek.count()) == 2
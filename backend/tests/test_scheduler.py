@@ -0,0 +1,51 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.config import settings
+from app.models.system_settings import SystemSettings
+from app.utils.scheduler import payroll_period, schedule_timezone
+
+ZONE = 'America/New_York'
+
+
+@pytest.fixture(autouse=True)
+def schedule(monkeypatch):
+    monkeypatch.setattr(settings, 'PAYROLL_SCHEDULE_ANCHOR', datetime(2025, 1, 4))
+    monkeypatch.setattr(settings, 'PAYROLL_SCHEDULE_DAYS', 14)
+
+
+def test_payroll_period_ends_the_day_before_the_scheduled_run():
+    fired = datetime(2025, 1, 18, 5, tzinfo=timezone.utc)  # midnight in New York
+    assert payroll_period(fired, ZONE) == (date(2025, 1, 4), date(2025, 1, 17))
+
+
+def test_late_run_keeps_the_scheduled_period():
+    late = datetime(2025, 1, 20, 15, 30, tzinfo=timezone.utc)
+    assert payroll_period(late, ZONE) == (date(2025, 1, 4), date(2025, 1, 17))
+
+
+def test_run_before_the_next_fire_time_belongs_to_the_previous_period():
+    # 23:59 on Jan 17 in New York, though already Jan 18 in UTC.
+    early = datetime(2025, 1, 18, 4, 59, tzinfo=timezone.utc)
+    assert payroll_period(early, ZONE) == (date(2024, 12, 21), date(2025, 1, 3))
+
+
+def test_period_spans_the_configured_schedule(monkeypatch):
+    monkeypatch.setattr(settings, 'PAYROLL_SCHEDULE_DAYS', 7)
+    first = payroll_period(datetime(2025, 1, 11, 12, tzinfo=timezone.utc), ZONE)
+    second = payroll_period(datetime(2025, 1, 18, 12, tzinfo=timezone.utc), ZONE)
+    assert first == (date(2025, 1, 4), date(2025, 1, 10))
+    assert second == (date(2025, 1, 11), date(2025, 1, 17))
+
+
+def test_schedule_follows_the_system_timezone_unless_overridden(mongo, monkeypatch):
+    run = mongo(SystemSettings)
+    monkeypatch.setattr(settings, 'PAYROLL_SCHEDULE_TIMEZONE', None)
+    assert run(schedule_timezone()) == 'UTC'
+
+    run(SystemSettings(timezone='Europe/Berlin').insert())
+    assert run(schedule_timezone()) == 'Europe/Berlin'
+
+    monkeypatch.setattr(settings, 'PAYROLL_SCHEDULE_TIMEZONE', ZONE)
+    assert run(schedule_timezone()) == ZONE
@@ -0,0 +1,38 @@
+from app.models.user import User
+from app.routers import users as users_router
+from app.schemas.user import UserUpdate
+
+
+def _employee() -> User:
+    return User(
+        username='jdoe',
+        password_hash='x',
+        role='employee',
+        name='John Doe',
+        email='jdoe@example.com',
+        pay_rate=25.0,
+        department='Kitchen',
+    )
+
+
+def test_ledger_refresh_follows_ledger_field_changes(mongo, monkeypatch):
+    run = mongo(User)
+    employee = _employee()
+    run(employee.insert())
+    refreshed = []
+
+    async def refresh(user_id):
+        refreshed.append(user_id)
+        return 0
+
+    monkeypatch.setattr(users_router, 'refresh_pay_ledger_for_employee', refresh)
+
+    # Nothing the ledger is derived from is editable today.
+    run(users_router.update_user(str(employee.id), UserUpdate(name='Johnny Doe', status='disabled'), admin=None))
+    assert refreshed == []
+
+    monkeypatch.setattr(users_router, 'LEDGER_USER_FIELDS', ('status',))
+    run(users_router.update_user(str(employee.id), UserUpdate(status='disabled'), admin=None))
+    assert refreshed == []
+    run(users_router.update_user(str(employee.id), UserUpdate(status='active'), admin=None))
+    assert refreshed == [employee.id]
@@ -0,0 +1,87 @@
+import api from './api'
+
+export type AttendanceFeedEvent = {
+  id: number
+  type: 'clock_in' | 'clock_out'
+  attendance_id: string
+  employee_id: string
+  employee_name: string
+  clock_in: string
+  clock_out: string | null
+  hours_worked: number | null
+}
+
+type StreamHandlers = {
+  onEvent: (event: AttendanceFeedEvent) => void
+  // Called after missed events (slow connection or reconnect); reload from the REST endpoints.
+  onResync: () => void
+}
+
+const INITIAL_RETRY_MS = 3000
+const MAX_RETRY_MS = 30000
+
+/**
+ * Follow the admin attendance feed (`/attendance/stream`) until `signal` aborts.
+ *
+ * Uses fetch rather than EventSource so the bearer token goes in a header
+ * instead of the URL. Reconnects with backoff.
+ */
+export function followAttendanceStream({ onEvent, onResync }: StreamHandlers, signal: AbortSignal) {
+  let retryMs = INITIAL_RETRY_MS
+  let connectedBefore = false
+
+  const dispatch = (block: string) => {
+    let eventName = 'message'
+    const data: string[] = []
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) eventName = line.slice(6).trim()
+      else if (line.startsWith('data:')) data.push(line.slice(5).trimStart())
+      else if (line.startsWith('retry:')) retryMs = Number(line.slice(6)) || retryMs
+    }
+    if (eventName === 'dropped') {
+      onResync()
+    } else if ((eventName === 'clock_in' || eventName === 'clock_out') && data.length) {
+      onEvent(JSON.parse(data.join('\n')) as AttendanceFeedEvent)
+    }
+  }
+
+  const connect = async () => {
+    while (!signal.aborted) {
+      try {
+        const token = localStorage.getItem('access_token')
+        const response = await fetch(`${api.defaults.baseURL}/attendance/stream`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+          signal,
+        })
+        if (response.status === 401 || response.status === 403) return
+        if (!response.ok || !response.body) throw new Error(`Stream failed: ${response.status}`)
+
+        // Anything may have happened while we were disconnected.
+        if (connectedBefore) onResync()
+        connectedBefore = true
+        retryMs = INITIAL_RETRY_MS
+
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        for (;;) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n')
+          let boundary = buffer.indexOf('\n\n')
+          while (boundary !== -1) {
+            dispatch(buffer.slice(0, boundary))
+            buffer = buffer.slice(boundary + 2)
+            boundary = buffer.indexOf('\n\n')
+          }
+        }
+      } catch {
+        if (signal.aborted) return
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryMs))
+      retryMs = Math.min(retryMs * 2, MAX_RETRY_MS)
+    }
+  }
+
+  connect()
+}
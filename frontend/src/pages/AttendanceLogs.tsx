@@ -1,6 +1,7 @@
 import { useEffect, useMemo, useState } from 'react'
 import { Clock, Loader2, AlertCircle, CheckCircle2 } from 'lucide-react'
 import api from '../lib/api'
+import { followAttendanceStream, type AttendanceFeedEvent } from '../lib/attendanceStream'
 
 type AttendanceLog = {
   id: string
@@ -19,6 +20,9 @@ type StatsResponse = {
   currently_clocked_in: number
 }
 
+// Mirrors DEFAULT_SHIFT_HOURS on the server for sessions pushed by the live feed.
+const DEFAULT_SHIFT_HOURS = 8
+
 type LoadOptions = {
   silent?: boolean
 }
@@ -44,6 +48,53 @@ export default function AttendanceLogs() {
     loadData()
   }, [])
 
+  useEffect(() => {
+    const controller = new AbortController()
+    followAttendanceStream(
+      {
+        onEvent: applyFeedEvent,
+        onResync: () => loadData({ silent: true }),
+      },
+      controller.signal,
+    )
+    return () => controller.abort()
+  }, [])
+
+  const applyFeedEvent = (event: AttendanceFeedEvent) => {
+    if (event.type === 'clock_in') {
+      const expected = new Date(new Date(event.clock_in).getTime() + DEFAULT_SHIFT_HOURS * 3600 * 1000)
+      setLogs((current) => {
+        if (current.some((log) => log.id === event.attendance_id)) return current
+        const entry: AttendanceLog = {
+          id: event.attendance_id,
+          employee_id: event.employee_id,
+          employee_name: event.employee_name,
+          clock_in: event.clock_in,
+          clock_out: null,
+          expected_clock_out: expected.toISOString(),
+          status: 'active',
+        }
+        return [entry, ...current]
+      })
+      setStats((current) =>
+        current ? { ...current, currently_clocked_in: current.currently_clocked_in + 1 } : current,
+      )
+    } else {
+      setLogs((current) =>
+        current.map((log) =>
+          log.id === event.attendance_id
+            ? { ...log, clock_out: event.clock_out, expected_clock_out: event.clock_out ?? log.expected_clock_out, status: 'completed' }
+            : log,
+        ),
+      )
+      setStats((current) =>
+        current
+          ? { ...current, currently_clocked_in: Math.max(current.currently_clocked_in - 1, 0) }
+          : current,
+      )
+    }
+  }
+
   const loadData = async (options: LoadOptions = {}) => {
     const silent = options.silent ?? false
     if (!silent) {
@@ -16,6 +16,7 @@ import {
   Legend,
 } from 'recharts'
 import api from '../lib/api'
+import { followAttendanceStream } from '../lib/attendanceStream'
 
 interface FinancialSnapshot {
   labor_cost: number
@@ -83,6 +84,9 @@ interface Analytics {
   exceptions: Exceptions
 }
 
+// Matches the number of entries /dashboard/recent-activity returns.
+const MAX_ACTIVITIES = 15
+
 interface Activity {
   type: string
   message: string
@@ -168,6 +172,35 @@ export default function DashboardHome() {
     loadDashboardData()
   }, [])
 
+  useEffect(() => {
+    const controller = new AbortController()
+    followAttendanceStream(
+      {
+        onEvent: (event) => {
+          const activity: Activity = {
+            type: event.type,
+            message: `${event.employee_name} ${event.type === 'clock_in' ? 'clocked in' : 'clocked out'}`,
+            timestamp: event.clock_out ?? event.clock_in,
+            user_name: event.employee_name,
+          }
+          setActivities((current) => [activity, ...current].slice(0, MAX_ACTIVITIES))
+        },
+        onResync: loadRecentActivity,
+      },
+      controller.signal,
+    )
+    return () => controller.abort()
+  }, [])
+
+  const loadRecentActivity = async () => {
+    try {
+      const activityRes = await api.get('/dashboard/recent-activity')
+      setActivities(activityRes.data.activities || [])
+    } catch (error) {
+      console.error('Failed to load recent activity:', error)
+    }
+  }
+
   const loadDashboardData = async () => {
     try {
       const [analyticsRes, activityRes, budgetRes] = await Promise.all([
@@ -72,8 +72,12 @@ export default function PayrollPending() {
       setError('')
       setSuccess('')
       setApprovingAll(true)
-      await api.post('/pay/approve-all')
-      setSuccess('All pending pay records approved.')
+      const { data } = await api.post<{ approved: number; skipped: number }>('/pay/approve-all')
+      setSuccess(
+        data.skipped
+          ? `Approved ${data.approved} pending pay records; ${data.skipped} changed during approval and were left in the queue.`
+          : `Approved ${data.approved} pending pay records.`
+      )
       await loadRecords()
     } catch (err: any) {
       setError(err.response?.data?.detail || 'Failed to approve all records')
@@ -10,6 +10,7 @@ import PayByPeriodChart from '../components/PayByPeriodChart'
 import usePayroll from '../hooks/usePayroll'
 import { PayStackParamList } from '../navigation/types'
 import { PayrollResponse } from '../types/api'
+import { getMyAdjustmentTotals } from '../services/api'
 import { colors } from '../theme/colors'
 
 export default function PayrollScreen() {
@@ -80,19 +81,6 @@ export default function PayrollScreen() {
       ? `${formatDateSafe(stats.ytdPeriodStart)} - ${formatDateSafe(stats.ytdPeriodEnd)}`
       : `Jan 1 - Dec 31, ${selectedYear}`
 
-  const ytdAdjustmentBreakdown = useMemo(() => {
-    const yearNumber = Number(selectedYear) || currentYear
-    const ytdPayrolls = payrolls.filter((p) => new Date(p.period_end).getFullYear() === yearNumber)
-    const aggregate: Record<string, { name: string; amount: number }> = {}
-    ytdPayrolls.forEach((p) => {
-      (p.adjustments || []).forEach((adj) => {
-        const sign = adj.direction === 'add' ? 1 : -1
-        if (!aggregate[adj.name]) aggregate[adj.name] = { name: adj.name, amount: 0 }
-        aggregate[adj.name].amount += sign * adj.amount_applied
-      })
-    })
-    return Object.values(aggregate)
-  }, [payrolls, selectedYear, currentYear])
   const latestPeriod = stats?.latest
     ? `${formatDateSafe(stats.latest.period_start)} - ${formatDateSafe(stats.latest.period_end)}`
     : 'No pay period yet'
@@ -154,22 +142,22 @@ export default function PayrollScreen() {
 
   const handleOpenDetails = (payroll?: PayrollResponse) => {
     if (activeTab === 'ytd' && stats) {
-      const adjustmentsForYear = ytdAdjustmentBreakdown.map((adj) => ({
-        name: adj.name,
-        amount: Math.abs(adj.amount),
-        direction: adj.amount >= 0 ? 'add' : 'deduct' as const,
-      }))
-      navigation.navigate('PayDetail', {
-        mode: 'ytd',
-        year: selectedYear,
-        summary: {
-          periodLabel: ytdPeriodLabel,
-          hours: stats.ytdHours,
-          gross: stats.ytdGross,
-          net: stats.ytdNet,
-          adjustments: adjustmentsForYear,
-        },
-      })
+      const openYtd = (adjustments: { name: string; amount: number; direction: 'add' | 'deduct' }[]) =>
+        navigation.navigate('PayDetail', {
+          mode: 'ytd',
+          year: selectedYear,
+          summary: {
+            periodLabel: ytdPeriodLabel,
+            hours: stats.ytdHours,
+            gross: stats.ytdGross,
+            net: stats.ytdNet,
+            adjustments,
+          },
+        })
+      // The pay list omits adjustment lines, so the yearly breakdown comes from the server.
+      getMyAdjustmentTotals(Number(selectedYear) || currentYear)
+        .then(openYtd)
+        .catch(() => openYtd([]))
       return
     }
     let target: PayrollResponse | null = payroll ?? null
@@ -79,13 +79,23 @@ export const getMyPayroll = () =>
             total_hours: record.hours_worked,
             gross_pay: record.gross_amount ?? record.amount,
             net_pay: record.amount,
-            adjustments: record.adjustments ?? [],
             status: record.status,
             created_at: record.created_at,
           }) satisfies PayrollResponse
       )
   )
 
+type AdjustmentTotalApi = {
+  name: string
+  direction: 'add' | 'deduct'
+  amount: number
+}
+
+export const getMyAdjustmentTotals = (year: number) =>
+  api
+    .get<AdjustmentTotalApi[]>('/pay/my/adjustment-totals', { params: { year } })
+    .then((res) => res.data)
+
 export const getMyPayDetail = (id: string) =>
   api.get<PayRecordApi>(`/pay/my/${id}`).then((res) => ({
     id: res.data.id,